@@ -0,0 +1,62 @@
+"""
+Consumer throughput (tasks/sec) for sleeping @atask functions,
+current per task async_to_sync path against async consumer with different max inflight.
+
+    python -m benchmarks.async_consumer [--tasks 500] [--sleep 0.01]
+"""
+
+import argparse
+import threading
+
+from asgiref.sync import async_to_sync
+
+from benchmarks.utils import Timer, setup_django, teardown_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--sleep", type=float, default=0.01)
+    parser.add_argument("--max-inflight", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    old_name = setup_django()
+
+    from benchmarks.tasks import async_sleep
+    from django_firefly_tasks._private.consumers import consume_tasks, run_task_consumer
+    from django_firefly_tasks.models import Status, TaskModel
+
+    def schedule():
+        for _ in range(args.tasks):
+            async_to_sync(async_sleep.schedule)(args.sleep)
+
+    try:
+        schedule()
+        with Timer() as timer:
+            while consume_tasks("bench", "bench"):
+                pass
+        print(f"async_to_sync       : {args.tasks / timer.duration:>8.0f} tasks/sec")
+
+        for max_inflight in args.max_inflight:
+            schedule()
+            stop_event = threading.Event()
+            consumer = threading.Thread(
+                target=run_task_consumer,
+                args=("bench",),
+                kwargs={"stop_event": stop_event, "max_inflight": max_inflight},
+            )
+
+            with Timer() as timer:
+                consumer.start()
+                while TaskModel.objects.filter(queue="bench", status=Status.CREATED).exists():
+                    stop_event.wait(0.01)
+                stop_event.set()
+                consumer.join()
+
+            print(f"max inflight {max_inflight:>6} : {args.tasks / timer.duration:>8.0f} tasks/sec")
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
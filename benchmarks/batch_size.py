@@ -0,0 +1,38 @@
+"""
+Consumer throughput (tasks/sec) for different batch sizes.
+
+    python -m benchmarks.batch_size [--tasks 2000]
+"""
+
+import argparse
+
+from benchmarks.utils import Timer, setup_django, teardown_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    old_name = setup_django()
+
+    from benchmarks.tasks import noop
+    from django_firefly_tasks._private.consumers import consume_tasks
+
+    try:
+        for batch_size in args.batch_sizes:
+            for _ in range(args.tasks):
+                noop.schedule()
+
+            with Timer() as timer:
+                while consume_tasks("bench", "bench", batch_size):
+                    pass
+
+            print(f"batch size {batch_size:>4}: {args.tasks / timer.duration:>8.0f} tasks/sec")
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
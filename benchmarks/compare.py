@@ -0,0 +1,31 @@
+"""
+Compares two JSON results of bench_tasks, change of every metric in percent.
+
+    python -m benchmarks.compare bench-before.json bench-after.json
+"""
+
+import argparse
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as file:
+        before = json.load(file)["results"]
+    with open(args.after) as file:
+        after = json.load(file)["results"]
+
+    for name, result in after.items():
+        for key, value in result.items():
+            old = before.get(name, {}).get(key)
+            if key in ("tasks", "rate") or not old:
+                continue
+            print(f"{name:<16} {key:<18} {old:>10} -> {value:>10} {(value - old) / old * 100:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Stored size (bytes) and round trip throughput (compress + decompress per sec) of compression codecs
+for large pickled payloads.
+
+    python -m benchmarks.compression [--rounds 200]
+"""
+
+import argparse
+
+from benchmarks.utils import Timer
+from django_firefly_tasks._private.compression import CODECS, compress, decompress
+from django_firefly_tasks.serializers import PickleSerializer
+
+PAYLOADS = {
+    "200 KB rows": {
+        "args": ([{"id": i, "email": f"user{i}@example.com", "active": i % 2 == 0} for i in range(4000)],),
+        "kwargs": {},
+    },
+    "2 MB report": {
+        "args": (),
+        "kwargs": {"report": "\n".join(f"{i};order;{i * 7 % 1000};shipped;2025-01-01" for i in range(50000))},
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    for payload_name, payload in PAYLOADS.items():
+        data = PickleSerializer().dumps(payload)
+        print(f"{payload_name}:")
+        for name in (None, *CODECS):
+            size = len(compress(data, name, 0))
+            rounds = args.rounds if name != "lzma" else max(args.rounds // 20, 1)
+            with Timer() as timer:
+                for _ in range(rounds):
+                    decompress(compress(data, name, 0))
+            print(f"  {name or 'none':<6} {size:>9} bytes {rounds / timer.duration:>10.1f} round trips/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Consumer throughput (tasks/sec) for sleep bound tasks and different number of consumer threads.
+
+    python -m benchmarks.concurrency [--tasks 200] [--sleep 0.01]
+"""
+
+import argparse
+import threading
+
+from benchmarks.utils import Timer, setup_django, teardown_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--sleep", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    old_name = setup_django()
+
+    from benchmarks.tasks import sleep
+    from django_firefly_tasks._private.consumers import threaded_task_consumer
+    from django_firefly_tasks.models import Status, TaskModel
+
+    try:
+        for concurrency in args.concurrency:
+            for _ in range(args.tasks):
+                sleep.schedule(args.sleep)
+
+            stop_event = threading.Event()
+            consumer = threading.Thread(target=threaded_task_consumer, args=("bench", concurrency, 1, stop_event))
+
+            with Timer() as timer:
+                consumer.start()
+                while TaskModel.objects.filter(queue="bench", status=Status.CREATED).exists():
+                    stop_event.wait(0.01)
+                stop_event.set()
+                consumer.join()
+
+            print(f"concurrency {concurrency:>3}: {args.tasks / timer.duration:>8.0f} tasks/sec")
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Task name and function resolution (calls/sec) and schedule() throughput (calls/sec).
+Buffered schedule() runs in rolled back transaction with deferred scheduling, so it measures
+Python overhead of scheduling without the insert.
+
+    python -m benchmarks.registry [--calls 20000]
+"""
+
+import argparse
+import inspect
+
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from benchmarks.utils import Timer, setup_django, teardown_django
+
+
+def legacy_func_path(func):
+    # get_func_path before the registry, run on every schedule()
+    from django.conf import settings
+
+    module = inspect.getmodule(func)
+    base_dir = str(settings.BASE_DIR).replace("/", ".")
+    module_name = module.__file__.replace("/", ".").rstrip(".py")
+    module_name = module_name.replace(base_dir, "")[1:]
+    return f"{module_name}.{func.__qualname__}"
+
+
+def rate(calls: int, func) -> float:
+    with Timer() as timer:
+        for _ in range(calls):
+            func()
+    return calls / timer.duration
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    old_name = setup_django()
+
+    from benchmarks.tasks import noop
+    from django_firefly_tasks.decorators import deferred_scheduling
+
+    try:
+        print(f"legacy get_func_path  : {rate(args.calls, lambda: legacy_func_path(noop)):>10.0f} calls/sec")
+        print(
+            f"import_string         : {rate(args.calls, lambda: import_string('benchmarks.tasks.noop')):>10.0f} calls/sec"
+        )
+        try:
+            from django_firefly_tasks._private.registry import get_task_func
+
+            print(
+                f"registry lookup       : {rate(args.calls, lambda: get_task_func('benchmarks.tasks.noop')):>10.0f} calls/sec"
+            )
+        except ImportError:
+            pass
+
+        with transaction.atomic(), deferred_scheduling():
+            print(f"schedule() buffered   : {rate(args.calls, noop.schedule):>10.0f} calls/sec")
+            transaction.set_rollback(True)
+
+        print(f"schedule() inserted   : {rate(args.calls // 4, noop.schedule):>10.0f} calls/sec")
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Scheduling throughput (tasks/sec), schedule() one by one against schedule_many().
+
+    python -m benchmarks.schedule_many [--tasks 10000]
+"""
+
+import argparse
+
+from benchmarks.utils import Timer, setup_django, teardown_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    old_name = setup_django()
+
+    from benchmarks.tasks import noop
+
+    try:
+        with Timer() as timer:
+            for _ in range(args.tasks):
+                noop.schedule()
+        print(f"schedule      : {args.tasks / timer.duration:>8.0f} tasks/sec")
+
+        with Timer() as timer:
+            noop.schedule_many((((), {}) for _ in range(args.tasks)), args.batch_size)
+        print(f"schedule_many : {args.tasks / timer.duration:>8.0f} tasks/sec")
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
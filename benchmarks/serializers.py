@@ -0,0 +1,57 @@
+"""
+Size (bytes) and round trip throughput (dumps + loads per sec) of serializers for typical payloads,
+legacy pickle + base64 text included for comparison.
+
+    python -m benchmarks.serializers [--rounds 20000]
+"""
+
+import argparse
+
+from benchmarks.utils import Timer
+from django_firefly_tasks._private.utils import deserialize_object, serialize_object
+from django_firefly_tasks.serializers import SERIALIZERS
+
+PAYLOADS = {
+    "id": {"args": (12345,), "kwargs": {}},
+    "form": {
+        "args": (),
+        "kwargs": {
+            "user_id": 12345,
+            "email": "john.doe@example.com",
+            "subject": "Your order has been shipped",
+            "tags": ["order", "shipping", "email"],
+            "priority": 3,
+            "send": True,
+        },
+    },
+    "1000 ids": {"args": (list(range(1000)),), "kwargs": {}},
+}
+
+
+class LegacySerializer:
+    def dumps(self, obj):
+        return serialize_object(obj)
+
+    def loads(self, data):
+        return deserialize_object(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    serializers = {"legacy base64": LegacySerializer(), **{name: cls() for name, cls in SERIALIZERS.items()}}
+
+    for payload_name, payload in PAYLOADS.items():
+        print(f"{payload_name}:")
+        for name, serializer in serializers.items():
+            size = len(serializer.dumps(payload))
+            with Timer() as timer:
+                for _ in range(args.rounds):
+                    serializer.loads(serializer.dumps(payload))
+            print(f"  {name:<14} {size:>6} bytes {args.rounds / timer.duration:>10.0f} round trips/sec")
+
+
+if __name__ == "__main__":
+    main()
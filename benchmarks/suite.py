@@ -0,0 +1,36 @@
+"""
+Reproducible run of bench_tasks command against fresh database of given profile,
+sqlite (file database) or postgresql (docker compose up -d postgres). Results are saved as JSON.
+
+    python -m benchmarks.suite [--profile sqlite] [--output bench-sqlite.json] [bench_tasks options]
+    python -m benchmarks.compare bench-before.json bench-after.json
+"""
+
+import argparse
+import os
+
+from benchmarks.utils import setup_django, teardown_django
+
+# DB_BACKEND values understood by runtests.get_databases
+PROFILES = ("sqlite", "postgresql")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=PROFILES, default="sqlite")
+    parser.add_argument("--output", type=str)
+    args, bench_args = parser.parse_known_args()
+
+    os.environ["DB_BACKEND"] = args.profile
+    old_name = setup_django()
+
+    from django.core.management import call_command
+
+    try:
+        call_command("bench_tasks", "--output", args.output or f"bench-{args.profile}.json", *bench_args)
+    finally:
+        teardown_django(old_name)
+
+
+if __name__ == "__main__":
+    main()
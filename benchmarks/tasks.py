@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+from django_firefly_tasks.decorators import atask, task
+
+
+@task(queue="bench")
+def noop():
+    pass
+
+
+@task(queue="bench")
+def sleep(seconds: float):
+    time.sleep(seconds)
+
+
+@atask(queue="bench")
+async def async_sleep(seconds: float):
+    await asyncio.sleep(seconds)
@@ -0,0 +1,53 @@
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+
+from runtests import get_databases
+
+
+def setup_django() -> str:
+    """
+    Configures Django like runtests.py (DB_BACKEND=postgresql for PostgreSQL from docker-compose.yml)
+    and creates fresh test database. Returns its name for teardown_django.
+    SQLite database is kept in a file, in-memory one can't be shared by threads.
+    """
+    databases = get_databases()
+    if databases["default"]["ENGINE"] == "django.db.backends.sqlite3":
+        databases["default"]["TEST"] = {"NAME": str(Path(tempfile.mkdtemp()) / "bench.sqlite3")}
+
+    settings.configure(
+        BASE_DIR=Path(__file__).resolve().parent.parent,
+        FAIL_SILENTLY=True,
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django_firefly_tasks",
+        ],
+        DATABASES=databases,
+        SECRET_KEY="abc123",
+    )
+    django.setup()
+
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    return old_name
+
+
+def teardown_django(old_name: str):
+    from django.db import connection
+
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.duration = time.perf_counter() - self.start
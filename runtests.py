@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -6,6 +7,30 @@ from django.conf import settings
 from django.test.utils import get_runner
 
 
+def get_databases():
+    """
+    SQLite by default, PostgreSQL from docker-compose.yml with DB_BACKEND=postgresql.
+    """
+    if os.environ.get("DB_BACKEND") == "postgresql":
+        return {
+            "default": {
+                "ENGINE": "django.db.backends.postgresql",
+                "NAME": os.environ.get("POSTGRES_DB", "firefly"),
+                "USER": os.environ.get("POSTGRES_USER", "firefly"),
+                "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "firefly"),
+                "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+                "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            }
+        }
+
+    return {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    }
+
+
 def run_tests():
     settings.configure(
         BASE_DIR=Path(__file__).resolve().parent,
@@ -21,12 +46,7 @@ def run_tests():
             "django_firefly_tasks",
             "tests",
         ],
-        DATABASES={
-            "default": {
-                "ENGINE": "django.db.backends.sqlite3",
-                "NAME": ":memory:",
-            }
-        },
+        DATABASES=get_databases(),
         SECRET_KEY="abc123",
         MIDDLEWARE=[],
     )
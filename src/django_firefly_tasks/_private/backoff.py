@@ -0,0 +1,21 @@
+import random
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter, nap time doubles on every idle iteration up to max_time.
+    Jitter spreads consumers of the same queue, so they don't poll database at the same moment.
+    """
+
+    def __init__(self, min_time: float, max_time: float):
+        self.min_time = min_time
+        self.max_time = max(min_time, max_time)
+        self.nap_time = min_time
+
+    def reset(self):
+        self.nap_time = self.min_time
+
+    def next(self) -> float:
+        nap_time = self.nap_time
+        self.nap_time = min(self.nap_time * 2, self.max_time)
+        return random.uniform(nap_time / 2, nap_time)
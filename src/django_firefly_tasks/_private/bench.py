@@ -0,0 +1,217 @@
+import asyncio
+import platform
+import threading
+import time
+
+import django
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.utils import timezone
+
+from ..decorators import atask, task
+from ..models import Status, TaskArchive, TaskModel
+from .consumers import (
+    async_task_consumer,
+    close_connection,
+    consume_tasks,
+    task_consumer,
+)
+from .profiling import QueryStats
+from .stats import percentile
+from .utils import get_worker_id
+
+# benchmark tasks get their own queue, so real ones are neither consumed nor deleted
+BENCH_QUEUE = "firefly_bench"
+SCENARIOS = ("schedule", "consume", "async", "latency")
+POLL_INTERVAL = 0.01
+
+
+@task(queue=BENCH_QUEUE)
+def noop():
+    pass
+
+
+@task(queue=BENCH_QUEUE)
+def sleep(seconds: float):
+    time.sleep(seconds)
+
+
+@atask(queue=BENCH_QUEUE)
+async def async_noop():
+    pass
+
+
+@atask(queue=BENCH_QUEUE)
+async def async_sleep(seconds: float):
+    await asyncio.sleep(seconds)
+
+
+def clean_up():
+    TaskModel.objects.filter(queue=BENCH_QUEUE).delete()
+    TaskArchive.objects.filter(queue=BENCH_QUEUE).delete()
+
+
+def measure(tasks: int, func, *args) -> dict:
+    """
+    Rate and queries per task of func running in current thread.
+    """
+    query_stats = QueryStats()
+    with connection.execute_wrapper(query_stats):
+        started_at = time.perf_counter()
+        func(*args)
+        duration = time.perf_counter() - started_at
+
+    return {
+        "tasks": tasks,
+        "tasks_per_sec": round(tasks / duration, 1),
+        "queries_per_task": round(query_stats.queries / tasks, 2),
+    }
+
+
+def bench_schedule(tasks: int, batch_size: int) -> dict:
+    results = {
+        "schedule_single": measure(tasks, lambda: [noop.schedule() for _ in range(tasks)]),
+        "schedule_bulk": measure(tasks, noop.schedule_many, (((), {}) for _ in range(tasks)), batch_size),
+    }
+    clean_up()
+    return results
+
+
+def consume_all(batch_size: int):
+    worker_id = get_worker_id()
+    while consume_tasks(BENCH_QUEUE, worker_id, batch_size):
+        pass
+
+
+def bench_consume(tasks: int, sleep_tasks: int, batch_size: int, sleep_time: float) -> dict:
+    noop.schedule_many((((), {}) for _ in range(tasks)))
+    results = {"consume_noop": measure(tasks, consume_all, batch_size)}
+
+    sleep.schedule_many((((sleep_time,), {}) for _ in range(sleep_tasks)))
+    results["consume_sleep"] = measure(sleep_tasks, consume_all, batch_size)
+
+    clean_up()
+    return results
+
+
+def run_in_background(consumer, *args) -> tuple[threading.Thread, threading.Event]:
+    """
+    Starts consumer in a thread, it runs until returned event is set.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        try:
+            consumer(*args, stop_event=stop_event)
+        finally:
+            close_connection()
+
+    thread = threading.Thread(target=run, name="firefly-bench")
+    thread.start()
+    return thread, stop_event
+
+
+def wait_for_tasks():
+    while TaskModel.objects.filter(queue=BENCH_QUEUE, status__in=[Status.CREATED, Status.RUNNING]).exists():
+        time.sleep(POLL_INTERVAL)
+
+
+def bench_async(tasks: int, sleep_tasks: int, max_inflight: int, sleep_time: float) -> dict:
+    """
+    Rate of async consumer, measured from the outside as it runs in its own threads.
+    """
+    results = {}
+
+    for name, func, count, args in (
+        ("async_noop", async_noop, tasks, ()),
+        ("async_sleep", async_sleep, sleep_tasks, (sleep_time,)),
+    ):
+        async_to_sync(func.schedule_many)(((args, {}) for _ in range(count)))
+
+        started_at = time.perf_counter()
+        thread, stop_event = run_in_background(
+            lambda stop_event: asyncio.run(async_task_consumer(BENCH_QUEUE, max_inflight, stop_event))
+        )
+        wait_for_tasks()
+        duration = time.perf_counter() - started_at
+        stop_event.set()
+        thread.join()
+
+        results[name] = {"tasks": count, "tasks_per_sec": round(count / duration, 1)}
+
+    clean_up()
+    return results
+
+
+def bench_latency(tasks: int, rate: float, batch_size: int) -> dict:
+    """
+    End-to-end latency percentiles (ms) of tasks scheduled at given rate while consumer is running,
+    from scheduling to the start of the run and to the completion.
+    """
+    thread, stop_event = run_in_background(task_consumer, BENCH_QUEUE, batch_size)
+    try:
+        for _ in range(tasks):
+            noop.schedule()
+            time.sleep(1 / rate)
+        wait_for_tasks()
+    finally:
+        stop_event.set()
+        thread.join()
+
+    waits = []
+    totals = []
+    for model in (TaskModel, TaskArchive):
+        rows = model.objects.filter(queue=BENCH_QUEUE, status=Status.COMPLETED)
+        for created, started_at, completed in rows.values_list("created", "started_at", "completed"):
+            waits.append((started_at - created).total_seconds() * 1000)
+            totals.append((completed - created).total_seconds() * 1000)
+    waits.sort()
+    totals.sort()
+    clean_up()
+
+    result = {"tasks": tasks, "rate": rate}
+    for percent in (50, 95, 99):
+        result[f"wait_p{percent}_ms"] = round(percentile(waits, percent), 2)
+        result[f"total_p{percent}_ms"] = round(percentile(totals, percent), 2)
+    return {"latency": result}
+
+
+def run_benchmark(
+    scenarios=SCENARIOS,
+    tasks: int = 1000,
+    batch_size: int = 100,
+    sleep_time: float = 0.01,
+    max_inflight: int = 10,
+    rate: float = 100,
+) -> dict:
+    """
+    Runs chosen scenarios in BENCH_QUEUE and returns their results along with environment to compare runs by.
+    Sleeping tasks are fewer (a tenth), so the run doesn't take ages.
+    """
+    clean_up()
+    sleep_tasks = max(tasks // 10, 1)
+    results = {}
+
+    if "schedule" in scenarios:
+        results.update(bench_schedule(tasks, batch_size))
+    if "consume" in scenarios:
+        results.update(bench_consume(tasks, sleep_tasks, batch_size, sleep_time))
+    if "async" in scenarios:
+        results.update(bench_async(tasks, sleep_tasks, max_inflight, sleep_time))
+    if "latency" in scenarios:
+        results.update(bench_latency(sleep_tasks, rate, batch_size))
+
+    return {
+        "environment": {
+            "date": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "database_version": ".".join(map(str, connection.get_database_version())),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "tasks": tasks,
+            "batch_size": batch_size,
+            "sleep": sleep_time,
+            "max_inflight": max_inflight,
+        },
+        "results": results,
+    }
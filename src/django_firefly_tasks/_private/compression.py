@@ -0,0 +1,36 @@
+import lzma
+import zlib
+
+# compressed data starts with zero byte, which none of shipped serializers starts its output with,
+# followed by codec id
+HEADER = b"\x00"
+
+CODECS = {
+    "zlib": (b"z", zlib.compress, zlib.decompress),
+    "lzma": (b"x", lzma.compress, lzma.decompress),
+}
+DECOMPRESSORS = {codec_id: decompress for codec_id, _, decompress in CODECS.values()}
+
+
+def check_compression(compression: str | None):
+    if compression and compression not in CODECS:
+        raise ValueError(f"Unknown compression {compression!r}, choose one of: {', '.join(CODECS)}")
+
+
+def compress(data: bytes, compression: str | None, threshold: int) -> bytes:
+    """
+    Compresses data of at least threshold bytes, data which doesn't get smaller is left as it is.
+    """
+    if not compression or len(data) < threshold:
+        return data
+
+    codec_id, compress_func, _ = CODECS[compression]
+    compressed = HEADER + codec_id + compress_func(data)
+    return compressed if len(compressed) < len(data) else data
+
+
+def decompress(data: bytes) -> bytes:
+    if not data.startswith(HEADER):
+        return data
+
+    return DECOMPRESSORS[data[1:2]](data[2:])
@@ -5,3 +5,28 @@ MAX_RETRIES = settings.MAX_RETRIES if hasattr(settings, "MAX_RETRIES") else 0
 RETRY_DELAY = settings.RETRY_DELAY if hasattr(settings, "RETRY_DELAY") else 120
 FAIL_SILENTLY = settings.FAIL_SILENTLY if hasattr(settings, "FAIL_SILENTLY") else True
 CONSUMER_NAP_TIME = settings.CONSUMER_NAP_TIME if hasattr(settings, "CONSUMER_NAP_TIME") else 0.001
+CONSUMER_MIN_NAP_TIME = (
+    settings.CONSUMER_MIN_NAP_TIME if hasattr(settings, "CONSUMER_MIN_NAP_TIME") else CONSUMER_NAP_TIME
+)
+CONSUMER_MAX_NAP_TIME = settings.CONSUMER_MAX_NAP_TIME if hasattr(settings, "CONSUMER_MAX_NAP_TIME") else 1
+CONSUMER_SKIP_LOCKED = settings.CONSUMER_SKIP_LOCKED if hasattr(settings, "CONSUMER_SKIP_LOCKED") else True
+CONSUMER_LEASE_TIME = settings.CONSUMER_LEASE_TIME if hasattr(settings, "CONSUMER_LEASE_TIME") else 600
+CONSUMER_REAPER_INTERVAL = settings.CONSUMER_REAPER_INTERVAL if hasattr(settings, "CONSUMER_REAPER_INTERVAL") else 60
+CONSUMER_BATCH_SIZE = settings.CONSUMER_BATCH_SIZE if hasattr(settings, "CONSUMER_BATCH_SIZE") else 1
+CONSUMER_NOTIFY = settings.CONSUMER_NOTIFY if hasattr(settings, "CONSUMER_NOTIFY") else False
+CONSUMER_NOTIFY_TIMEOUT = settings.CONSUMER_NOTIFY_TIMEOUT if hasattr(settings, "CONSUMER_NOTIFY_TIMEOUT") else 30
+SCHEDULE_BATCH_SIZE = settings.SCHEDULE_BATCH_SIZE if hasattr(settings, "SCHEDULE_BATCH_SIZE") else 1000
+DEFERRED_SCHEDULING = settings.DEFERRED_SCHEDULING if hasattr(settings, "DEFERRED_SCHEDULING") else False
+TASK_SERIALIZER = settings.TASK_SERIALIZER if hasattr(settings, "TASK_SERIALIZER") else "pickle"
+TASK_COMPRESSION = settings.TASK_COMPRESSION if hasattr(settings, "TASK_COMPRESSION") else None
+TASK_COMPRESSION_THRESHOLD = (
+    settings.TASK_COMPRESSION_THRESHOLD if hasattr(settings, "TASK_COMPRESSION_THRESHOLD") else 1024
+)
+ARCHIVE_MODE = settings.ARCHIVE_MODE if hasattr(settings, "ARCHIVE_MODE") else None
+ARCHIVE_BATCH_SIZE = settings.ARCHIVE_BATCH_SIZE if hasattr(settings, "ARCHIVE_BATCH_SIZE") else 1000
+METRICS = settings.METRICS if hasattr(settings, "METRICS") else False
+METRICS_DIR = settings.METRICS_DIR if hasattr(settings, "METRICS_DIR") else None
+METRICS_FLUSH_INTERVAL = settings.METRICS_FLUSH_INTERVAL if hasattr(settings, "METRICS_FLUSH_INTERVAL") else 1
+PRIORITY_AGING = settings.PRIORITY_AGING if hasattr(settings, "PRIORITY_AGING") else None
+ATTEMPT_HISTORY_SIZE = settings.ATTEMPT_HISTORY_SIZE if hasattr(settings, "ATTEMPT_HISTORY_SIZE") else 10
+RESULT_CACHE = settings.RESULT_CACHE if hasattr(settings, "RESULT_CACHE") else "default"
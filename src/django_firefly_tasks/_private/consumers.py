@@ -1,28 +1,404 @@
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, transaction
 
-from .consts import CONSUMER_NAP_TIME, FAIL_SILENTLY
-from .processors import task_processor
-from .utils import get_latest_task
+from ..models import TaskModel
+from . import metrics
+from .backoff import Backoff
+from .consts import (
+    ARCHIVE_MODE,
+    CONSUMER_BATCH_SIZE,
+    CONSUMER_LEASE_TIME,
+    CONSUMER_MAX_NAP_TIME,
+    CONSUMER_MIN_NAP_TIME,
+    CONSUMER_NOTIFY_TIMEOUT,
+    CONSUMER_REAPER_INTERVAL,
+    CONSUMER_SKIP_LOCKED,
+    FAIL_SILENTLY,
+)
+from .maintenance import archive_tasks
+from .notify import STOP_CHECK_INTERVAL, Listener, is_notify_enabled
+from .processors import atask_processor, tasks_processor
+from .queues import WeightedQueues, get_queue_weights
+from .utils import (
+    close_obsolete_connections,
+    get_latest_tasks,
+    get_seconds_to_next_task,
+    get_worker_id,
+    lease_tasks,
+    logger,
+    requeue_expired_tasks,
+)
 
+PROCESS_RESTART_DELAY = 1
+PROCESS_MAX_RESTART_DELAY = 60
+# batches archived per reaper run, so backlog of finished tasks doesn't hold up consuming
+REAPER_ARCHIVE_BATCHES = 10
 
-def task_consumer(queue: str):
+
+def close_connection():
+    # connection is thread local, so it has to be looked up in thread which used it
+    connection.close()
+
+
+def claim_tasks(queue: str, worker_id: str, batch_size: int = 1) -> list[TaskModel]:
+    """
+    Takes up to batch_size latest tasks from the queue and leases them to worker in short transaction,
+    so no lock is held while the tasks are running.
+    """
+    started_at = time.perf_counter()
+    with transaction.atomic():
+        tasks = get_latest_tasks(queue, batch_size, skip_locked=CONSUMER_SKIP_LOCKED)
+        tasks = lease_tasks(tasks, worker_id, CONSUMER_LEASE_TIME)
+
+    metrics.record_claim(queue, tasks, time.perf_counter() - started_at)
+    return tasks
+
+
+def consume_tasks(queue: str, worker_id: str | None = None, batch_size: int = 1) -> list[TaskModel]:
+    """
+    Claims up to batch_size latest tasks from the queue and processes them.
+    Returns taken tasks, empty list when there is nothing to do.
+    """
+    tasks = claim_tasks(queue, worker_id or get_worker_id(), batch_size)
+
+    error = None
+    try:
+        tasks_processor(tasks)
+    except Exception as err:
+        error = err
+
+    if not FAIL_SILENTLY and error:
+        raise error
+
+    return tasks
+
+
+def get_nap_time(queue: str, max_nap_time: float) -> float:
+    """
+    Nap time of consumer with empty queue, it's cut short when postponed task is due earlier.
+    """
+    seconds = get_seconds_to_next_task(queue)
+    return max_nap_time if seconds is None else min(seconds, max_nap_time)
+
+
+def reap_expired_tasks(queue: str):
+    requeued, failed = requeue_expired_tasks(queue)
+    if requeued:
+        logger.info(f"Requeued {requeued} tasks with expired lease")
+    if failed:
+        logger.warning(f"Failed {failed} tasks with expired lease and no retries left")
+
+    # background archive mode moves finished tasks out of the queue table at the same pace,
+    # large backlog is worked off over several runs
+    if ARCHIVE_MODE == "background":
+        archive_tasks(queue=queue, max_batches=REAPER_ARCHIVE_BATCHES)
+
+
+def task_consumer(
+    queue: str | dict[str, int],
+    batch_size: int = CONSUMER_BATCH_SIZE,
+    stop_event: threading.Event | None = None,
+    worker_id: str | None = None,
+):
     """
     Task consumer, it's consuming tasks :) Supports both sync and async function.
+    While there are tasks it takes next ones right away, when queue is empty it naps longer and longer.
+    In notify mode (PostgreSQL) empty queue is not polled, consumer waits for notification about new task.
+    Either way it wakes up when the nearest postponed task is due.
+    Many queues are served by weight, {"emails": 5, "reports": 1}, empty ones nap on their own.
+    Once stop_event is set consumer finishes running tasks and returns.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = worker_id or get_worker_id()
+    queues = WeightedQueues(get_queue_weights(queue), CONSUMER_MIN_NAP_TIME, CONSUMER_MAX_NAP_TIME)
+    listener = Listener(queues.weights) if is_notify_enabled() else None
+    reaped_at = float("-inf")
+
+    if listener:
+        # listen before first check, so task scheduled in between is not missed
+        listener.listen()
+
+    try:
+        while not stop_event.is_set():
+            if time.monotonic() - reaped_at > CONSUMER_REAPER_INTERVAL:
+                for name in queues.weights:
+                    reap_expired_tasks(name)
+                reaped_at = time.monotonic()
+
+            name = queues.next()
+            if name is None:
+                # every queue naps
+                metrics.flush()
+                if listener:
+                    queues.wake_up(everyone=listener.wait(queues.nap_time(), stop_event))
+                else:
+                    stop_event.wait(queues.nap_time())
+                    queues.wake_up()
+                continue
+
+            tasks = consume_tasks(name, worker_id, batch_size)
+            if tasks:
+                queues.set_busy(name, len(tasks))
+                close_obsolete_connections()
+            else:
+                max_nap_time = CONSUMER_NOTIFY_TIMEOUT if listener else queues.backoffs[name].next()
+                queues.set_empty(name, get_nap_time(name, max_nap_time))
+    finally:
+        logger.info(f"Consumed tasks per queue: {queues}")
+
+
+def threaded_task_consumer(
+    queue: str | dict[str, int],
+    concurrency: int,
+    batch_size: int = CONSUMER_BATCH_SIZE,
+    stop_event: threading.Event | None = None,
+):
     """
+    Runs task consumer in concurrency threads, each one with its own database connection.
+    Suits I/O bound tasks, CPU bound ones are still limited by GIL.
+    When one of consumers fails, the rest is stopped and the error is raised.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = get_worker_id()
+    errors = []
+
+    def consumer(index: int):
+        try:
+            task_consumer(queue, batch_size, stop_event, f"{worker_id}:{index}")
+        except Exception as err:
+            errors.append(err)
+            stop_event.set()
+        finally:
+            close_connection()
+
+    threads = [
+        threading.Thread(target=consumer, args=(index,), name=f"firefly-consumer-{index}")
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # join with timeout, so main thread keeps handling signals
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.1)
 
-    while True:
-        time.sleep(CONSUMER_NAP_TIME)
+    if errors:
+        raise errors[0]
 
-        error = None
 
-        with transaction.atomic():
-            task = get_latest_task(queue)
-            try:
-                task_processor(task)
-            except Exception as err:
-                error = err
+async def async_task_consumer(
+    queue: str | dict[str, int], max_inflight: int, stop_event: threading.Event | None = None
+):
+    """
+    Task consumer running up to max_inflight tasks at once in single event loop.
+    Async functions are awaited as coroutines, sync ones run in threads. All free slots are claimed at once.
+    Tasks are claimed and released through Django's thread for sync code, so no transaction is shared.
+    Many queues are served by weight like in task_consumer.
+    Once stop_event is set consumer waits for running tasks and returns.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = get_worker_id()
+    queues = WeightedQueues(get_queue_weights(queue), CONSUMER_MIN_NAP_TIME, CONSUMER_MAX_NAP_TIME)
+    listener = Listener(queues.weights) if is_notify_enabled() else None
+    reaped_at = float("-inf")
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_inflight, thread_name_prefix="firefly-task")
+    # listener blocks its thread, so it gets own one (and own connection)
+    listener_executor = ThreadPoolExecutor(1, thread_name_prefix="firefly-listener")
+    inflight = set()
+    wake_up = None
+    error = None
+
+    if listener:
+        await loop.run_in_executor(listener_executor, listener.listen)
+
+    try:
+        while not stop_event.is_set():
+            if time.monotonic() - reaped_at > CONSUMER_REAPER_INTERVAL:
+                for name in queues.weights:
+                    await sync_to_async(reap_expired_tasks)(name)
+                reaped_at = time.monotonic()
+
+            timeout = None
+            if len(inflight) < max_inflight:
+                name = queues.next()
+                if name is not None:
+                    tasks = await sync_to_async(claim_tasks)(name, worker_id, max_inflight - len(inflight))
+                    inflight.update(asyncio.create_task(atask_processor(task, executor)) for task in tasks)
+
+                    if tasks:
+                        queues.set_busy(name, len(tasks))
+                        await sync_to_async(close_obsolete_connections)()
+                    else:
+                        max_nap_time = CONSUMER_NOTIFY_TIMEOUT if listener else queues.backoffs[name].next()
+                        queues.set_empty(name, await sync_to_async(get_nap_time)(name, max_nap_time))
+                    continue
+
+                # every queue naps, listener may be waiting from earlier iteration,
+                # so due postponed task is awaited by timeout
+                timeout = queues.nap_time()
+                metrics.flush()
+                if listener:
+                    wake_up = wake_up or loop.run_in_executor(
+                        listener_executor, listener.wait, CONSUMER_NOTIFY_TIMEOUT, stop_event
+                    )
+
+            waiting = inflight | {wake_up} if wake_up else inflight
+            if not waiting:
+                await asyncio.sleep(timeout)
+                queues.wake_up()
+                continue
+
+            done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if wake_up in done:
+                wake_up = None
+                queues.wake_up(everyone=True)
+            elif not done:
+                queues.wake_up()
+            for running in done & inflight:
+                inflight.remove(running)
+                error = error or running.exception()
+            if error:
+                stop_event.set()
+    finally:
+        if inflight:
+            await asyncio.wait(inflight)
+            error = error or next((running.exception() for running in inflight if running.exception()), None)
+        stop_event.set()
+        if wake_up:
+            await wake_up
+        await loop.run_in_executor(listener_executor, close_connection)
+        await sync_to_async(close_connection)()
+        executor.shutdown()
+        listener_executor.shutdown()
+        logger.info(f"Consumed tasks per queue: {queues}")
+
+    if error:
+        raise error
+
+
+def run_task_consumer(
+    queue: str | dict[str, int],
+    batch_size: int = CONSUMER_BATCH_SIZE,
+    concurrency: int = 1,
+    stop_event: threading.Event | None = None,
+    max_inflight: int | None = None,
+):
+    """
+    Runs async consumer when max_inflight is given, threaded one for concurrency above 1, plain one otherwise.
+    """
+    try:
+        if max_inflight:
+            asyncio.run(async_task_consumer(queue, max_inflight, stop_event))
+        elif concurrency > 1:
+            threaded_task_consumer(queue, concurrency, batch_size, stop_event)
+        else:
+            task_consumer(queue, batch_size, stop_event)
+    finally:
+        metrics.flush()
+
+
+def consumer_process(queue: str | dict[str, int], batch_size: int, concurrency: int, max_inflight: int | None):
+    # Ctrl+C reaches whole process group, drain is driven by supervisor's SIGTERM
+    stop_event = threading.Event()
+    handle_stop_signals(stop_event)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    metrics.reset()
+
+    run_task_consumer(queue, batch_size, concurrency, stop_event, max_inflight)
+
+
+def process_task_consumer(
+    queue: str | dict[str, int],
+    processes: int,
+    batch_size: int = CONSUMER_BATCH_SIZE,
+    concurrency: int = 1,
+    stop_event: threading.Event | None = None,
+    max_inflight: int | None = None,
+):
+    """
+    Supervisor of processes consumers, uses all CPU cores for CPU bound tasks.
+    Django is imported once and children are forked, the ones which died are restarted.
+    Child which keeps dying right after start (e.g. database is down) is restarted later and later,
+    the other children are watched in the meantime.
+    Once stop_event is set children get SIGTERM and are waited for to finish running tasks.
+    """
+    stop_event = stop_event or threading.Event()
+    context = multiprocessing.get_context("fork")
+
+    def start() -> multiprocessing.Process:
+        # children must not share parent's database sockets
+        connections.close_all()
+        process = context.Process(
+            target=consumer_process, args=(queue, batch_size, concurrency, max_inflight), name="firefly-consumer"
+        )
+        process.start()
+        return process
+
+    children = [start() for _ in range(processes)]
+    started_at = [time.monotonic()] * processes
+    backoffs = [Backoff(PROCESS_RESTART_DELAY, PROCESS_MAX_RESTART_DELAY) for _ in range(processes)]
+    # when dead child is started again, None for running ones
+    restart_at = [None] * processes
+
+    try:
+        while not stop_event.is_set():
+            # wakes up when running child dies, dead one is due to restart or to check stop_event
+            timeout = min([STOP_CHECK_INTERVAL] + [at - time.monotonic() for at in restart_at if at is not None])
+            multiprocessing.connection.wait(
+                [child.sentinel for child, at in zip(children, restart_at) if at is None], timeout=max(timeout, 0)
+            )
+            if stop_event.is_set():
+                break
+
+            for index, child in enumerate(children):
+                if restart_at[index] is not None and restart_at[index] <= time.monotonic():
+                    children[index] = start()
+                    started_at[index] = time.monotonic()
+                    restart_at[index] = None
+                elif restart_at[index] is None and not child.is_alive():
+                    # child which ran for a while died on its own, so it starts over with short delay
+                    if time.monotonic() - started_at[index] > PROCESS_MAX_RESTART_DELAY:
+                        backoffs[index].reset()
+                    delay = backoffs[index].next()
+                    logger.warning(
+                        f"Consumer process {child.pid} died with exit code {child.exitcode}, "
+                        f"restarting in {delay:.1f} s"
+                    )
+                    restart_at[index] = time.monotonic() + delay
+
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.kill()
+        raise
+
+
+def handle_stop_signals(stop_event: threading.Event):
+    """
+    Sets stop_event on SIGTERM and SIGINT so running tasks can finish, second SIGINT stops right away.
+    """
+
+    def stop(signum, frame):
+        if stop_event.is_set() and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        logger.info("Stopping, waiting for running tasks to finish")
+        stop_event.set()
 
-        if not FAIL_SILENTLY and error:
-            raise error
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
@@ -0,0 +1,74 @@
+from typing import Callable
+
+from ..models import DEDUP_KEY_LENGTH, TaskModel
+from .results import get_result_key
+
+# what scheduling does when pending task of the same function has the same key
+DUPLICATE_MODES = ("ignore", "replace")
+
+
+def check_on_duplicate(on_duplicate: str):
+    if on_duplicate not in DUPLICATE_MODES:
+        raise ValueError(f"Unknown on_duplicate {on_duplicate!r}, choose one of: {', '.join(DUPLICATE_MODES)}")
+
+
+def get_dedup_key(
+    func_name: str, serializer: str, kwargs: dict, unique_key: bool | Callable | None, args
+) -> str | None:
+    """
+    Pops unique_key passed to schedule, otherwise builds it with decorator's unique_key:
+    callable gets task's args, True hashes args serialized by task's serializer.
+    """
+    key = kwargs.pop("unique_key", None)
+
+    if key is None and callable(unique_key):
+        key = unique_key(*args, **kwargs)
+    elif key is None and unique_key:
+        key = get_result_key(func_name, serializer, args, kwargs)
+
+    if key is not None and not isinstance(key, str):
+        raise TypeError("'unique_key' should be str")
+    if key is not None and len(key) > DEDUP_KEY_LENGTH:
+        raise ValueError(f"'unique_key' should be at most {DEDUP_KEY_LENGTH} characters long")
+
+    return key
+
+
+def save_unique_tasks(tasks: list[TaskModel], on_duplicate: str):
+    """
+    Inserts tasks of one function unless pending task with the same key exists, which database enforces
+    with firefly_task_dedup_key constraint, so racing producers can't both win.
+    In replace mode pending duplicates are deleted first, the latest params win and task goes to the end of the queue.
+    Returns queryset of pending tasks with the keys.
+    """
+    unique = {}
+    for task in tasks:
+        # the same key twice in one call is a duplicate too
+        if on_duplicate == "replace" or task.dedup_key not in unique:
+            unique[task.dedup_key] = task
+
+    pending = TaskModel.objects.filter(func_name=tasks[0].func_name, dedup_key__in=unique)
+    if on_duplicate == "replace":
+        pending.delete()
+    TaskModel.objects.bulk_create(unique.values(), ignore_conflicts=True)
+    return pending
+
+
+def save_unique_task(task: TaskModel, on_duplicate: str) -> TaskModel:
+    """
+    Inserts task unless there is pending duplicate, returns the task which is in the queue.
+    """
+    # pending one could be taken by consumer right after insert, then there is nothing to return
+    return save_unique_tasks([task], on_duplicate).first() or task
+
+
+def create_tasks(tasks: list[TaskModel], on_duplicate: str) -> list[int | None]:
+    """
+    Bulk inserts tasks, the ones with dedup_key only if there is no pending duplicate.
+    Returns IDs in order of tasks, for duplicates the ID of pending task.
+    """
+    TaskModel.objects.bulk_create([task for task in tasks if not task.dedup_key])
+
+    unique = [task for task in tasks if task.dedup_key]
+    pending = dict(save_unique_tasks(unique, on_duplicate).values_list("dedup_key", "pk")) if unique else {}
+    return [pending.get(task.dedup_key) if task.dedup_key else task.pk for task in tasks]
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from ..models import TaskModel
+from .consts import DEFERRED_SCHEDULING
+from .notify import notify_on_commit
+
+deferred = ContextVar("firefly_deferred_scheduling", default=None)
+
+
+@contextmanager
+def deferred_scheduling(enabled: bool = True):
+    """
+    Turns deferred scheduling on (or off) for the block, overrides settings.DEFERRED_SCHEDULING.
+    """
+    token = deferred.set(enabled)
+    try:
+        yield
+    finally:
+        deferred.reset(token)
+
+
+def is_enabled() -> bool:
+    enabled = deferred.get()
+    return DEFERRED_SCHEDULING if enabled is None else enabled
+
+
+class TaskBuffer:
+    """
+    Tasks scheduled in one transaction (savepoint), inserted with single bulk_create once it's committed.
+    It's registered as on_commit callback, so Django drops it together with rolled back savepoint.
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def __call__(self):
+        TaskModel.objects.bulk_create(self.tasks)
+        for queue in {task.queue for task in self.tasks}:
+            notify_on_commit(queue)
+
+
+def get_buffer() -> TaskBuffer:
+    savepoint_ids = set(connection.savepoint_ids)
+
+    for sids, func, *_ in reversed(connection.run_on_commit):
+        if isinstance(func, TaskBuffer) and sids == savepoint_ids:
+            return func
+
+    buffer = TaskBuffer()
+    transaction.on_commit(buffer)
+    return buffer
+
+
+def defer_task(task: TaskModel) -> bool:
+    """
+    Buffers task till transaction commit. Returns False when task should be saved right away,
+    deferred scheduling is off or there is no transaction to wait for.
+    """
+    if not is_enabled() or not connection.in_atomic_block:
+        return False
+
+    get_buffer().tasks.append(task)
+    return True
+
+
+async def adefer_task(task: TaskModel) -> bool:
+    # transaction, if any, is open in Django's thread for sync code
+    return is_enabled() and await sync_to_async(defer_task)(task)
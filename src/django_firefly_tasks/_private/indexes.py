@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class NullsFirstIndex(models.Index):
+    """
+    Index which keeps NULLs first for given fields, so it matches `F(field).asc(nulls_first=True)` ordering.
+    SQLite and MySQL already sort NULLs first (and reject NULLS FIRST in index definition),
+    PostgreSQL needs it spelled out.
+    """
+
+    def __init__(self, *args, nulls_first=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nulls_first = tuple(nulls_first)
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+        index = self.clone()
+        index.fields_orders = [
+            (field_name, f"{order} NULLS FIRST".strip() if field_name in self.nulls_first else order)
+            for field_name, order in self.fields_orders
+        ]
+        return super(NullsFirstIndex, index).create_sql(model, schema_editor, using=using, **kwargs)
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        kwargs["nulls_first"] = self.nulls_first
+        return path, args, kwargs
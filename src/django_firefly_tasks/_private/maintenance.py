@@ -0,0 +1,234 @@
+import argparse
+import base64
+import re
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Status, TaskArchive, TaskModel
+from ..serializers import get_serializer
+from .compression import compress, decompress
+from .consts import ARCHIVE_BATCH_SIZE
+from .utils import deserialize_object, logger
+
+# status -> field with time the task got it, retention is counted from it
+STATUS_TIME_FIELDS = {
+    Status.COMPLETED: "completed",
+    Status.FAILED: "failed",
+}
+AGE_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def recompress_task(task: TaskModel, compression: str | None, threshold: int):
+    """
+    Recompresses task data with given codec, legacy base64 data is moved to binary fields on the way.
+    Params and result are moved independently, task which ran after upgrade has its result in binary field already.
+    """
+    data = {}
+    for field in ("params_data", "returned_data"):
+        value = getattr(task, field)
+        if value is not None:
+            data[field] = decompress(bytes(value)) if task.compression else bytes(value)
+
+    # legacy data is default pickle, readable by pickle serializer, task with binary data keeps its serializer
+    task.serializer = task.serializer or "pickle"
+    for field, raw_field in (("params_data", "raw_params"), ("returned_data", "raw_returned")):
+        raw = getattr(task, raw_field)
+        if field in data or not raw:
+            continue
+        data[field] = load_legacy_data(raw, task.serializer)
+        setattr(task, raw_field, None)
+
+    for field, value in data.items():
+        setattr(task, field, compress(value, compression, threshold))
+    task.compression = compression
+
+
+def load_legacy_data(raw: str, serializer: str) -> bytes:
+    if serializer == "pickle":
+        return base64.b64decode(raw)
+    return get_serializer(serializer).dumps(deserialize_object(raw))
+
+
+def recompress_tasks(compression: str | None, threshold: int, batch_size: int = 1000, queue: str | None = None) -> int:
+    """
+    Recompresses not running tasks in batches, each one in its own short transaction.
+    Rows locked by consumers are skipped where database supports it. Returns number of recompressed tasks.
+    """
+    tasks = TaskModel.objects.exclude(status=Status.RUNNING).order_by("pk")
+    if queue:
+        tasks = tasks.filter(queue=queue)
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    last_pk = 0
+    recompressed = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(tasks.filter(pk__gt=last_pk).select_for_update(skip_locked=skip_locked)[:batch_size])
+            if not batch:
+                return recompressed
+
+            for task in batch:
+                recompress_task(task, compression, threshold)
+            TaskModel.objects.bulk_update(
+                batch, ["serializer", "compression", "params_data", "returned_data", "raw_params", "raw_returned"]
+            )
+
+        last_pk = batch[-1].pk
+        recompressed += len(batch)
+
+
+def delete_tasks(
+    status: Status,
+    older_than: timedelta | None = None,
+    queue: str | None = None,
+    batch_size: int = 1000,
+    sleep_between_batches: float = 0,
+    dry_run: bool = False,
+    max_batches: int | None = None,
+    archive: bool = False,
+) -> int:
+    """
+    Deletes completed or failed tasks in chunks of batch_size, oldest first, each chunk with its own short DELETE.
+    Chunks are read from status/time index, so neither memory nor locks grow with the table.
+    With archive the tasks are deleted from the archive instead of the queue table.
+    Stops after max_batches chunks if given. Returns number of deleted tasks (matching ones in dry run).
+    """
+    model = TaskArchive if archive else TaskModel
+    where = " archived" if archive else ""
+    time_field = STATUS_TIME_FIELDS[status]
+    tasks = model.objects.filter(status=status)
+    if older_than is not None:
+        tasks = tasks.filter(**{f"{time_field}__lt": timezone.now() - older_than})
+    if queue:
+        tasks = tasks.filter(queue=queue)
+
+    if dry_run:
+        count = tasks.count()
+        logger.info(f"Would delete {count}{where} {status} tasks")
+        return count
+
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        if batches and sleep_between_batches:
+            time.sleep(sleep_between_batches)
+
+        pks = list(tasks.order_by(time_field, "pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+
+        # status is checked again, task could be marked consumable in the meantime
+        batch_deleted, _ = model.objects.filter(pk__in=pks, status=status).delete()
+        deleted += batch_deleted
+        batches += 1
+        logger.info(f"Deleted {deleted}{where} {status} tasks so far")
+
+        if len(pks) < batch_size:
+            break
+
+    logger.info(f"Deleted{where} {status} tasks: {deleted}")
+    return deleted
+
+
+def archive_tasks(
+    older_than: timedelta | None = None,
+    queue: str | None = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    sleep_between_batches: float = 0,
+    dry_run: bool = False,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Moves finished tasks to the archive in chunks of batch_size, each chunk in its own short transaction.
+    Rows locked by other movers are skipped where database supports it.
+    Returns number of archived tasks (matching ones in dry run).
+    """
+    tasks = TaskModel.objects.filter(status__in=[Status.COMPLETED, Status.FAILED])
+    if older_than is not None:
+        finished_before = timezone.now() - older_than
+        tasks = tasks.filter(Q(completed__lt=finished_before) | Q(failed__lt=finished_before))
+    if queue:
+        tasks = tasks.filter(queue=queue)
+
+    if dry_run:
+        count = tasks.count()
+        logger.info(f"Would archive {count} tasks")
+        return count
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        if batches and sleep_between_batches:
+            time.sleep(sleep_between_batches)
+
+        with transaction.atomic():
+            batch = list(tasks.order_by("pk").select_for_update(skip_locked=skip_locked)[:batch_size])
+            TaskArchive.objects.bulk_create([TaskArchive.from_task(task) for task in batch], ignore_conflicts=True)
+            TaskModel.objects.filter(pk__in=[task.pk for task in batch]).delete()
+
+        archived += len(batch)
+        batches += 1
+        if batch:
+            logger.info(f"Archived {archived} tasks so far")
+        if len(batch) < batch_size:
+            break
+
+    return archived
+
+
+def parse_age(value: str) -> timedelta:
+    """
+    Age in seconds or with s, m, h or d unit, e.g. 30m or 7d.
+    """
+    match = re.fullmatch(r"(\d+)([smhd]?)", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid age {value!r}, use e.g. 3600, 30m, 12h or 7d")
+    return timedelta(seconds=int(match[1]) * AGE_UNITS[match[2]])
+
+
+def add_retention_arguments(parser: argparse.ArgumentParser, batch_size: int = 1000):
+    parser.add_argument(
+        "--older-than",
+        type=parse_age,
+        help="Only tasks finished before this age, in seconds or with s, m, h or d unit, e.g. 7d.",
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        help="Queue of tasks. All queues if left empty.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=batch_size,
+        help="Number of tasks per batch.",
+    )
+    parser.add_argument(
+        "--sleep-between-batches",
+        type=float,
+        default=0,
+        help="Pause in seconds between batches, lets replicas catch up.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only reports number of matching tasks.",
+    )
+
+
+def add_archive_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Deletes tasks from the archive instead of the queue table.",
+    )
+
+
+def retention_options(options: dict) -> dict:
+    return {key: options[key] for key in ("older_than", "queue", "batch_size", "sleep_between_batches", "dry_run")}
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.db.models import Count
+
+from ..models import Status, TaskModel
+from .consts import METRICS, METRICS_DIR, METRICS_FLUSH_INTERVAL
+from .utils import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+# name -> (type, label names, help)
+METRICS_INFO = {
+    "firefly_tasks_claimed_total": ("counter", ("queue", "func"), "Tasks claimed by consumers."),
+    "firefly_tasks_completed_total": ("counter", ("queue", "func"), "Tasks completed."),
+    "firefly_tasks_failed_total": ("counter", ("queue", "func"), "Tasks failed after all retries."),
+    "firefly_tasks_retried_total": ("counter", ("queue", "func"), "Task runs failed and scheduled for retry."),
+    "firefly_claim_duration_seconds": ("histogram", ("queue",), "Duration of claim transaction."),
+    "firefly_task_duration_seconds": ("histogram", ("queue", "func"), "Duration of task run."),
+    "firefly_task_latency_seconds": ("histogram", ("queue", "func"), "Time from task creation to completion."),
+    "firefly_queue_depth": ("gauge", ("queue", "status"), "Tasks waiting or running, read at scrape time."),
+}
+
+enabled = METRICS
+lock = threading.Lock()
+# (name, label values) -> value
+counters = defaultdict(float)
+# (name, label values) -> [bucket counts..., sum, count]
+histograms = {}
+flushed_at = float("-inf")
+# there are metrics not written to METRICS_DIR yet
+dirty = False
+file_name = None
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def reset():
+    """
+    Drops metrics of this process, e.g. ones inherited by forked consumer.
+    """
+    global file_name, dirty
+    with lock:
+        counters.clear()
+        histograms.clear()
+        file_name = None
+        dirty = False
+
+
+def inc(name: str, labels: tuple, amount: float = 1):
+    global dirty
+    if not enabled:
+        return
+    with lock:
+        counters[name, labels] += amount
+        dirty = True
+
+
+def observe(name: str, labels: tuple, value: float):
+    global dirty
+    if not enabled:
+        return
+    with lock:
+        dirty = True
+        histogram = histograms.setdefault((name, labels), [0] * (len(BUCKETS) + 2))
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+
+def record_claim(queue: str, tasks: list, duration: float):
+    if not enabled:
+        return
+    observe("firefly_claim_duration_seconds", (queue,), duration)
+    for task in tasks:
+        inc("firefly_tasks_claimed_total", (queue, task.func_name))
+    maybe_flush()
+
+
+def record_task(task, duration: float):
+    """
+    Records finished run of the task, its status tells how it ended.
+    """
+    if not enabled:
+        return
+
+    labels = (task.queue, task.func_name)
+    observe("firefly_task_duration_seconds", labels, duration)
+    if task.status == Status.COMPLETED:
+        inc("firefly_tasks_completed_total", labels)
+        if task.created:
+            observe("firefly_task_latency_seconds", labels, (task.completed - task.created).total_seconds())
+    elif task.status == Status.FAILED:
+        inc("firefly_tasks_failed_total", labels)
+    else:
+        inc("firefly_tasks_retried_total", labels)
+    maybe_flush()
+
+
+def snapshot() -> dict:
+    with lock:
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), list(values)] for (name, labels), values in histograms.items()],
+        }
+
+
+def maybe_flush():
+    # called once metrics of an event are recorded, so file is never half way through it
+    if METRICS_DIR and time.monotonic() - flushed_at > METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """
+    Writes metrics of this process to METRICS_DIR, where they are merged with other processes' ones.
+    """
+    global flushed_at, file_name, dirty
+    if not (enabled and METRICS_DIR and dirty):
+        return
+
+    flushed_at = time.monotonic()
+    dirty = False
+    # new name per process, so restarted process with reused pid doesn't overwrite dead one's counters
+    file_name = file_name or f"firefly-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+    path = Path(METRICS_DIR) / file_name
+    tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+
+    try:
+        tmp_path.write_text(json.dumps(snapshot()))
+        os.replace(tmp_path, path)
+    except OSError as error:
+        logger.warning(f"Metrics not saved to {path}: {error}")
+
+
+def collect() -> tuple[dict, dict]:
+    """
+    Counters and histograms of all processes from METRICS_DIR, or of this process without it.
+    """
+    if METRICS_DIR:
+        flush()
+        snapshots = []
+        for path in Path(METRICS_DIR).glob("firefly-*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # file of just finished process could be gone
+                continue
+    else:
+        snapshots = [snapshot()]
+
+    merged_counters = defaultdict(float)
+    merged_histograms = {}
+    for data in snapshots:
+        for name, labels, value in data["counters"]:
+            merged_counters[name, tuple(labels)] += value
+        for name, labels, values in data["histograms"]:
+            merged = merged_histograms.setdefault((name, tuple(labels)), [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return merged_counters, merged_histograms
+
+
+def get_queue_depth() -> dict:
+    rows = (
+        TaskModel.objects.filter(status__in=[Status.CREATED, Status.RUNNING])
+        .values_list("queue", "status")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    return {("firefly_queue_depth", (queue, status)): count for queue, status, count in rows}
+
+
+def format_labels(name: str, values: tuple, **extra) -> str:
+    labels = dict(zip(METRICS_INFO[name][1], values), **extra)
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics() -> str:
+    """
+    All metrics in Prometheus text format.
+    """
+    merged_counters, merged_histograms = collect()
+    gauges = get_queue_depth()
+    lines = []
+
+    for name, (metric_type, _, help_text) in METRICS_INFO.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+        if metric_type == "histogram":
+            for (metric, labels), values in sorted(merged_histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(BUCKETS, values):
+                    lines.append(f"{name}_bucket{format_labels(name, labels, le=format_number(bound))} {count}")
+                lines.append(f"{name}_bucket{format_labels(name, labels, le='+Inf')} {values[-1]}")
+                lines.append(f"{name}_sum{format_labels(name, labels)} {format_number(values[-2])}")
+                lines.append(f"{name}_count{format_labels(name, labels)} {values[-1]}")
+        else:
+            values = merged_counters if metric_type == "counter" else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(name, labels)} {format_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        from django.db import connection
+
+        try:
+            body = render_metrics().encode()
+        finally:
+            # server thread connects on its own, nothing is kept open between scrapes
+            connection.close()
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serves metrics on /metrics (any path, in fact) in daemon thread.
+    """
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="firefly-metrics", daemon=True).start()
+    logger.info(f"Serving metrics on {addr}:{server.server_port}")
+    return server
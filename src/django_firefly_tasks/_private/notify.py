@@ -0,0 +1,120 @@
+import hashlib
+import inspect
+import select
+import threading
+import time
+from collections.abc import Iterable
+from functools import cache, partial
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from .consts import CONSUMER_NOTIFY
+
+STOP_CHECK_INTERVAL = 1
+
+
+def is_notify_enabled() -> bool:
+    return CONSUMER_NOTIFY and connection.vendor == "postgresql"
+
+
+@cache
+def notifies_take_timeout(connection_class: type) -> bool:
+    # psycopg's notifies() has timeout and stop_after since 3.2
+    return "timeout" in inspect.signature(connection_class.notifies).parameters
+
+
+def get_channel(queue: str) -> str:
+    """
+    PostgreSQL channel of the queue, long queue names are hashed to fit in 63 bytes identifier.
+    """
+    channel = f"firefly_{queue}"
+    if len(channel.encode()) > 63:
+        channel = f"firefly_{hashlib.sha1(queue.encode()).hexdigest()}"
+    return channel
+
+
+def notify(queue: str):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, '')", [get_channel(queue)])
+
+
+def notify_on_commit(queue: str):
+    """
+    Wakes up consumers of the queue once current transaction is committed.
+    """
+    if is_notify_enabled():
+        transaction.on_commit(partial(notify, queue))
+
+
+async def anotify_on_commit(queue: str):
+    if is_notify_enabled():
+        await sync_to_async(notify_on_commit)(queue)
+
+
+class Listener:
+    """
+    Waits for notifications about new tasks in the queue (or any of queues), supports both psycopg and psycopg2.
+    """
+
+    def __init__(self, queue: str | Iterable[str]):
+        self.channels = [get_channel(name) for name in ([queue] if isinstance(queue, str) else queue)]
+        self.listening_on = None
+
+    def listen(self) -> bool:
+        """
+        Returns True when LISTEN was (re)issued, notifications sent before that are lost.
+        """
+        connection.ensure_connection()
+
+        # LISTEN has to be repeated when Django reconnected in the meantime
+        if connection.connection is not self.listening_on:
+            with connection.cursor() as cursor:
+                for channel in self.channels:
+                    cursor.execute(f"LISTEN {connection.ops.quote_name(channel)}")
+            self.listening_on = connection.connection
+            return True
+        return False
+
+    def wait(self, timeout: float, stop_event: threading.Event | None = None) -> bool:
+        """
+        Blocks until notification comes, timeout passes or stop_event is set. Returns True when notified.
+        After reconnect it returns True right away, as notification could be missed while not listening.
+        """
+        if self.listen():
+            return True
+
+        deadline = time.monotonic() + timeout
+        while not (stop_event and stop_event.is_set()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # wake up from time to time to check stop_event
+            if self._wait(min(remaining, STOP_CHECK_INTERVAL)):
+                return True
+        return False
+
+    def _wait(self, timeout: float) -> bool:
+        pg_connection = connection.connection
+
+        # psycopg
+        if callable(pg_connection.notifies) and notifies_take_timeout(type(pg_connection)):
+            return any(True for _ in pg_connection.notifies(timeout=timeout, stop_after=1))
+
+        # psycopg < 3.2, its notifies() blocks until connection is closed, so socket is polled directly
+        if callable(pg_connection.notifies):
+            pgconn = pg_connection.pgconn
+            if select.select([pg_connection.fileno()], [], [], timeout)[0]:
+                pgconn.consume_input()
+            notified = False
+            while pgconn.notifies() is not None:
+                notified = True
+            return notified
+
+        # psycopg2
+        if not pg_connection.notifies and select.select([pg_connection], [], [], timeout)[0]:
+            pg_connection.poll()
+
+        notified = bool(pg_connection.notifies)
+        pg_connection.notifies.clear()
+        return notified
@@ -1,54 +1,153 @@
-from asgiref.sync import async_to_sync
-from django.db import transaction
-from django.utils.module_loading import import_string
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from ..models import TaskModel
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import close_old_connections, transaction
+
+from ..models import Status, TaskModel
+from . import metrics, profiling, results
 from .consts import FAIL_SILENTLY
-from .utils import is_async, logger, serialize_object
+from .registry import get_task_func
+from .utils import get_worker_id, is_async, logger, release_tasks
 
 
-def task_processor(task: TaskModel | None):
-    if not task:
-        return
+def tasks_processor(tasks: list[TaskModel]):
+    """
+    Runs leased tasks one after another and saves their statuses with single bulk update.
+    """
+    error = None
 
-    logger.info(f"[Task #{task.pk}] Processing")
+    for task in tasks:
+        logger.info(f"[Task #{task.pk}] Processing")
+        try:
+            run_task(task)
+        except Exception as err:
+            error = error or err
+
+    released = release_tasks(tasks)
+    for task in tasks:
+        logger.info(f"[Task #{task.pk}] Changed status to {task.status}")
+    if released != len(tasks):
+        logger.warning(f"Lease lost for {len(tasks) - released} tasks, their statuses not saved")
 
-    if task.is_postponed():
-        logger.info(f"[Task #{task.pk}] It's postponed to {task.not_before}")
+    if error:
+        raise error
+
+
+def run_task(task: TaskModel):
+    """
+    Runs task function and sets task state accordingly, without saving it.
+    Function which can't be imported or params which can't be loaded are task's error as well.
+    """
+    started = start_task(task)
+
+    if task.func_name in results.cached_funcs and results.load_cached_result(task):
+        finish_task(task, started)
         return
 
-    func = import_string(task.func_name)
-    params = task.params
+    try:
+        func = get_task_func(task.func_name)
+        returned = call_task_func(task, func, task.params)
+    except Exception as error:
+        set_task_error(task, error)
+        finish_task(task, started, error)
+        if task.status == Status.FAILED and not FAIL_SILENTLY:
+            raise
+    else:
+        set_task_result(task, returned)
+        finish_task(task, started)
+        if task.func_name in results.cached_funcs:
+            results.save_result(task)
+
+
+async def arun_task(task: TaskModel, executor: ThreadPoolExecutor | None = None):
+    """
+    Async version of run_task, awaits async function in current event loop and runs sync one in executor.
+    Async function isn't wrapped in transaction, it can't be shared by coroutines running at once.
+    """
+    started = start_task(task)
+
+    if task.func_name in results.cached_funcs and await sync_to_async(results.load_cached_result)(task):
+        finish_task(task, started)
+        return
 
-    # creates savepoint/subtransaction to isolate function from task logic
-    sid = transaction.savepoint()
     try:
+        func = get_task_func(task.func_name)
+        params = task.params
         if is_async(func):
-            returned = async_to_sync(func)(*params["args"], **params["kwargs"])
+            returned = await func(*params["args"], **params["kwargs"])
         else:
-            returned = func(*params["args"], **params["kwargs"])
+            returned = await sync_to_async(call_in_thread, thread_sensitive=False, executor=executor)(
+                task, func, params
+            )
     except Exception as error:
-        # if something in function fails rollback to state before calling it
-        transaction.savepoint_rollback(sid)
+        set_task_error(task, error)
+        finish_task(task, started, error)
+        if task.status == Status.FAILED and not FAIL_SILENTLY:
+            raise
+    else:
+        set_task_result(task, returned)
+        finish_task(task, started)
+        if task.func_name in results.cached_funcs:
+            await sync_to_async(results.save_result)(task)
 
-        logger.info(f"[Task #{task.pk}] Error raised: {str(error)}")
 
-        if task.can_be_restarted():
-            task.setup_for_restart()
-            task.save()
-        if task.retry_attempts == task.max_retries:
-            task.set_as_failed()
-            task.save()
+async def atask_processor(task: TaskModel, executor: ThreadPoolExecutor | None = None):
+    logger.info(f"[Task #{task.pk}] Processing")
 
+    try:
+        await arun_task(task, executor)
+    finally:
+        if await task.arelease():
             logger.info(f"[Task #{task.pk}] Changed status to {task.status}")
+        else:
+            logger.warning(f"[Task #{task.pk}] Lease lost, status {task.status} not saved")
 
-            if not FAIL_SILENTLY:
-                raise
-    else:
-        transaction.savepoint_commit(sid)
 
-        task.raw_returned = serialize_object(returned) if returned else None
-        task.set_as_completed()
-        task.save()
+def call_in_transaction(func, params: dict):
+    # separate transaction (or savepoint if called in one) isolates function from task logic,
+    # if something in function fails it's rolled back to state before calling it
+    with transaction.atomic():
+        if is_async(func):
+            return async_to_sync(func)(*params["args"], **params["kwargs"])
+        return func(*params["args"], **params["kwargs"])
 
-        logger.info(f"[Task #{task.pk}] Changed status to {task.status}")
+
+def call_task_func(task: TaskModel, func, params: dict):
+    if profiling.enabled and profiling.is_sampled(task.func_name):
+        return profiling.profile_call(task, call_in_transaction, func, params)
+    return call_in_transaction(func, params)
+
+
+def call_in_thread(task: TaskModel, func, params: dict):
+    try:
+        return call_task_func(task, func, params)
+    finally:
+        # executor threads live long and are never joined by consumer, so their connections are handled
+        # like after request, closed with CONN_MAX_AGE=0 instead of being left open when thread is gone
+        close_old_connections()
+
+
+def start_task(task: TaskModel) -> float:
+    task.set_as_started(get_worker_id())
+    return time.perf_counter()
+
+
+def finish_task(task: TaskModel, started: float, error: Exception | None = None):
+    duration = time.perf_counter() - started
+    task.set_run_time(duration, error)
+    metrics.record_task(task, duration)
+
+
+def set_task_error(task: TaskModel, error: Exception):
+    logger.info(f"[Task #{task.pk}] Error raised: {str(error)}")
+
+    if task.can_be_restarted():
+        task.setup_for_restart()
+    if task.retry_attempts == task.max_retries:
+        task.set_as_failed()
+
+
+def set_task_result(task: TaskModel, returned):
+    task.returned = returned
+    task.set_as_completed()
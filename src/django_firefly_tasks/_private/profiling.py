@@ -0,0 +1,141 @@
+import cProfile
+import fnmatch
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+from django.db import connection
+
+from .utils import logger
+
+# set by enable, checked before anything else, so consumer without profiling pays single attribute lookup
+enabled = False
+func_pattern = "*"
+sample_rate = 1.0
+profile_dir = None
+aggregate = False
+
+lock = threading.Lock()
+# held while a task is profiled, cProfile is process wide since Python 3.12 (sys.monitoring)
+# and second profiler fails to start, so concurrent tasks are profiled one at a time
+profiler_lock = threading.Lock()
+# func_name -> (pstats.Stats, query stats) of this process, aggregate mode only
+aggregated = {}
+
+
+class QueryStats:
+    """
+    Counts and times queries of current thread's connection, used as connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - started_at
+
+
+def enable(pattern: str, rate: float = 1.0, directory: str = "firefly_profiles", aggregate_stats: bool = False):
+    """
+    Profiles sample of tasks with function name matching the pattern (fnmatch, e.g. "app.tasks.*").
+    """
+    global enabled, func_pattern, sample_rate, profile_dir, aggregate
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    func_pattern = pattern
+    sample_rate = rate
+    profile_dir = Path(directory)
+    aggregate = aggregate_stats
+    enabled = True
+
+
+def is_sampled(func_name: str) -> bool:
+    return fnmatch.fnmatchcase(func_name, func_pattern) and random.random() < sample_rate
+
+
+def profile_call(task, call, *args):
+    """
+    Runs call(*args) under cProfile and saves its stats along with SQL query count and time of the run.
+    Profiler and query counter see current thread only, so async functions awaited elsewhere show little,
+    @atask coroutines awaited by async consumer aren't profiled at all.
+    Sample is skipped while other task (or other profiling tool) is profiled, call just runs.
+    """
+    if not profiler_lock.acquire(blocking=False):
+        logger.debug(f"[Task #{task.pk}] Not profiled, other task is profiled")
+        return call(*args)
+
+    try:
+        return run_profiled(task, call, *args)
+    finally:
+        profiler_lock.release()
+
+
+def run_profiled(task, call, *args):
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as err:
+        # other profiling tool is active, e.g. debugger's
+        logger.warning(f"[Task #{task.pk}] Not profiled: {err}")
+        return call(*args)
+
+    query_stats = QueryStats()
+    started_at = time.perf_counter()
+    try:
+        with connection.execute_wrapper(query_stats):
+            return call(*args)
+    finally:
+        profiler.disable()
+        run_time = time.perf_counter() - started_at
+        try:
+            path = save_profile(task, profiler, query_stats, run_time)
+            logger.info(
+                f"[Task #{task.pk}] Profiled: {query_stats.queries} queries in {query_stats.duration * 1000:.1f} ms "
+                f"of {run_time * 1000:.1f} ms, stats in {path}"
+            )
+        except Exception as err:
+            # profiling must not change task's outcome
+            logger.warning(f"[Task #{task.pk}] Profile not saved: {err}")
+
+
+def save_profile(task, profiler: cProfile.Profile, query_stats: QueryStats, run_time: float) -> Path:
+    """
+    Writes <func_name>.<task id>.<attempt>.prof with .json query stats next to it,
+    in aggregate mode <func_name>.<pid>.prof and .json summed over all profiled runs of the function.
+    """
+    info = {
+        "tasks": 1,
+        "run_ms": run_time * 1000,
+        "queries": query_stats.queries,
+        "query_ms": query_stats.duration * 1000,
+    }
+
+    if not aggregate:
+        path = profile_dir / f"{task.func_name}.{task.pk}.{task.retry_attempts}.prof"
+        profiler.dump_stats(path)
+        path.with_suffix(".json").write_text(json.dumps({"task_id": task.pk, "func_name": task.func_name, **info}))
+        return path
+
+    path = profile_dir / f"{task.func_name}.{os.getpid()}.prof"
+    with lock:
+        stats, totals = aggregated.get(task.func_name) or (None, dict.fromkeys(info, 0))
+        if stats is None:
+            stats = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        for key, value in info.items():
+            totals[key] += value
+        aggregated[task.func_name] = (stats, totals)
+
+        stats.dump_stats(path)
+        path.with_suffix(".json").write_text(json.dumps({"func_name": task.func_name, **totals}))
+    return path
@@ -0,0 +1,74 @@
+import argparse
+import re
+import time
+
+from .backoff import Backoff
+
+
+def parse_queue(value: str) -> tuple[str, int]:
+    """
+    Queue with optional weight after colon, e.g. emails:5. Weight defaults to 1.
+    """
+    match = re.fullmatch(r"(.+?)(?::(\d+))?", value.strip())
+    if not match or match[2] == "0":
+        raise argparse.ArgumentTypeError(f"invalid queue {value!r}, use name or name:weight, e.g. emails:5")
+    return match[1], int(match[2] or 1)
+
+
+def get_queue_weights(queue: str | dict[str, int]) -> dict[str, int]:
+    return {queue: 1} if isinstance(queue, str) else dict(queue)
+
+
+class WeightedQueues:
+    """
+    Picks queue to claim from by smooth weighted round-robin, queue with weight 5 is picked 5 times as often
+    as the one with weight 1, without picking it 5 times in a row.
+    Queue found empty naps (is skipped) for time growing while it stays empty, each one has its own backoff.
+    """
+
+    def __init__(self, weights: dict[str, int], min_nap_time: float, max_nap_time: float):
+        self.weights = weights
+        self.backoffs = {queue: Backoff(min_nap_time, max_nap_time) for queue in weights}
+        self.current = dict.fromkeys(weights, 0)
+        self.napping_until = dict.fromkeys(weights, float("-inf"))
+        self.claimed = dict.fromkeys(weights, 0)
+
+    def next(self) -> str | None:
+        """
+        Queue to claim from, None when all of them nap.
+        """
+        now = time.monotonic()
+        awake = [queue for queue in self.weights if self.napping_until[queue] <= now]
+        if not awake:
+            return None
+
+        for queue in awake:
+            self.current[queue] += self.weights[queue]
+        queue = max(awake, key=self.current.__getitem__)
+        self.current[queue] -= sum(self.weights[queue] for queue in awake)
+        return queue
+
+    def set_busy(self, queue: str, claimed: int):
+        self.claimed[queue] += claimed
+        self.backoffs[queue].reset()
+
+    def set_empty(self, queue: str, nap_time: float):
+        self.napping_until[queue] = time.monotonic() + nap_time
+
+    def nap_time(self) -> float:
+        """
+        Time till the first napping queue is due.
+        """
+        return max(min(self.napping_until.values()) - time.monotonic(), 0)
+
+    def wake_up(self, everyone: bool = False):
+        """
+        Ends nap of the first queue to be due, or of all of them (e.g. after notification about new task).
+        """
+        first = min(self.napping_until, key=self.napping_until.__getitem__)
+        for queue in self.napping_until:
+            if everyone or queue == first:
+                self.napping_until[queue] = float("-inf")
+
+    def __str__(self):
+        return ", ".join(f"{queue}: {claimed}" for queue, claimed in self.claimed.items())
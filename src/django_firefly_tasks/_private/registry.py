@@ -0,0 +1,39 @@
+from typing import Callable
+
+from django.utils.module_loading import autodiscover_modules, import_string
+
+from ..exceptions import TaskNameConflictException
+from .utils import get_func_path
+
+# task name -> function, filled by @task and @atask at import time
+registry: dict[str, Callable] = {}
+
+
+def register(func: Callable, name: str | None = None) -> str:
+    """
+    Registers function under its dotted path or given name. Returns the name.
+    """
+    name = name or get_func_path(func)
+
+    registered = registry.get(name)
+    # the same function imported again (e.g. by autoreloader) replaces itself
+    if registered and get_func_path(registered) != get_func_path(func):
+        raise TaskNameConflictException(f"Task {name!r} is already registered for {get_func_path(registered)}")
+
+    registry[name] = func
+    return name
+
+
+def get_task_func(name: str) -> Callable:
+    """
+    Function of the task, tasks scheduled before registry (or from not imported module) are imported.
+    """
+    func = registry.get(name)
+    if func is None:
+        func = import_string(name)
+    return func
+
+
+def autodiscover_tasks():
+    # so tasks with explicit names are registered before consumer runs them
+    autodiscover_modules("tasks")
@@ -0,0 +1,94 @@
+import hashlib
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from ..models import TaskModel
+from ..serializers import get_serializer
+from .consts import RESULT_CACHE
+from .utils import logger
+
+# func_name -> cache ttl in seconds (None = cache's default) of functions with cache_result, filled by decorators
+cached_funcs: dict[str, int | None] = {}
+
+
+def register_cached(func_name: str, cache_ttl: int | None):
+    cached_funcs[func_name] = cache_ttl
+
+
+def get_result_key(func_name: str, serializer: str, args, kwargs: dict) -> str:
+    """
+    Stable hash of function and its params serialized by task's serializer, kwargs are sorted.
+    """
+    data = get_serializer(serializer).dumps({"args": tuple(args), "kwargs": dict(sorted(kwargs.items()))})
+    return hashlib.sha1(func_name.encode() + b"\x00" + data).hexdigest()
+
+
+def get_cache_key(result_key: str) -> str:
+    return f"firefly_result:{result_key}"
+
+
+def get_cache():
+    return caches[RESULT_CACHE]
+
+
+def set_cached_result(task: TaskModel, cached: tuple):
+    task.serializer, task.compression, task.returned_data = cached
+    task.set_as_completed()
+    task.dedup_key = None
+
+
+def apply_cached_results(tasks: list[TaskModel]):
+    """
+    Completes tasks (with result key in dedup_key) whose result is cached, in single cache round trip.
+    Unavailable cache is a miss, tasks just run.
+    """
+    try:
+        cached = get_cache().get_many([get_cache_key(task.dedup_key) for task in tasks])
+    except Exception as err:
+        logger.warning(f"Cached results not read: {err}")
+        return
+
+    for task in tasks:
+        if get_cache_key(task.dedup_key) in cached:
+            set_cached_result(task, cached[get_cache_key(task.dedup_key)])
+
+
+def get_task_cache_key(task: TaskModel) -> str:
+    params = task.params
+    return get_cache_key(get_result_key(task.func_name, task.serializer, params["args"], params["kwargs"]))
+
+
+def load_cached_result(task: TaskModel) -> bool:
+    """
+    Completes task with cached result, e.g. of duplicate which ran while this one was waiting.
+    Returns True on cache hit.
+    """
+    try:
+        cached = get_cache().get(get_task_cache_key(task))
+    except Exception as err:
+        logger.warning(f"[Task #{task.pk}] Cached result not read: {err}")
+        return False
+
+    if cached is None:
+        return False
+    set_cached_result(task, cached)
+    logger.info(f"[Task #{task.pk}] Completed with cached result")
+    return True
+
+
+def save_result(task: TaskModel):
+    """
+    Caches result of completed task for cache_ttl of its function.
+    """
+    # returned data is kept serialized (and compressed) as it is in the task
+    returned_data = bytes(task.returned_data) if task.returned_data is not None else None
+    cache_ttl = cached_funcs[task.func_name]
+    try:
+        get_cache().set(
+            get_task_cache_key(task),
+            (task.serializer, task.compression, returned_data),
+            DEFAULT_TIMEOUT if cache_ttl is None else cache_ttl,
+        )
+    except Exception as err:
+        logger.warning(f"[Task #{task.pk}] Result not cached: {err}")
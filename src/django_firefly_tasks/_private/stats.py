@@ -0,0 +1,54 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import Status, TaskArchive, TaskModel
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def get_task_stats(
+    since: timedelta | None = None, queue: str | None = None, func_name: str | None = None
+) -> list[dict]:
+    """
+    Wait and run time percentiles (ms) of finished tasks per function and queue, archived ones included.
+    Wait time is counted from the moment task was due, creation or its ETA.
+    """
+    filters = {"status__in": [Status.COMPLETED, Status.FAILED], "started_at__isnull": False}
+    if since is not None:
+        filters["started_at__gte"] = timezone.now() - since
+    if queue:
+        filters["queue"] = queue
+    if func_name:
+        filters["func_name"] = func_name
+
+    wait_times = defaultdict(list)
+    run_times = defaultdict(list)
+    for model in (TaskModel, TaskArchive):
+        rows = model.objects.filter(**filters).values_list(
+            "func_name", "queue", "created", "not_before", "started_at", "duration_ms"
+        )
+        for func, task_queue, created, not_before, started_at, duration_ms in rows.iterator():
+            due = max(created, not_before or created)
+            wait_times[func, task_queue].append((started_at - due).total_seconds() * 1000)
+            run_times[func, task_queue].append(duration_ms)
+
+    stats = []
+    for (func, task_queue), waits in sorted(wait_times.items()):
+        waits.sort()
+        runs = sorted(run_times[func, task_queue])
+        row = {"func_name": func, "queue": task_queue, "count": len(runs)}
+        for percent in PERCENTILES:
+            row[f"wait_p{percent}"] = round(percentile(waits, percent))
+            row[f"run_p{percent}"] = round(percentile(runs, percent))
+        stats.append(row)
+    return stats
@@ -1,12 +1,17 @@
 import asyncio
 import base64
-import inspect
 import logging
+import os
 import pickle
-from datetime import datetime
+import socket
+from datetime import datetime, timedelta
 
-from django.conf import settings
-from django.db.models import Case, IntegerField, Value, When
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .consts import ARCHIVE_MODE, PRIORITY_AGING
 
 logger = logging.getLogger("django_firefly_tasks")
 
@@ -35,42 +40,292 @@ def deserialize_object(any: str):
 
 def get_func_path(func):
     """
-    Gets function path in dot notation relative to project aka myapp.myview.myfunction
+    Gets function path in dot notation aka myapp.myview.myfunction
     """
-    module = inspect.getmodule(func)
-    base_dir = str(settings.BASE_DIR).replace("/", ".")
-
-    module_name = module.__file__.replace("/", ".").rstrip(".py")
-    module_name = module_name.replace(base_dir, "")[1:]
-
-    qualname = func.__qualname__
-    return f"{module_name}.{qualname}"
+    return f"{func.__module__}.{func.__qualname__}"
 
 
 def is_async(func):
     return asyncio.iscoroutinefunction(func)
 
 
-def get_latest_task(queue: str):
+def get_tasks_to_consume(queue: str):
     """
-    Get latest task. Sorts by not_before; first null rows, than asc.
-    Select for update is used to create database lock for task to prevent race conditions
+    Tasks ready to be consumed, postponed ones are filtered out. Sorts by priority, the highest first,
+    then by not_before; first null rows, than asc.
+    Ordering matches firefly_task_priority_idx, so database reads it straight from the index.
     """
     from django_firefly_tasks.models import Status, TaskModel
 
     return (
-        TaskModel.objects.select_for_update()
-        .annotate(
-            not_before_null=Case(
-                When(not_before=None, then=Value(0)),
-                default=Value(1),
-                output_field=IntegerField(),
+        TaskModel.objects.filter(queue=queue, status=Status.CREATED)
+        .filter(Q(not_before__isnull=True) | Q(not_before__lte=timezone.now()))
+        .order_by(F("priority").desc(), F("not_before").asc(nulls_first=True), "pk")
+    )
+
+
+def get_aged_task_ids(queue: str, limit: int, aging: float) -> list[int]:
+    """
+    IDs of up to limit tasks which are due for more than aging seconds, the longest waiting first.
+    Tasks without ETA are read by id and the ones with ETA by not_before from firefly_task_claim_idx,
+    so it takes two short index scans however long the queue is.
+    """
+    from django_firefly_tasks.models import Status, TaskModel
+
+    due_before = timezone.now() - timedelta(seconds=aging)
+    tasks = TaskModel.objects.filter(queue=queue, status=Status.CREATED)
+    # ids grow with creation time, so the oldest ones are at the head, filtering created in SQL would scan them all
+    heads = [
+        (created, pk)
+        for pk, created in tasks.filter(not_before__isnull=True).order_by("pk").values_list("pk", "created")[:limit]
+        if created < due_before
+    ]
+    heads += (
+        tasks.filter(not_before__lt=due_before).order_by("not_before", "pk").values_list("not_before", "pk")[:limit]
+    )
+    return [pk for _, pk in sorted(heads)[:limit]]
+
+
+def get_seconds_to_next_task(queue: str) -> float | None:
+    """
+    Seconds till the nearest postponed task of the queue is due, None when there is no postponed task.
+    """
+    from django_firefly_tasks.models import Status, TaskModel
+
+    not_before = (
+        TaskModel.objects.filter(queue=queue, status=Status.CREATED, not_before__isnull=False)
+        .order_by("not_before")
+        .values_list("not_before", flat=True)
+        .first()
+    )
+    if not_before is None:
+        return None
+    return max((not_before - timezone.now()).total_seconds(), 0)
+
+
+def get_latest_tasks(queue: str, limit: int, skip_locked: bool = False) -> list:
+    """
+    Get up to limit latest tasks in single query.
+    Select for update is used to create database lock for tasks to prevent race conditions.
+    With skip_locked tasks locked by other consumers are skipped instead of waited for,
+    backends without SKIP LOCKED (SQLite) fall back to plain select for update.
+    With settings.PRIORITY_AGING tasks waiting longer than that go first, whatever their priority,
+    it takes two more queries (see get_aged_task_ids).
+    """
+    skip_locked = skip_locked and connection.features.has_select_for_update_skip_locked
+    tasks = get_tasks_to_consume(queue).select_for_update(skip_locked=skip_locked)
+    if not PRIORITY_AGING:
+        return list(tasks[:limit])
+
+    aged_ids = get_aged_task_ids(queue, limit, PRIORITY_AGING)
+    latest_tasks = list(tasks.filter(pk__in=aged_ids)) if aged_ids else []
+    if len(latest_tasks) < limit:
+        latest_tasks += tasks.exclude(pk__in=aged_ids)[: limit - len(latest_tasks)]
+    return latest_tasks
+
+
+def get_latest_task(queue: str, skip_locked: bool = False):
+    """
+    Get latest task.
+    """
+    tasks = get_latest_tasks(queue, 1, skip_locked=skip_locked)
+    return tasks[0] if tasks else None
+
+
+def lease_tasks(tasks: list, worker_id: str, lease_time: int) -> list:
+    """
+    Marks created tasks as running by worker in single UPDATE. Returns tasks which were leased,
+    update is conditional, so on backends without row locks another consumer could be first.
+    Dedup key is cleared, so unique task scheduled from now on runs again.
+    """
+    from django_firefly_tasks.models import Status, TaskModel
+
+    if not tasks:
+        return []
+
+    lease_expires_at = timezone.now() + timedelta(seconds=lease_time)
+    pks = [task.pk for task in tasks]
+
+    leased = TaskModel.objects.filter(pk__in=pks, status=Status.CREATED).update(
+        status=Status.RUNNING, locked_by=worker_id, lease_expires_at=lease_expires_at, dedup_key=None
+    )
+    if leased != len(pks):
+        pks = set(
+            TaskModel.objects.filter(pk__in=pks, locked_by=worker_id, lease_expires_at=lease_expires_at).values_list(
+                "pk", flat=True
             )
         )
-        .filter(queue=queue, status=Status.CREATED)
-        .order_by("not_before_null", "not_before", "pk")
-        .first()
+
+    tasks = [task for task in tasks if task.pk in pks]
+    for task in tasks:
+        task.status = Status.RUNNING
+        task.locked_by = worker_id
+        task.lease_expires_at = lease_expires_at
+        task.dedup_key = None
+    return tasks
+
+
+def release_tasks(tasks: list) -> int:
+    """
+    Saves state of tasks leased by the same worker and releases them in bulk UPDATE.
+    Tasks which lease was lost in the meantime are not overwritten. Returns number of released tasks.
+
+    Works like QuerySet.bulk_update, but only fields which differ between tasks get CASE WHEN,
+    the rest (e.g. locked_by, mostly status) are set directly, which saves a lot of query building.
+    """
+    from django_firefly_tasks.models import RELEASE_FIELDS, TaskModel
+
+    archived = 0
+    if ARCHIVE_MODE == "inline":
+        archived = archive_released_tasks([task for task in tasks if task.is_finished()])
+        tasks = [task for task in tasks if not task.is_finished()]
+
+    if not tasks:
+        return archived
+    if len(tasks) == 1:
+        return archived + int(tasks[0].release())
+
+    locked_by = tasks[0].locked_by
+    for task in tasks:
+        task.locked_by = None
+        task.lease_expires_at = None
+
+    fields = [TaskModel._meta.get_field(field_name) for field_name in RELEASE_FIELDS]
+    # compared with the first task, values like attempt history are not hashable
+    varying_fields = [
+        field
+        for field in fields
+        if any(getattr(task, field.attname) != getattr(tasks[0], field.attname) for task in tasks[1:])
+    ]
+    batch_size = connection.ops.bulk_batch_size(["pk", "pk"] + varying_fields, tasks) or len(tasks)
+
+    released = 0
+    for i in range(0, len(tasks), batch_size):
+        batch = tasks[i : i + batch_size]
+        update_kwargs = {}
+
+        for field in fields:
+            if field not in varying_fields:
+                update_kwargs[field.attname] = getattr(batch[0], field.attname)
+                continue
+
+            case = Case(
+                *(When(pk=task.pk, then=Value(getattr(task, field.attname), output_field=field)) for task in batch),
+                output_field=field,
+            )
+            if connection.features.requires_casted_case_in_updates:
+                case = Cast(case, output_field=field)
+            update_kwargs[field.attname] = case
+
+        released += TaskModel.objects.filter(pk__in=[task.pk for task in batch], locked_by=locked_by).update(
+            **update_kwargs
+        )
+
+    return archived + released
+
+
+def archive_released_tasks(tasks: list) -> int:
+    """
+    Moves finished tasks leased by the same worker to the archive, instead of releasing them in the queue table.
+    Tasks which lease was lost in the meantime are left alone. Returns number of archived tasks.
+    """
+    from django_firefly_tasks.models import TaskArchive, TaskModel
+
+    if not tasks:
+        return 0
+
+    locked_by = tasks[0].locked_by
+    for task in tasks:
+        task.locked_by = None
+        task.lease_expires_at = None
+
+    with transaction.atomic():
+        pks = set(
+            TaskModel.objects.select_for_update()
+            .filter(pk__in=[task.pk for task in tasks], locked_by=locked_by)
+            .values_list("pk", flat=True)
+        )
+        TaskModel.objects.filter(pk__in=pks).delete()
+        TaskArchive.objects.bulk_create([TaskArchive.from_task(task) for task in tasks if task.pk in pks])
+
+    return len(pks)
+
+
+def requeue_expired_tasks(queue: str) -> tuple[int, int]:
+    """
+    Puts running tasks with expired lease back to the queue, e.g. when consumer crashed while running them.
+    Lost run counts as an attempt, so task which kills its consumer every time isn't requeued forever,
+    the ones without retries left are failed. Returns numbers of requeued and failed tasks.
+    """
+    from django_firefly_tasks.models import Status, TaskModel
+
+    now = timezone.now()
+    expired = TaskModel.objects.filter(queue=queue, status=Status.RUNNING, lease_expires_at__lt=now)
+
+    failed = expired.filter(retry_attempts__gte=F("max_retries")).update(
+        status=Status.FAILED, failed=now, locked_by=None, lease_expires_at=None
+    )
+    requeued = expired.update(
+        status=Status.CREATED, retry_attempts=F("retry_attempts") + 1, locked_by=None, lease_expires_at=None
     )
+    return requeued, failed
+
+
+def close_obsolete_connections():
+    """
+    Like close_old_connections after request, drops broken connections and the ones older than CONN_MAX_AGE.
+    Healthy connections with CONN_MAX_AGE=0 (Django's default) are kept, otherwise consumer would reconnect
+    after every batch of tasks.
+    """
+    for conn in connections.all(initialized_only=True):
+        if conn.settings_dict["CONN_MAX_AGE"] != 0 or conn.errors_occurred:
+            conn.close_if_unusable_or_obsolete()
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def batched(iterable, size: int):
+    """
+    Lazily splits iterable into lists of given size, the last one can be shorter.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def abatched(iterable, size: int):
+    """
+    The same as batched, but accepts async iterables too.
+    """
+    if not hasattr(iterable, "__aiter__"):
+        for chunk in batched(iterable, size):
+            yield chunk
+        return
+
+    chunk = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_priority(kwargs: dict, default: int) -> int:
+    priority = kwargs.pop("priority", default)
+
+    if not isinstance(priority, int):
+        raise TypeError("'priority' should be int")
+
+    return priority
 
 
 def get_eta(kwargs: dict) -> datetime | None:
@@ -1,10 +1,24 @@
 from django.contrib import admin
 
-from django_firefly_tasks.models import TaskModel
+from django_firefly_tasks.models import TaskArchive, TaskModel
 
 
 class TaskAdmin(admin.ModelAdmin):
     pass
 
 
+class TaskArchiveAdmin(admin.ModelAdmin):
+    list_display = ["id", "func_name", "queue", "status", "created", "completed", "failed", "archived"]
+    list_filter = ["status", "queue"]
+    search_fields = ["func_name"]
+
+    # archive is a history, tasks are neither added nor edited there
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(TaskModel, TaskAdmin)
+admin.site.register(TaskArchive, TaskArchiveAdmin)
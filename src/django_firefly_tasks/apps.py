@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DjangFireflyTasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "django_firefly_tasks"
+
+    def ready(self):
+        from ._private.registry import autodiscover_tasks
+
+        autodiscover_tasks()
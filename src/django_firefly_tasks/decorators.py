@@ -1,41 +1,196 @@
 import functools
+from typing import Callable
 
-from ._private.consts import DEFAULT_QUEUE, MAX_RETRIES, RETRY_DELAY
-from ._private.utils import get_eta, get_func_path, is_async, serialize_object
+from asgiref.sync import sync_to_async
+
+from ._private.compression import check_compression
+from ._private.consts import (
+    DEFAULT_QUEUE,
+    MAX_RETRIES,
+    RETRY_DELAY,
+    SCHEDULE_BATCH_SIZE,
+    TASK_COMPRESSION,
+    TASK_SERIALIZER,
+)
+from ._private.dedup import (
+    check_on_duplicate,
+    create_tasks,
+    get_dedup_key,
+    save_unique_task,
+)
+from ._private.deferred import (  # noqa: F401
+    adefer_task,
+    defer_task,
+    deferred_scheduling,
+)
+from ._private.notify import anotify_on_commit, notify_on_commit
+from ._private.registry import register
+from ._private.results import apply_cached_results, get_result_key, register_cached
+from ._private.utils import (
+    abatched,
+    batched,
+    get_eta,
+    get_priority,
+    is_async,
+)
 from .exceptions import AsyncFuncNotSupportedException, SyncFuncNotSupportedException
 from .models import Status, TaskModel
+from .serializers import get_serializer
+
+
+def new_task(
+    func_name: str,
+    queue: str,
+    priority: int,
+    max_retries: int,
+    retry_delay: int,
+    serializer: str,
+    compression: str | None,
+    unique_key: bool | Callable | None,
+    cache_result: bool,
+    args,
+    kwargs: dict,
+) -> TaskModel:
+    """
+    Builds task without saving it.
+    Task with cache_result is unique by its params, result key is its dedup_key.
+    """
+    # eta, priority and unique_key are popped, so caller's kwargs are left untouched
+    kwargs = dict(kwargs)
+    eta = get_eta(kwargs)
+    priority = get_priority(kwargs, priority)
+    dedup_key = get_dedup_key(func_name, serializer, kwargs, unique_key, args)
+    if cache_result:
+        if dedup_key:
+            raise ValueError("cache_result task is unique by its params, unique_key can't be set")
+        dedup_key = get_result_key(func_name, serializer, args, kwargs)
 
+    task = TaskModel(
+        func_name=func_name,
+        serializer=serializer,
+        compression=compression,
+        not_before=eta,
+        queue=queue,
+        priority=priority,
+        dedup_key=dedup_key,
+        status=Status.CREATED,
+        retry_delay=retry_delay,
+        max_retries=max_retries,
+    )
+    task.params = {"args": tuple(args), "kwargs": kwargs}
+    return task
 
-def task(queue: str = DEFAULT_QUEUE, max_retries: int = MAX_RETRIES, retry_delay: int = RETRY_DELAY):
+
+def task(
+    queue: str = DEFAULT_QUEUE,
+    max_retries: int = MAX_RETRIES,
+    retry_delay: int = RETRY_DELAY,
+    serializer: str = TASK_SERIALIZER,
+    compression: str | None = TASK_COMPRESSION,
+    name: str | None = None,
+    priority: int = 0,
+    unique_key: bool | Callable | None = None,
+    on_duplicate: str = "ignore",
+    cache_result: bool = False,
+    cache_ttl: int | None = None,
+):
     """
     Creates task to consume.
 
     :param str queue: the queue in which the task will be placed
     :param int max_retries: max retries on fail
     :param int retry_delay: delay in seconds between restarts
+    :param str serializer: serializer of params and returned data, name or dotted path
+    :param str compression: "zlib" or "lzma" compression of params and returned data above threshold
+    :param str name: stable task name, function's dotted path by default
+    :param int priority: tasks with higher priority are consumed first, can be overridden by priority kwarg of schedule
+    :param unique_key: True or callable taking task's args, task isn't scheduled again while one with the same key
+        is pending, can be passed as unique_key kwarg of schedule too
+    :param str on_duplicate: "ignore" keeps pending task, "replace" replaces it with the new one
+    :param bool cache_result: result is cached by params, schedule returns completed task when it's cached
+        and pending task with the same params is shared
+    :param int cache_ttl: seconds to keep cached result, cache's default timeout by default
     """
+    # fails right away on unknown serializer or compression
+    get_serializer(serializer)
+    check_compression(compression)
+    check_on_duplicate(on_duplicate)
+    if cache_result and unique_key:
+        raise ValueError("cache_result task is unique by its params, unique_key can't be set")
 
     def decorator(func):
+        func_name = register(func, name)
+        if cache_result:
+            register_cached(func_name, cache_ttl)
+
         def schedule(*args, **kwargs):
             if is_async(func):
                 raise AsyncFuncNotSupportedException
 
-            eta = get_eta(kwargs)
+            task = new_task(
+                func_name,
+                queue,
+                priority,
+                max_retries,
+                retry_delay,
+                serializer,
+                compression,
+                unique_key,
+                cache_result,
+                args,
+                kwargs,
+            )
+            if cache_result:
+                apply_cached_results([task])
+            # pending duplicate has to be looked up, so unique task isn't deferred
+            if task.status == Status.COMPLETED:
+                task.save(force_insert=True)
+            elif task.dedup_key:
+                task = save_unique_task(task, on_duplicate)
+                notify_on_commit(queue)
+            elif not defer_task(task):
+                task.save(force_insert=True)
+                notify_on_commit(queue)
+            return task
+
+        def schedule_many(params, batch_size: int = SCHEDULE_BATCH_SIZE) -> list[int | None]:
+            """
+            Schedules task for every (args, kwargs) pair, params can be a generator.
+            Tasks are inserted in chunks of batch_size, so huge amounts don't have to fit in memory.
+            Returns IDs of created tasks, None on backends which can't return them from bulk insert.
+            Unique tasks with pending duplicate get its ID.
+            """
+            if is_async(func):
+                raise AsyncFuncNotSupportedException
+
+            ids = []
 
-            func_name = get_func_path(func)
-            serialized_params = serialize_object({"args": args, "kwargs": kwargs})
+            for chunk in batched(params, batch_size):
+                tasks = [
+                    new_task(
+                        func_name,
+                        queue,
+                        priority,
+                        max_retries,
+                        retry_delay,
+                        serializer,
+                        compression,
+                        unique_key,
+                        cache_result,
+                        args,
+                        kwargs,
+                    )
+                    for args, kwargs in chunk
+                ]
+                if cache_result:
+                    apply_cached_results(tasks)
+                ids.extend(create_tasks(tasks, on_duplicate))
+                notify_on_commit(queue)
 
-            return TaskModel.objects.create(
-                func_name=func_name,
-                raw_params=serialized_params,
-                not_before=eta,
-                queue=queue,
-                status=Status.CREATED,
-                retry_delay=retry_delay,
-                max_retries=max_retries,
-            )
+            return ids
 
         func.schedule = schedule
+        func.schedule_many = schedule_many
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
@@ -46,36 +201,111 @@ def task(queue: str = DEFAULT_QUEUE, max_retries: int = MAX_RETRIES, retry_delay
     return decorator
 
 
-def atask(queue: str = DEFAULT_QUEUE, max_retries: int = MAX_RETRIES, retry_delay: int = RETRY_DELAY):
+def atask(
+    queue: str = DEFAULT_QUEUE,
+    max_retries: int = MAX_RETRIES,
+    retry_delay: int = RETRY_DELAY,
+    serializer: str = TASK_SERIALIZER,
+    compression: str | None = TASK_COMPRESSION,
+    name: str | None = None,
+    priority: int = 0,
+    unique_key: bool | Callable | None = None,
+    on_duplicate: str = "ignore",
+    cache_result: bool = False,
+    cache_ttl: int | None = None,
+):
     """
     Creates async task to consume.
 
     :param str queue: the queue in which the task will be placed
     :param int max_retries: max retries on fail
     :param int retry_delay: delay in seconds between restarts
+    :param str serializer: serializer of params and returned data, name or dotted path
+    :param str compression: "zlib" or "lzma" compression of params and returned data above threshold
+    :param str name: stable task name, function's dotted path by default
+    :param int priority: tasks with higher priority are consumed first, can be overridden by priority kwarg of schedule
+    :param unique_key: True or callable taking task's args, task isn't scheduled again while one with the same key
+        is pending, can be passed as unique_key kwarg of schedule too
+    :param str on_duplicate: "ignore" keeps pending task, "replace" replaces it with the new one
+    :param bool cache_result: result is cached by params, schedule returns completed task when it's cached
+        and pending task with the same params is shared
+    :param int cache_ttl: seconds to keep cached result, cache's default timeout by default
     """
+    get_serializer(serializer)
+    check_compression(compression)
+    check_on_duplicate(on_duplicate)
+    if cache_result and unique_key:
+        raise ValueError("cache_result task is unique by its params, unique_key can't be set")
 
     def decorator(func):
+        func_name = register(func, name)
+        if cache_result:
+            register_cached(func_name, cache_ttl)
+
         async def schedule(*args, **kwargs):
             if not is_async(func):
                 raise SyncFuncNotSupportedException
 
-            eta = get_eta(kwargs)
+            task = new_task(
+                func_name,
+                queue,
+                priority,
+                max_retries,
+                retry_delay,
+                serializer,
+                compression,
+                unique_key,
+                cache_result,
+                args,
+                kwargs,
+            )
+            if cache_result:
+                await sync_to_async(apply_cached_results)([task])
+            if task.status == Status.COMPLETED:
+                await task.asave(force_insert=True)
+            elif task.dedup_key:
+                task = await sync_to_async(save_unique_task)(task, on_duplicate)
+                await anotify_on_commit(queue)
+            elif not await adefer_task(task):
+                await task.asave(force_insert=True)
+                await anotify_on_commit(queue)
+            return task
+
+        async def schedule_many(params, batch_size: int = SCHEDULE_BATCH_SIZE) -> list[int | None]:
+            """
+            Async version of task's schedule_many, params can be an async generator too.
+            """
+            if not is_async(func):
+                raise SyncFuncNotSupportedException
+
+            ids = []
 
-            func_name = get_func_path(func)
-            serialized_params = serialize_object({"args": args, "kwargs": kwargs})
+            async for chunk in abatched(params, batch_size):
+                tasks = [
+                    new_task(
+                        func_name,
+                        queue,
+                        priority,
+                        max_retries,
+                        retry_delay,
+                        serializer,
+                        compression,
+                        unique_key,
+                        cache_result,
+                        args,
+                        kwargs,
+                    )
+                    for args, kwargs in chunk
+                ]
+                if cache_result:
+                    await sync_to_async(apply_cached_results)(tasks)
+                ids.extend(await sync_to_async(create_tasks)(tasks, on_duplicate))
+                await anotify_on_commit(queue)
 
-            return await TaskModel.objects.acreate(
-                func_name=func_name,
-                raw_params=serialized_params,
-                not_before=eta,
-                queue=queue,
-                status=Status.CREATED,
-                retry_delay=retry_delay,
-                max_retries=max_retries,
-            )
+            return ids
 
         func.schedule = schedule
+        func.schedule_many = schedule_many
 
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
@@ -8,3 +8,9 @@ class SyncFuncNotSupportedException(Exception):
     """
     Sync function not supported, call @task.
     """
+
+
+class TaskNameConflictException(Exception):
+    """
+    Another function is already registered under the task name, pass unique name.
+    """
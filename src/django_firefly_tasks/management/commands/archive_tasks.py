@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from django_firefly_tasks._private.consts import ARCHIVE_BATCH_SIZE
+from django_firefly_tasks._private.maintenance import (
+    add_retention_arguments,
+    archive_tasks,
+    retention_options,
+)
+from django_firefly_tasks._private.utils import logger
+
+
+class Command(BaseCommand):
+    help = "Moves finished tasks to the archive in batches."
+
+    def add_arguments(self, parser):
+        add_retention_arguments(parser, batch_size=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        archived = archive_tasks(**retention_options(options))
+
+        logger.info(f"Archived tasks: {archived}")
@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from django_firefly_tasks._private.bench import BENCH_QUEUE, SCENARIOS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = f"Measures schedule and consume rate, latency and queries per task in {BENCH_QUEUE} queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            choices=SCENARIOS,
+            nargs="+",
+            default=list(SCENARIOS),
+            help="Scenarios to run. All by default.",
+        )
+        parser.add_argument(
+            "--tasks",
+            type=int,
+            default=1000,
+            help="Number of tasks per scenario, sleeping and latency ones get a tenth of it.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Batch size of schedule_many and consumer.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.01,
+            help="Seconds slept by I/O tasks.",
+        )
+        parser.add_argument(
+            "--max-inflight",
+            type=int,
+            default=10,
+            help="Max inflight tasks of async consumer.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=100,
+            help="Tasks scheduled per second in latency scenario.",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Prints results as JSON, so runs can be compared.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Also writes JSON results to this file.",
+        )
+
+    def handle(self, *args, **options):
+        report = run_benchmark(
+            options["scenario"],
+            options["tasks"],
+            options["batch_size"],
+            options["sleep"],
+            options["max_inflight"],
+            options["rate"],
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        environment = report["environment"]
+        self.stdout.write(
+            f"{environment['database']} {environment['database_version']}, "
+            f"Python {environment['python']}, Django {environment['django']}"
+        )
+        for name, result in report["results"].items():
+            values = ", ".join(f"{key} {value}" for key, value in result.items())
+            self.stdout.write(f"{name:<16} {values}")
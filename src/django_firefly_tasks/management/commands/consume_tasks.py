@@ -1,7 +1,20 @@
-from django.core.management.base import BaseCommand
+import threading
 
-from django_firefly_tasks._private.consts import DEFAULT_QUEUE
-from django_firefly_tasks._private.consumers import task_consumer
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from django_firefly_tasks._private import metrics, profiling
+from django_firefly_tasks._private.consts import (
+    CONSUMER_BATCH_SIZE,
+    DEFAULT_QUEUE,
+    METRICS_DIR,
+)
+from django_firefly_tasks._private.consumers import (
+    handle_stop_signals,
+    process_task_consumer,
+    run_task_consumer,
+)
+from django_firefly_tasks._private.queues import parse_queue
 
 
 class Command(BaseCommand):
@@ -10,14 +23,107 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             "--queue",
+            type=parse_queue,
+            action="append",
+            help="Queue to consume from, with optional weight (emails:5). Repeat it for more queues. "
+            "Default queue if left empty.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CONSUMER_BATCH_SIZE,
+            help="Number of tasks claimed per database round trip.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of consumer threads, each one with its own database connection.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of forked consumer processes, each one running --concurrency threads.",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_async",
+            help="Runs tasks in single event loop, async ones as coroutines and sync ones in threads.",
+        )
+        parser.add_argument(
+            "--max-inflight",
+            type=int,
+            default=10,
+            help="Number of tasks running at once in --async mode.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serves metrics in Prometheus text format on this port.",
+        )
+        parser.add_argument(
+            "--profile-func",
+            type=str,
+            help="Profiles tasks with function name matching this pattern (e.g. app.tasks.*) with cProfile.",
+        )
+        parser.add_argument(
+            "--profile-sample-rate",
+            type=float,
+            default=1.0,
+            help="Fraction of matching tasks to profile, from 0 to 1.",
+        )
+        parser.add_argument(
+            "--profile-dir",
             type=str,
-            help="Queue to consume from. Default queue if left empty.",
+            default="firefly_profiles",
+            help="Directory for .prof files and SQL query stats of profiled tasks.",
+        )
+        parser.add_argument(
+            "--profile-aggregate",
+            action="store_true",
+            help="Sums profiles per function instead of writing file per task.",
         )
 
     def handle(self, *args, **options):
-        queue = options["queue"] or DEFAULT_QUEUE
+        queue = dict(options["queue"]) if options["queue"] else DEFAULT_QUEUE
+        max_inflight = options["max_inflight"] if options["use_async"] else None
+        if max_inflight and options["concurrency"] > 1:
+            raise CommandError(
+                "--async runs tasks concurrently on its own, use --max-inflight instead of --concurrency"
+            )
+        # SQLite locks whole database and claim's transaction fails right away instead of waiting for it
+        if connection.vendor == "sqlite" and options["concurrency"] > 1:
+            raise CommandError("SQLite doesn't support concurrent consumers, --concurrency needs other database")
+        if connection.vendor == "sqlite" and options["processes"] > 1:
+            raise CommandError("SQLite doesn't support concurrent consumers, --processes needs other database")
+
+        if options["metrics_port"] is not None:
+            if options["processes"] > 1 and not METRICS_DIR:
+                raise CommandError("--metrics-port with --processes needs settings.METRICS_DIR to collect metrics")
+            metrics.enable()
+            metrics.start_metrics_server(options["metrics_port"])
+
+        if options["profile_func"]:
+            if not 0 < options["profile_sample_rate"] <= 1:
+                raise CommandError("--profile-sample-rate has to be above 0 and at most 1")
+            profiling.enable(
+                options["profile_func"],
+                options["profile_sample_rate"],
+                options["profile_dir"],
+                options["profile_aggregate"],
+            )
+
+        stop_event = threading.Event()
+        handle_stop_signals(stop_event)
 
         try:
-            task_consumer(queue)
+            if options["processes"] > 1:
+                process_task_consumer(
+                    queue, options["processes"], options["batch_size"], options["concurrency"], stop_event, max_inflight
+                )
+            else:
+                run_task_consumer(queue, options["batch_size"], options["concurrency"], stop_event, max_inflight)
         except KeyboardInterrupt:
             pass
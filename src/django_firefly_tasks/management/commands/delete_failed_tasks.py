@@ -1,14 +1,20 @@
 from django.core.management.base import BaseCommand
 
-from django_firefly_tasks._private.utils import logger
-from django_firefly_tasks.models import Status, TaskModel
+from django_firefly_tasks._private.maintenance import (
+    add_archive_argument,
+    add_retention_arguments,
+    delete_tasks,
+    retention_options,
+)
+from django_firefly_tasks.models import Status
 
 
 class Command(BaseCommand):
-    help = "Deletes failed tasks."
+    help = "Deletes failed tasks in batches."
 
-    def handle(self, *args, **options):
-        ids = list(TaskModel.objects.filter(status=Status.FAILED).values_list("pk"))
-        TaskModel.objects.filter(status=Status.FAILED).delete()
+    def add_arguments(self, parser):
+        add_retention_arguments(parser)
+        add_archive_argument(parser)
 
-        logger.info(f"Deleted failed tasks: {ids}")
+    def handle(self, *args, **options):
+        delete_tasks(Status.FAILED, archive=options["archive"], **retention_options(options))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from django_firefly_tasks._private.compression import CODECS
+from django_firefly_tasks._private.consts import (
+    TASK_COMPRESSION,
+    TASK_COMPRESSION_THRESHOLD,
+)
+from django_firefly_tasks._private.maintenance import recompress_tasks
+from django_firefly_tasks._private.utils import logger
+
+
+class Command(BaseCommand):
+    help = "Recompresses params and returned data of existing tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compression",
+            choices=[*CODECS, "none"],
+            default=TASK_COMPRESSION or "none",
+            help="Codec to recompress with, none decompresses. settings.TASK_COMPRESSION by default.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=TASK_COMPRESSION_THRESHOLD,
+            help="Data smaller than threshold in bytes is left uncompressed.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of tasks updated per transaction.",
+        )
+        parser.add_argument(
+            "--queue",
+            type=str,
+            help="Queue to recompress. All queues if left empty.",
+        )
+
+    def handle(self, *args, **options):
+        compression = None if options["compression"] == "none" else options["compression"]
+        recompressed = recompress_tasks(compression, options["threshold"], options["batch_size"], options["queue"])
+
+        logger.info(f"Recompressed tasks: {recompressed}")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from django_firefly_tasks._private.maintenance import parse_age
+from django_firefly_tasks._private.stats import PERCENTILES, get_task_stats
+
+
+class Command(BaseCommand):
+    help = "Reports wait and run time percentiles of finished tasks per function and queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=parse_age,
+            default=parse_age("1d"),
+            help="Only tasks started within this age, in seconds or with s, m, h or d unit. Default 1d.",
+        )
+        parser.add_argument(
+            "--queue",
+            type=str,
+            help="Queue of tasks. All queues if left empty.",
+        )
+        parser.add_argument(
+            "--func",
+            type=str,
+            help="Function name of tasks. All functions if left empty.",
+        )
+
+    def handle(self, *args, **options):
+        stats = get_task_stats(options["since"], options["queue"], options["func"])
+        if not stats:
+            self.stdout.write("No finished tasks")
+            return
+
+        columns = ["func_name", "queue", "count"]
+        columns += [f"wait_p{percent}" for percent in PERCENTILES] + [f"run_p{percent}" for percent in PERCENTILES]
+        rows = [columns] + [[str(row[column]) for column in columns] for row in stats]
+        widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+
+        self.stdout.write("Times in milliseconds")
+        for row in rows:
+            cells = [
+                value.ljust(width) if index < 2 else value.rjust(width)
+                for index, (value, width) in enumerate(zip(row, widths))
+            ]
+            self.stdout.write("  ".join(cells).rstrip())
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+import django_firefly_tasks._private.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=django_firefly_tasks._private.indexes.NullsFirstIndex(
+                condition=models.Q(("status", "created")),
+                fields=["queue", "status", "not_before", "id"],
+                name="firefly_task_claim_idx",
+                nulls_first=("not_before",),
+            ),
+        ),
+    ]
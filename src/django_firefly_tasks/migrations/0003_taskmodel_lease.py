@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0002_taskmodel_claim_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskmodel",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="locked_by",
+            field=models.CharField(blank=True, max_length=400, null=True),
+        ),
+        migrations.AlterField(
+            model_name="taskmodel",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("created", "Created"),
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                default="created",
+                max_length=400,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=models.Index(
+                condition=models.Q(("status", "running")),
+                fields=["status", "lease_expires_at"],
+                name="firefly_task_lease_idx",
+            ),
+        ),
+    ]
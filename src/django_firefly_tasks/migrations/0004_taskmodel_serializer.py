@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0003_taskmodel_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskmodel",
+            name="params_data",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="returned_data",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="serializer",
+            field=models.CharField(blank=True, max_length=400, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0004_taskmodel_serializer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskmodel",
+            name="compression",
+            field=models.CharField(blank=True, max_length=400, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0005_taskmodel_compression"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=models.Index(
+                condition=models.Q(("status", "completed")),
+                fields=["completed", "id"],
+                name="firefly_task_completed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=models.Index(
+                condition=models.Q(("status", "failed")), fields=["failed", "id"], name="firefly_task_failed_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0006_taskmodel_retention_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskArchive",
+            fields=[
+                ("func_name", models.CharField(max_length=400)),
+                ("queue", models.CharField(max_length=400)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="created",
+                        max_length=400,
+                    ),
+                ),
+                ("completed", models.DateTimeField(blank=True, null=True)),
+                ("failed", models.DateTimeField(blank=True, null=True)),
+                ("not_before", models.DateTimeField(blank=True, null=True)),
+                ("raw_params", models.TextField(blank=True, null=True)),
+                ("raw_returned", models.TextField(blank=True, null=True)),
+                ("serializer", models.CharField(blank=True, max_length=400, null=True)),
+                ("compression", models.CharField(blank=True, max_length=400, null=True)),
+                ("params_data", models.BinaryField(blank=True, null=True)),
+                ("returned_data", models.BinaryField(blank=True, null=True)),
+                ("retry_attempts", models.IntegerField(default=0)),
+                ("retry_delay", models.IntegerField(default=0)),
+                ("max_retries", models.IntegerField()),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("created", models.DateTimeField()),
+                ("archived", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Archived task",
+                "verbose_name_plural": "Archived tasks",
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0007_taskarchive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskarchive",
+            name="attempt_history",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskarchive",
+            name="duration_ms",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskarchive",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskarchive",
+            name="worker_id",
+            field=models.CharField(blank=True, max_length=400, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="attempt_history",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="duration_ms",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="worker_id",
+            field=models.CharField(blank=True, max_length=400, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=models.Index(fields=["started_at"], name="firefly_task_started_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=models.Index(fields=["func_name", "queue", "started_at"], name="firefly_task_func_idx"),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+import django_firefly_tasks._private.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0008_task_run_info"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskarchive",
+            name="priority",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="taskmodel",
+            name="priority",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="taskmodel",
+            index=django_firefly_tasks._private.indexes.NullsFirstIndex(
+                condition=models.Q(("status", "created")),
+                fields=["queue", "status", "-priority", "not_before", "id"],
+                name="firefly_task_priority_idx",
+                nulls_first=("not_before",),
+            ),
+        ),
+    ]
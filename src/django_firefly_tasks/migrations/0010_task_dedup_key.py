@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0009_task_priority"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskmodel",
+            name="dedup_key",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="taskmodel",
+            constraint=models.UniqueConstraint(
+                fields=("func_name", "dedup_key"),
+                name="firefly_task_dedup_key",
+            ),
+        ),
+    ]
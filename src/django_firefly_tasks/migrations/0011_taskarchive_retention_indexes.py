@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0010_task_dedup_key"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskarchive",
+            index=models.Index(
+                condition=models.Q(("status", "completed")),
+                fields=["completed", "id"],
+                name="firefly_archive_completed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskarchive",
+            index=models.Index(
+                condition=models.Q(("status", "failed")), fields=["failed", "id"], name="firefly_archive_failed_idx"
+            ),
+        ),
+    ]
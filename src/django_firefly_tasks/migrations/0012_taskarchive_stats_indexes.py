@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_firefly_tasks", "0011_taskarchive_retention_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskarchive",
+            index=models.Index(fields=["started_at"], name="firefly_archive_started_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="taskarchive",
+            index=models.Index(fields=["func_name", "queue", "started_at"], name="firefly_archive_func_idx"),
+        ),
+    ]
@@ -1,22 +1,63 @@
 from datetime import timedelta
 
+from asgiref.sync import sync_to_async
 from django.db import models
 from django.utils import timezone
 
-from ._private.utils import deserialize_object
+from ._private.compression import compress, decompress
+from ._private.consts import (
+    ARCHIVE_MODE,
+    ATTEMPT_HISTORY_SIZE,
+    TASK_COMPRESSION_THRESHOLD,
+    TASK_SERIALIZER,
+)
+from ._private.indexes import NullsFirstIndex
+from ._private.utils import archive_released_tasks, deserialize_object
+from .serializers import get_serializer
 
 
 class Status(models.TextChoices):
     CREATED = "created"
+    RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
 
 
-class TaskModel(models.Model):
+# longer error messages in attempt history are cut
+ATTEMPT_ERROR_LENGTH = 200
+
+# max length of unique key of task
+DEDUP_KEY_LENGTH = 255
+
+# fields written back when consumer releases the task
+RELEASE_FIELDS = [
+    "status",
+    "completed",
+    "failed",
+    "not_before",
+    "serializer",
+    "returned_data",
+    "retry_attempts",
+    "worker_id",
+    "started_at",
+    "duration_ms",
+    "attempt_history",
+    "locked_by",
+    "lease_expires_at",
+]
+
+
+class BaseTaskModel(models.Model):
+    """
+    Fields and data handling shared by queued and archived tasks.
+    """
+
     # func name with path in dot notation
     func_name = models.CharField(max_length=400)
     # target queue
     queue = models.CharField(max_length=400)
+    # tasks with higher priority are consumed first
+    priority = models.IntegerField(default=0)
     status = models.CharField(choices=Status.choices, default=Status.CREATED, max_length=400)
 
     created = models.DateTimeField(auto_now_add=True)
@@ -25,11 +66,24 @@ class TaskModel(models.Model):
     # data before functions cannot be executed.
     not_before = models.DateTimeField(null=True, blank=True)
 
-    # serialized params to base64
+    # legacy params and returned data, pickled and encoded to base64
     raw_params = models.TextField(null=True, blank=True)
-    # serialized returned data to base64
     raw_returned = models.TextField(null=True, blank=True)
 
+    # serializer of params_data and returned_data, name or dotted path
+    serializer = models.CharField(max_length=400, null=True, blank=True)
+    # codec of params_data and returned_data above threshold, compressed data has a header with codec id
+    compression = models.CharField(max_length=400, null=True, blank=True)
+    params_data = models.BinaryField(null=True, blank=True)
+    returned_data = models.BinaryField(null=True, blank=True)
+
+    # consumer which ran the task last time (host:pid) and when and how long it ran
+    worker_id = models.CharField(max_length=400, null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.IntegerField(null=True, blank=True)
+    # the latest attempts, oldest first, up to settings.ATTEMPT_HISTORY_SIZE
+    attempt_history = models.JSONField(null=True, blank=True)
+
     retry_attempts = models.IntegerField(default=0)
     # delay in seconds between restarts
     retry_delay = models.IntegerField(default=0)
@@ -37,23 +91,123 @@ class TaskModel(models.Model):
     max_retries = models.IntegerField()
 
     class Meta:
-        verbose_name = "Task"
-        verbose_name_plural = "Tasks"
+        abstract = True
 
     @property
     def params(self):
+        if self.params_data is not None:
+            return self.load(self.params_data)
         if not self.raw_params:
             return
 
         return deserialize_object(self.raw_params)
 
+    @params.setter
+    def params(self, params: dict):
+        self.params_data = self.dump(params)
+
     @property
     def returned(self):
+        if self.returned_data is not None:
+            return self.load(self.returned_data)
         if not self.raw_returned:
             return
 
         return deserialize_object(self.raw_returned)
 
+    @returned.setter
+    def returned(self, returned):
+        self.returned_data = self.dump(returned) if returned else None
+
+    def dump(self, obj) -> bytes:
+        # legacy task gets serializer on the first run
+        self.serializer = self.serializer or TASK_SERIALIZER
+        data = get_serializer(self.serializer).dumps(obj)
+        return compress(data, self.compression, TASK_COMPRESSION_THRESHOLD)
+
+    def load(self, data: bytes):
+        data = bytes(data)
+        if self.compression:
+            data = decompress(data)
+        return get_serializer(self.serializer).loads(data)
+
+    def get_wait_time(self) -> timedelta | None:
+        """
+        Time the last run waited in the queue since the task was due.
+        """
+        if not self.started_at:
+            return None
+        return self.started_at - max(self.created, self.not_before or self.created)
+
+
+class TaskModel(BaseTaskModel):
+    # consumer which holds the task while it's running
+    locked_by = models.CharField(max_length=400, null=True, blank=True)
+    # running task is requeued when its lease expires, e.g. consumer crashed
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    # key of pending unique task, the same function isn't scheduled again with the same key,
+    # cleared once consumer takes the task, shorter than other fields, so unique index with func_name
+    # fits MySQL's key length limit
+    dedup_key = models.CharField(max_length=DEDUP_KEY_LENGTH, null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Task"
+        verbose_name_plural = "Tasks"
+        indexes = [
+            # serves get_latest_tasks straight from the index, partial on backends which support it
+            NullsFirstIndex(
+                fields=["queue", "status", "-priority", "not_before", "id"],
+                nulls_first=["not_before"],
+                condition=models.Q(status=Status.CREATED),
+                name="firefly_task_priority_idx",
+            ),
+            # the same without priority, for the nearest postponed task and the longest waiting ones (aging)
+            NullsFirstIndex(
+                fields=["queue", "status", "not_before", "id"],
+                nulls_first=["not_before"],
+                condition=models.Q(status=Status.CREATED),
+                name="firefly_task_claim_idx",
+            ),
+            models.Index(
+                fields=["status", "lease_expires_at"],
+                condition=models.Q(status=Status.RUNNING),
+                name="firefly_task_lease_idx",
+            ),
+            # retention deletes oldest finished tasks in chunks
+            models.Index(
+                fields=["completed", "id"],
+                condition=models.Q(status=Status.COMPLETED),
+                name="firefly_task_completed_idx",
+            ),
+            models.Index(
+                fields=["failed", "id"],
+                condition=models.Q(status=Status.FAILED),
+                name="firefly_task_failed_idx",
+            ),
+            # task_stats reads tasks run in given time window, optionally of one function
+            models.Index(fields=["started_at"], name="firefly_task_started_idx"),
+            models.Index(fields=["func_name", "queue", "started_at"], name="firefly_task_func_idx"),
+        ]
+        constraints = [
+            # pending unique task is scheduled once, however many producers try at the same time,
+            # not partial, so it exists on MySQL too, tasks without key have NULL there which don't collide
+            models.UniqueConstraint(fields=["func_name", "dedup_key"], name="firefly_task_dedup_key"),
+        ]
+
+    def set_as_started(self, worker_id: str):
+        self.worker_id = worker_id
+        self.started_at = timezone.now()
+
+    def set_run_time(self, duration: float, error: Exception | None = None):
+        """
+        Sets duration of the run and adds it to bounded attempt history.
+        """
+        self.duration_ms = round(duration * 1000)
+        attempt = {"started_at": self.started_at.isoformat(), "ms": self.duration_ms, "worker": self.worker_id}
+        if error is not None:
+            attempt["error"] = f"{type(error).__name__}: {error}"[:ATTEMPT_ERROR_LENGTH]
+        self.attempt_history = [*(self.attempt_history or []), attempt][-ATTEMPT_HISTORY_SIZE:]
+
     def set_as_failed(self):
         self.status = Status.FAILED
         self.failed = timezone.now()
@@ -69,5 +223,71 @@ class TaskModel(models.Model):
         return self.not_before and timezone.now() < self.not_before
 
     def setup_for_restart(self):
+        self.status = Status.CREATED
         self.retry_attempts += +1
         self.not_before = timezone.now() + timedelta(seconds=self.retry_delay)
+
+    def is_finished(self) -> bool:
+        return self.status in (Status.COMPLETED, Status.FAILED)
+
+    def is_archived_on_release(self) -> bool:
+        return ARCHIVE_MODE == "inline" and self.is_finished()
+
+    def release(self) -> bool:
+        """
+        Saves task state and releases its lease in single conditional UPDATE, finished task is moved
+        to the archive instead in inline archive mode.
+        Returns False if lease was lost in the meantime, e.g. it expired and task was requeued.
+        """
+        if self.is_archived_on_release():
+            return bool(archive_released_tasks([self]))
+        return bool(self._release_queryset().update(**self._release_values()))
+
+    async def arelease(self) -> bool:
+        if self.is_archived_on_release():
+            return bool(await sync_to_async(archive_released_tasks)([self]))
+        return bool(await self._release_queryset().aupdate(**self._release_values()))
+
+    def _release_queryset(self):
+        return TaskModel.objects.filter(pk=self.pk, locked_by=self.locked_by)
+
+    def _release_values(self) -> dict:
+        self.locked_by = None
+        self.lease_expires_at = None
+        return {field: getattr(self, field) for field in RELEASE_FIELDS}
+
+
+class TaskArchive(BaseTaskModel):
+    """
+    Finished task moved out of the queue table, it keeps id of the original task.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    # copied from the task, not set on insert
+    created = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Archived task"
+        verbose_name_plural = "Archived tasks"
+        indexes = [
+            # retention deletes oldest archived tasks in chunks, like in the queue table
+            models.Index(
+                fields=["completed", "id"],
+                condition=models.Q(status=Status.COMPLETED),
+                name="firefly_archive_completed_idx",
+            ),
+            models.Index(
+                fields=["failed", "id"],
+                condition=models.Q(status=Status.FAILED),
+                name="firefly_archive_failed_idx",
+            ),
+            # task_stats reads archived tasks run in given time window too
+            models.Index(fields=["started_at"], name="firefly_archive_started_idx"),
+            models.Index(fields=["func_name", "queue", "started_at"], name="firefly_archive_func_idx"),
+        ]
+
+    @classmethod
+    def from_task(cls, task: TaskModel) -> "TaskArchive":
+        copied = [field.attname for field in cls._meta.concrete_fields if field.name not in ("id", "archived")]
+        return cls(id=task.pk, **{attname: getattr(task, attname) for attname in copied})
@@ -0,0 +1,75 @@
+import functools
+import json
+import marshal
+import pickle
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class Serializer:
+    """
+    Turns task params and returned data into bytes and back. Subclass it for custom format
+    and pass its dotted path as serializer name.
+    """
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+
+class PickleSerializer(Serializer):
+    """
+    Any picklable object, the most flexible one.
+    """
+
+    def dumps(self, obj) -> bytes:
+        return pickle.dumps(obj, protocol=5)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+class JSONSerializer(Serializer):
+    """
+    Portable and safe to load, but tuples come back as lists,
+    datetimes, decimals and UUIDs as strings.
+    """
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), cls=DjangoJSONEncoder).encode()
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class MarshalSerializer(Serializer):
+    """
+    Compact and fast binary format for builtin types only (no datetimes or custom classes).
+    Its format can change between Python versions, so keep consumers on the same version.
+    """
+
+    def dumps(self, obj) -> bytes:
+        return marshal.dumps(obj)
+
+    def loads(self, data: bytes):
+        return marshal.loads(data)
+
+
+SERIALIZERS = {
+    "pickle": PickleSerializer,
+    "json": JSONSerializer,
+    "marshal": MarshalSerializer,
+}
+
+
+@functools.cache
+def get_serializer(name: str) -> Serializer:
+    """
+    Serializer by its name or dotted path to Serializer subclass.
+    """
+    if name in SERIALIZERS:
+        return SERIALIZERS[name]()
+    return import_string(name)()
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from ._private.maintenance import delete_tasks
+from .decorators import task
+from .models import Status
+
+
+@task()
+def delete_finished_tasks(
+    status: str,
+    older_than: int | None = None,
+    queue: str | None = None,
+    batch_size: int = 1000,
+    max_batches: int = 10,
+    archive: bool = False,
+) -> int:
+    """
+    Deletes completed or failed tasks like delete_completed_tasks command, periodic cleanup for a task.
+    Task runs in a transaction, so single run deletes up to max_batches batches and schedules itself again
+    while there is more to delete, every run is a short transaction. older_than is in seconds,
+    with archive the tasks are deleted from the archive.
+    Returns number of tasks deleted by this run.
+    """
+    deleted = delete_tasks(
+        Status(status),
+        None if older_than is None else timedelta(seconds=older_than),
+        queue,
+        batch_size,
+        max_batches=max_batches,
+        archive=archive,
+    )
+    if deleted == batch_size * max_batches:
+        delete_finished_tasks.schedule(status, older_than, queue, batch_size, max_batches, archive)
+    return deleted
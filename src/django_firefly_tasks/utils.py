@@ -1,3 +1,11 @@
+from datetime import timedelta
+
+from ._private.consts import ARCHIVE_BATCH_SIZE
+from ._private.maintenance import archive_tasks as archive_finished_tasks
+from ._private.maintenance import delete_tasks
+from .models import Status, TaskArchive, TaskModel
+
+
 def task_as_dict(task) -> dict:
     """
     Simple dict repr of a task.
@@ -12,3 +20,79 @@ def task_as_dict(task) -> dict:
         "retry_delay": f"{task.retry_delay}s",
         "max_retries": task.max_retries,
     }
+
+
+def delete_completed_tasks(
+    older_than: timedelta | None = None,
+    queue: str | None = None,
+    batch_size: int = 1000,
+    sleep_between_batches: float = 0,
+    dry_run: bool = False,
+    max_batches: int | None = None,
+    archive: bool = False,
+) -> int:
+    """
+    Deletes completed tasks (from the archive with archive) in batches, the same as delete_completed_tasks command.
+    Task runs in a transaction, which would hold locks of all batches, use tasks.delete_finished_tasks from a task.
+    Returns number of deleted tasks (matching ones in dry run).
+    """
+    return delete_tasks(
+        Status.COMPLETED, older_than, queue, batch_size, sleep_between_batches, dry_run, max_batches, archive
+    )
+
+
+def delete_failed_tasks(
+    older_than: timedelta | None = None,
+    queue: str | None = None,
+    batch_size: int = 1000,
+    sleep_between_batches: float = 0,
+    dry_run: bool = False,
+    max_batches: int | None = None,
+    archive: bool = False,
+) -> int:
+    """
+    Deletes failed tasks (from the archive with archive) in batches, the same as delete_failed_tasks command.
+    Task runs in a transaction, which would hold locks of all batches, use tasks.delete_finished_tasks from a task.
+    Returns number of deleted tasks (matching ones in dry run).
+    """
+    return delete_tasks(
+        Status.FAILED, older_than, queue, batch_size, sleep_between_batches, dry_run, max_batches, archive
+    )
+
+
+def archive_tasks(
+    older_than: timedelta | None = None,
+    queue: str | None = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    sleep_between_batches: float = 0,
+    dry_run: bool = False,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Moves finished tasks to the archive in batches, the same as archive_tasks command.
+    Returns number of archived tasks (matching ones in dry run).
+    """
+    return archive_finished_tasks(older_than, queue, batch_size, sleep_between_batches, dry_run, max_batches)
+
+
+def get_task(pk: int) -> TaskModel | TaskArchive | None:
+    """
+    Task by id from the queue table or the archive, None when there is no such task.
+    """
+    # queue table goes first, task archived in between is found in the archive then
+    return TaskModel.objects.filter(pk=pk).first() or TaskArchive.objects.filter(pk=pk).first()
+
+
+async def aget_task(pk: int) -> TaskModel | TaskArchive | None:
+    return await TaskModel.objects.filter(pk=pk).afirst() or await TaskArchive.objects.filter(pk=pk).afirst()
+
+
+def filter_tasks(**filters) -> list[TaskModel | TaskArchive]:
+    """
+    Tasks matching filters from the queue table and the archive, sorted by id.
+    Both are loaded to memory, so keep filters narrow, e.g. queue and time range.
+    """
+    tasks = {task.pk: task for task in TaskModel.objects.filter(**filters)}
+    # archived copy wins, task could be archived between the queries
+    tasks.update((task.pk, task) for task in TaskArchive.objects.filter(**filters))
+    return [tasks[pk] for pk in sorted(tasks)]
@@ -1,3 +1,11 @@
-from django.shortcuts import render
+from django.http import HttpResponse
 
-# Create your views here.
+from ._private.metrics import CONTENT_TYPE, render_metrics
+
+
+def metrics(request):
+    """
+    Metrics in Prometheus text format, with settings.METRICS_DIR of all consumer processes.
+    It's not protected, so route it behind your auth or keep it internal.
+    """
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
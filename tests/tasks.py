@@ -1,4 +1,6 @@
 import asyncio
+import os
+import time
 
 from django.conf import settings
 
@@ -81,3 +83,86 @@ def schedule_task():
 async def async_schedule_task():
     await asyncio.sleep(0.0001)
     await async_add.schedule(1, 3)
+
+
+@task(queue="multi", max_retries=0, retry_delay=0)
+def sleep_and_create_foo(name: str, seconds: float):
+    time.sleep(seconds)
+    FooModel.objects.create(name=name)
+
+
+@atask(queue="multi", max_retries=0, retry_delay=0)
+async def async_sleep_and_create_foo(name: str, seconds: float):
+    await asyncio.sleep(seconds)
+    await FooModel.objects.acreate(name=name)
+
+
+@task(queue="multi", max_retries=0, retry_delay=0)
+def exit_process():
+    os._exit(1)
+
+
+@task(max_retries=0, serializer="json")
+def json_add(i: int, j: int) -> int:
+    return i + j
+
+
+@atask(max_retries=0, serializer="marshal")
+async def marshal_async_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(max_retries=0, serializer="tests.utils.PrefixedPickleSerializer")
+def prefixed_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(max_retries=0, compression="zlib")
+def zlib_echo(data: str) -> str:
+    return data
+
+
+@task(priority=10)
+def urgent_add(i: int, j: int) -> int:
+    return i + j
+
+
+@atask(priority=10)
+async def async_urgent_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(unique_key=True)
+def unique_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(unique_key=lambda user_id, full=False: f"user:{user_id}", on_duplicate="replace")
+def rebuild_cache(user_id: int, full: bool = False) -> bool:
+    return full
+
+
+@atask(unique_key=True)
+async def async_unique_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(max_retries=0, name="add_v1")
+def named_add(i: int, j: int) -> int:
+    return i + j
+
+
+@atask(max_retries=0, name="async_add_v1")
+async def named_async_add(i: int, j: int) -> int:
+    return i + j
+
+
+@task(cache_result=True, cache_ttl=60)
+def cached_add(i: int, j: int) -> int:
+    return i + j
+
+
+@atask(cache_result=True)
+async def async_cached_add(i: int, j: int) -> int:
+    await asyncio.sleep(0.0001)
+    return i + j
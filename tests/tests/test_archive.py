@@ -0,0 +1,150 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from django_firefly_tasks._private.consumers import (
+    REAPER_ARCHIVE_BATCHES,
+    claim_tasks,
+    reap_expired_tasks,
+)
+from django_firefly_tasks._private.processors import (
+    atask_processor,
+    tasks_processor,
+)
+from django_firefly_tasks._private.utils import requeue_expired_tasks
+from django_firefly_tasks.models import Status, TaskArchive, TaskModel
+from django_firefly_tasks.utils import (
+    aget_task,
+    delete_failed_tasks,
+    filter_tasks,
+    get_task,
+)
+from tests.tasks import add, async_add, failling, restarting_failling
+from tests.utils import process
+
+
+@patch("django_firefly_tasks.models.ARCHIVE_MODE", "inline")
+@patch("django_firefly_tasks._private.utils.ARCHIVE_MODE", "inline")
+class InlineArchiveTest(TestCase):
+    def test_finished_task_is_archived(self):
+        task = add.schedule(1, 3)
+        created = TaskModel.objects.get(pk=task.pk).created
+
+        process(task)
+
+        self.assertFalse(TaskModel.objects.exists())
+        archived = TaskArchive.objects.get(pk=task.pk)
+        self.assertEqual(archived.status, Status.COMPLETED)
+        self.assertEqual(archived.created, created)
+        self.assertEqual(archived.params, {"args": (1, 3), "kwargs": {}})
+        self.assertEqual(archived.returned, 4)
+
+    def test_batch_archives_only_finished_tasks(self):
+        completed = add.schedule(1, 3)
+        failed = failling.schedule()
+        restarted = restarting_failling.schedule()
+
+        tasks_processor(claim_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=10))
+
+        self.assertEqual(list(TaskModel.objects.values_list("pk", "status")), [(restarted.pk, Status.CREATED)])
+        self.assertEqual(
+            list(TaskArchive.objects.order_by("pk").values_list("pk", "status")),
+            [(completed.pk, Status.COMPLETED), (failed.pk, Status.FAILED)],
+        )
+
+    def test_async_task_is_archived(self):
+        task = async_to_sync(async_add.schedule)(1, 3)
+
+        async_to_sync(atask_processor)(task)
+
+        self.assertFalse(TaskModel.objects.exists())
+        self.assertEqual(TaskArchive.objects.get(pk=task.pk).returned, 4)
+
+    def test_lost_lease_is_not_archived(self):
+        add.schedule(1, 3)
+        (task,) = claim_tasks(settings.DEFAULT_QUEUE, "worker-1")
+
+        with patch("django_firefly_tasks._private.utils.timezone.now", return_value=timezone.now() + timedelta(days=1)):
+            requeue_expired_tasks(settings.DEFAULT_QUEUE)
+
+        task.set_as_completed()
+        self.assertFalse(task.release())
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).status, Status.CREATED)
+        self.assertFalse(TaskArchive.objects.exists())
+
+
+class ArchiveTasksTest(TestCase):
+    def test_command_archive_tasks(self):
+        old = add.schedule(1, 3)
+        process(old)
+        TaskModel.objects.filter(pk=old.pk).update(completed=timezone.now() - timedelta(days=2))
+        recent = add.schedule(2, 3)
+        process(recent)
+        pending = add.schedule(3, 3)
+
+        call_command("archive_tasks", "--older-than", "1d")
+
+        self.assertEqual(list(TaskArchive.objects.values_list("pk", flat=True)), [old.pk])
+        self.assertEqual(TaskArchive.objects.get(pk=old.pk).returned, 4)
+
+        call_command("archive_tasks", "--batch-size", "1")
+
+        self.assertEqual(list(TaskModel.objects.values_list("pk", flat=True)), [pending.pk])
+        self.assertEqual(list(TaskArchive.objects.order_by("pk").values_list("pk", flat=True)), [old.pk, recent.pk])
+
+    @patch("django_firefly_tasks._private.consumers.ARCHIVE_MODE", "background")
+    def test_background_archive_mode(self):
+        task = add.schedule(1, 3)
+        process(task)
+
+        reap_expired_tasks(settings.DEFAULT_QUEUE)
+
+        self.assertFalse(TaskModel.objects.exists())
+        self.assertTrue(TaskArchive.objects.filter(pk=task.pk).exists())
+
+    @patch("django_firefly_tasks._private.consumers.ARCHIVE_MODE", "background")
+    def test_background_archive_is_bounded(self):
+        with patch("django_firefly_tasks._private.consumers.archive_tasks") as archive_tasks:
+            reap_expired_tasks(settings.DEFAULT_QUEUE)
+
+        # large backlog doesn't hold up the consumer loop
+        archive_tasks.assert_called_once_with(queue=settings.DEFAULT_QUEUE, max_batches=REAPER_ARCHIVE_BATCHES)
+
+    def test_command_delete_archived_tasks(self):
+        old = add.schedule(1, 3)
+        process(old)
+        failed = failling.schedule()
+        process(failed)
+        call_command("archive_tasks")
+        TaskArchive.objects.filter(pk=old.pk).update(completed=timezone.now() - timedelta(days=2))
+        recent = add.schedule(2, 3)
+        process(recent)
+        call_command("archive_tasks")
+        pending = add.schedule(3, 3)
+
+        call_command("delete_completed_tasks", "--archive", "--older-than", "1d")
+
+        self.assertEqual(list(TaskArchive.objects.order_by("pk").values_list("pk", flat=True)), [failed.pk, recent.pk])
+        self.assertEqual(list(TaskModel.objects.values_list("pk", flat=True)), [pending.pk])
+
+        self.assertEqual(delete_failed_tasks(archive=True), 1)
+        self.assertEqual(list(TaskArchive.objects.values_list("pk", flat=True)), [recent.pk])
+
+    def test_query_helpers(self):
+        archived = add.schedule(1, 3)
+        process(archived)
+        call_command("archive_tasks")
+        pending = add.schedule(2, 3)
+
+        self.assertIsInstance(get_task(archived.pk), TaskArchive)
+        self.assertIsInstance(get_task(pending.pk), TaskModel)
+        self.assertIsNone(get_task(pending.pk + 1))
+        self.assertEqual(async_to_sync(aget_task)(archived.pk).returned, 4)
+
+        self.assertEqual([task.pk for task in filter_tasks(queue=settings.DEFAULT_QUEUE)], [archived.pk, pending.pk])
+        self.assertEqual([task.pk for task in filter_tasks(status=Status.COMPLETED)], [archived.pk])
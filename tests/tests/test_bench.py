@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipIf
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from django_firefly_tasks._private.bench import BENCH_QUEUE, run_benchmark
+from django_firefly_tasks.models import TaskModel
+from tests.tasks import add
+
+
+class BenchTasksTest(TestCase):
+    def test_schedule_and_consume(self):
+        real_task = add.schedule(1, 3)
+
+        report = run_benchmark(["schedule", "consume"], tasks=20, batch_size=5, sleep_time=0)
+
+        self.assertEqual(report["environment"]["database"], connection.vendor)
+        self.assertEqual(list(report["results"]), ["schedule_single", "schedule_bulk", "consume_noop", "consume_sleep"])
+        self.assertEqual(report["results"]["schedule_single"]["tasks"], 20)
+        self.assertEqual(report["results"]["schedule_single"]["queries_per_task"], 1)
+        self.assertLess(report["results"]["schedule_bulk"]["queries_per_task"], 1)
+        self.assertEqual(report["results"]["consume_sleep"]["tasks"], 2)
+        self.assertGreater(report["results"]["consume_noop"]["tasks_per_sec"], 0)
+
+        # benchmark cleans up after itself and leaves other queues alone
+        self.assertFalse(TaskModel.objects.filter(queue=BENCH_QUEUE).exists())
+        self.assertTrue(TaskModel.objects.filter(pk=real_task.pk, status=real_task.status).exists())
+
+    def test_command_json_output(self):
+        stdout = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command(
+                "bench_tasks", "--scenario", "schedule", "--tasks", "10", "--json", "--output", output, stdout=stdout
+            )
+
+            with open(output) as file:
+                saved = json.load(file)
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report, saved)
+        self.assertEqual(list(report["results"]), ["schedule_single", "schedule_bulk"])
+
+    def test_command_text_output(self):
+        stdout = StringIO()
+        call_command("bench_tasks", "--scenario", "schedule", "--tasks", "10", stdout=stdout)
+
+        self.assertIn("schedule_single  tasks 10, tasks_per_sec", stdout.getvalue())
+
+
+# consumers run in threads, which in-memory SQLite can't serve
+@skipIf(connection.vendor == "sqlite", "in-memory SQLite does not support concurrent writers")
+class BenchBackgroundConsumersTest(TransactionTestCase):
+    def test_async_and_latency(self):
+        report = run_benchmark(["async", "latency"], tasks=20, sleep_time=0.01, max_inflight=5, rate=200)
+
+        self.assertEqual(list(report["results"]), ["async_noop", "async_sleep", "latency"])
+        latency = report["results"]["latency"]
+        self.assertEqual(latency["tasks"], 2)
+        self.assertLessEqual(latency["wait_p50_ms"], latency["total_p50_ms"])
+        self.assertLessEqual(latency["total_p50_ms"], latency["total_p99_ms"])
+        self.assertFalse(TaskModel.objects.filter(queue=BENCH_QUEUE).exists())
@@ -1,8 +1,14 @@
-from django.core.management import call_command
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 from django.utils import timezone
 
 from django_firefly_tasks.models import Status, TaskModel
+from django_firefly_tasks.tasks import delete_finished_tasks
+from django_firefly_tasks.utils import delete_failed_tasks
+from tests.utils import process
 
 
 class CommandTestCase(TestCase):
@@ -48,6 +54,74 @@ class CommandTestCase(TestCase):
         self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), 0)
         self.assertEqual(TaskModel.objects.filter(status=Status.FAILED).count(), 1)
 
+    def create_finished_tasks(self, status, ages, queue="default"):
+        time_field = "completed" if status == Status.COMPLETED else "failed"
+        for age in ages:
+            TaskModel.objects.create(
+                func_name="app.tasks.test",
+                queue=queue,
+                status=status,
+                max_retries=0,
+                **{time_field: timezone.now() - timedelta(hours=age)},
+            )
+
+    def test_command_delete_completed_tasks_older_than(self):
+        self.create_finished_tasks(Status.COMPLETED, [1, 2, 48, 72])
+        self.create_finished_tasks(Status.FAILED, [72])
+
+        call_command("delete_completed_tasks", "--older-than", "1d")
+
+        self.assertEqual(
+            sorted(TaskModel.objects.values_list("status", flat=True)),
+            [Status.COMPLETED, Status.COMPLETED, Status.FAILED],
+        )
+
+    def test_command_delete_failed_tasks_in_batches(self):
+        self.create_finished_tasks(Status.FAILED, range(5))
+        self.create_finished_tasks(Status.FAILED, [1], queue="other")
+
+        with patch("django_firefly_tasks._private.maintenance.time.sleep") as sleep:
+            call_command(
+                "delete_failed_tasks", "--queue", "default", "--batch-size", "2", "--sleep-between-batches", "0.5"
+            )
+
+        self.assertEqual(list(TaskModel.objects.values_list("queue", flat=True)), ["other"])
+        # 2 + 2 + 1 tasks, pause between batches
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 0.5])
+
+    def test_command_delete_tasks_dry_run(self):
+        self.create_finished_tasks(Status.COMPLETED, [1, 2])
+
+        call_command("delete_completed_tasks", "--dry-run")
+
+        self.assertEqual(TaskModel.objects.count(), 2)
+
+    def test_command_delete_tasks_invalid_age(self):
+        with self.assertRaises(CommandError):
+            call_command("delete_completed_tasks", "--older-than", "week")
+
+    def test_delete_tasks_helper(self):
+        self.create_finished_tasks(Status.FAILED, [1, 3, 4, 5])
+
+        self.assertEqual(delete_failed_tasks(older_than=timedelta(hours=2), dry_run=True), 3)
+        self.assertEqual(delete_failed_tasks(older_than=timedelta(hours=2), batch_size=2, max_batches=1), 2)
+        # the oldest ones go first
+        self.assertEqual(TaskModel.objects.count(), 2)
+        self.assertEqual(delete_failed_tasks(older_than=timedelta(hours=2)), 1)
+        self.assertEqual(TaskModel.objects.count(), 1)
+
+    def test_delete_finished_tasks_task(self):
+        self.create_finished_tasks(Status.FAILED, [1, 3, 4, 5, 6])
+
+        runs = delete_finished_tasks.schedule("failed", older_than=7200, batch_size=2, max_batches=1)
+        while process(runs):
+            pass
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.FAILED).count(), 1)
+        # every run deletes single batch in its own transaction and schedules the next one
+        cleanups = TaskModel.objects.filter(func_name="django_firefly_tasks.tasks.delete_finished_tasks")
+        self.assertEqual([task.returned for task in cleanups.order_by("pk")], [2, 2, None])
+
     def test_command_mark_failed_tasks_consumable(self):
         for _ in range(5):
             TaskModel.objects.create(
@@ -0,0 +1,132 @@
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from django_firefly_tasks._private.compression import HEADER, compress, decompress
+from django_firefly_tasks._private.utils import serialize_object
+from django_firefly_tasks.decorators import task
+from django_firefly_tasks.models import Status, TaskModel
+from tests.tasks import add, zlib_echo
+from tests.utils import process
+
+PAYLOAD = "firefly " * 1000
+
+
+class CompressionTest(SimpleTestCase):
+    def test_round_trip(self):
+        data = PAYLOAD.encode()
+
+        for compression in ("zlib", "lzma"):
+            compressed = compress(data, compression, 1024)
+            self.assertTrue(compressed.startswith(HEADER))
+            self.assertLess(len(compressed), len(data))
+            self.assertEqual(decompress(compressed), data)
+
+    def test_below_threshold(self):
+        self.assertEqual(compress(b"firefly", "zlib", 1024), b"firefly")
+
+    def test_incompressible(self):
+        data = bytes(range(256))
+        self.assertEqual(compress(data, "lzma", 0), data)
+
+    def test_no_compression(self):
+        data = PAYLOAD.encode()
+        self.assertEqual(compress(data, None, 0), data)
+        self.assertEqual(decompress(data), data)
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            task(compression="gzip")
+
+
+class TaskCompressionTest(TestCase):
+    def test_compressed_task(self):
+        task = zlib_echo.schedule(PAYLOAD)
+        process(task)
+        task = TaskModel.objects.get(pk=task.pk)
+
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertEqual(task.compression, "zlib")
+        self.assertTrue(bytes(task.params_data).startswith(HEADER))
+        self.assertTrue(bytes(task.returned_data).startswith(HEADER))
+        self.assertLess(len(task.params_data), len(PAYLOAD))
+        self.assertEqual(task.params, {"args": (PAYLOAD,), "kwargs": {}})
+        self.assertEqual(task.returned, PAYLOAD)
+
+    def test_small_data_left_uncompressed(self):
+        task = TaskModel.objects.get(pk=zlib_echo.schedule("firefly").pk)
+
+        self.assertFalse(bytes(task.params_data).startswith(HEADER))
+        self.assertEqual(task.params, {"args": ("firefly",), "kwargs": {}})
+
+    def test_command_recompress_tasks(self):
+        plain = add.schedule(PAYLOAD, "")
+        compressed = zlib_echo.schedule(PAYLOAD)
+        small = add.schedule(1, 3)
+
+        call_command("recompress_tasks", "--compression", "lzma", "--batch-size", "2")
+
+        for task in (plain, compressed):
+            task = TaskModel.objects.get(pk=task.pk)
+            self.assertEqual(task.compression, "lzma")
+            self.assertEqual(bytes(task.params_data)[:2], HEADER + b"x")
+            self.assertEqual(task.params["args"][0], PAYLOAD)
+
+        small = TaskModel.objects.get(pk=small.pk)
+        self.assertFalse(bytes(small.params_data).startswith(HEADER))
+        self.assertEqual(small.params, {"args": (1, 3), "kwargs": {}})
+
+        call_command("recompress_tasks", "--compression", "none")
+
+        task = TaskModel.objects.get(pk=compressed.pk)
+        self.assertIsNone(task.compression)
+        self.assertFalse(bytes(task.params_data).startswith(HEADER))
+        self.assertEqual(task.params["args"][0], PAYLOAD)
+
+    def test_command_recompress_tasks_skips_running(self):
+        task = add.schedule(PAYLOAD, "")
+        TaskModel.objects.filter(pk=task.pk).update(status=Status.RUNNING)
+
+        call_command("recompress_tasks", "--compression", "zlib")
+
+        self.assertIsNone(TaskModel.objects.get(pk=task.pk).compression)
+
+    def test_command_recompress_legacy_task(self):
+        task = TaskModel.objects.create(
+            func_name="tests.tasks.add",
+            queue="default",
+            raw_params=serialize_object({"args": (PAYLOAD, ""), "kwargs": {}}),
+            raw_returned=serialize_object(PAYLOAD),
+            status=Status.COMPLETED,
+            max_retries=0,
+        )
+
+        call_command("recompress_tasks", "--compression", "zlib")
+        task = TaskModel.objects.get(pk=task.pk)
+
+        self.assertIsNone(task.raw_params)
+        self.assertIsNone(task.raw_returned)
+        self.assertEqual(task.serializer, "pickle")
+        self.assertTrue(bytes(task.params_data).startswith(HEADER))
+        self.assertEqual(task.params, {"args": (PAYLOAD, ""), "kwargs": {}})
+        self.assertEqual(task.returned, PAYLOAD)
+
+    def test_command_recompress_legacy_task_run_after_upgrade(self):
+        # legacy params, result saved by json serializer on the first run after upgrade
+        task = TaskModel.objects.create(
+            func_name="tests.tasks.add",
+            queue="default",
+            raw_params=serialize_object({"args": [1, 3], "kwargs": {}}),
+            serializer="json",
+            status=Status.COMPLETED,
+            max_retries=0,
+        )
+        task.returned = 4
+        task.save()
+
+        call_command("recompress_tasks", "--compression", "zlib", "--threshold", "1")
+        task = TaskModel.objects.get(pk=task.pk)
+
+        self.assertIsNone(task.raw_params)
+        self.assertEqual(task.serializer, "json")
+        self.assertEqual(task.params, {"args": [1, 3], "kwargs": {}})
+        self.assertEqual(task.returned, 4)
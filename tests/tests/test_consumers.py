@@ -0,0 +1,627 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from datetime import timedelta
+from unittest import skipIf
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    skipUnlessDBFeature,
+)
+from django.utils import timezone
+
+from django_firefly_tasks._private.backoff import Backoff
+from django_firefly_tasks._private.consumers import (
+    async_task_consumer,
+    claim_tasks,
+    consume_tasks,
+    get_nap_time,
+    process_task_consumer,
+    task_consumer,
+    threaded_task_consumer,
+)
+from django_firefly_tasks._private.queues import WeightedQueues, parse_queue
+from django_firefly_tasks._private.utils import (
+    close_obsolete_connections,
+    get_latest_task,
+    requeue_expired_tasks,
+)
+from django_firefly_tasks.models import Status, TaskModel
+from tests.models import FooModel
+from tests.tasks import (
+    add,
+    async_sleep_and_create_foo,
+    create_foo_failling,
+    exit_process,
+    restarting_failling,
+    sleep_and_create_foo,
+)
+
+
+def drain(queue):
+    while consume_tasks(queue):
+        pass
+
+
+def drain_with_consumers(queue, consumers):
+    # children must not share parent's database socket
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=drain, args=(queue,)) for _ in range(consumers)]
+
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    return time.perf_counter() - start
+
+
+class LeaseTest(TestCase):
+    def test_claim_task(self):
+        task = add.schedule(1, 3)
+
+        (claimed,) = claim_tasks(settings.DEFAULT_QUEUE, "worker-1")
+        self.assertEqual(claimed.pk, task.pk)
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.RUNNING)
+        self.assertEqual(task.locked_by, "worker-1")
+        self.assertIsNotNone(task.lease_expires_at)
+
+        self.assertEqual(claim_tasks(settings.DEFAULT_QUEUE, "worker-2"), [])
+
+    def test_consume_task_releases_lease(self):
+        task = add.schedule(1, 3)
+
+        consume_tasks(settings.DEFAULT_QUEUE, "worker-1")
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertIsNone(task.locked_by)
+        self.assertIsNone(task.lease_expires_at)
+        self.assertEqual(task.returned, 4)
+
+    def test_consume_failing_task_rollbacks_function(self):
+        task = create_foo_failling.schedule("FooBar")
+
+        consume_tasks(settings.DEFAULT_QUEUE, "worker-1")
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.FAILED)
+        self.assertIsNone(task.locked_by)
+        self.assertEqual(FooModel.objects.count(), 0)
+
+    def test_requeue_expired_tasks(self):
+        task = add.schedule(1, 3)
+        (claimed,) = claim_tasks(settings.DEFAULT_QUEUE, "worker-1")
+
+        self.assertEqual(requeue_expired_tasks(settings.DEFAULT_QUEUE), (0, 0))
+
+        with patch(
+            "django_firefly_tasks._private.utils.timezone.now",
+            return_value=claimed.lease_expires_at + timedelta(seconds=1),
+        ):
+            self.assertEqual(requeue_expired_tasks(settings.DEFAULT_QUEUE), (1, 0))
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.CREATED)
+        self.assertEqual(task.retry_attempts, 1)
+        self.assertIsNone(task.locked_by)
+        self.assertIsNone(task.lease_expires_at)
+
+    def test_expired_task_without_retries_fails(self):
+        task = restarting_failling.schedule()
+        TaskModel.objects.filter(pk=task.pk).update(retry_attempts=settings.MAX_RETRIES - 1)
+        expires_at = timezone.now() + timedelta(days=1)
+
+        for requeued in [(1, 0), (0, 1)]:
+            claim_tasks(settings.DEFAULT_QUEUE, "worker-1")
+            with patch("django_firefly_tasks._private.utils.timezone.now", return_value=expires_at):
+                self.assertEqual(requeue_expired_tasks(settings.DEFAULT_QUEUE), requeued)
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.FAILED)
+        self.assertEqual(task.retry_attempts, settings.MAX_RETRIES)
+        self.assertIsNotNone(task.failed)
+        self.assertIsNone(task.locked_by)
+
+    def test_release_lost_lease(self):
+        task = add.schedule(1, 3)
+        (claimed,) = claim_tasks(settings.DEFAULT_QUEUE, "worker-1")
+
+        with patch("django_firefly_tasks._private.utils.timezone.now", return_value=timezone.now() + timedelta(days=1)):
+            requeue_expired_tasks(settings.DEFAULT_QUEUE)
+
+        claim_tasks(settings.DEFAULT_QUEUE, "worker-2")
+
+        claimed.set_as_completed()
+        self.assertFalse(claimed.release())
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.RUNNING)
+        self.assertEqual(task.locked_by, "worker-2")
+
+
+class BatchTest(TestCase):
+    def test_claim_tasks_batch(self):
+        tasks = [add.schedule(i, i) for i in range(5)]
+
+        claimed = claim_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=3)
+        self.assertEqual([task.pk for task in claimed], [task.pk for task in tasks[:3]])
+        self.assertEqual(TaskModel.objects.filter(status=Status.RUNNING, locked_by="worker-1").count(), 3)
+
+        claimed = claim_tasks(settings.DEFAULT_QUEUE, "worker-2", batch_size=3)
+        self.assertEqual([task.pk for task in claimed], [task.pk for task in tasks[3:]])
+
+    def test_claim_tasks_batch_skips_postponed(self):
+        task = add.schedule(1, 3)
+        add.schedule(1, 3, eta=timezone.now() + timedelta(hours=1))
+
+        claimed = claim_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=10)
+        self.assertEqual([claimed_task.pk for claimed_task in claimed], [task.pk])
+
+    def test_consume_tasks_batch(self):
+        tasks = [add.schedule(i, i) for i in range(3)]
+        failed_task = create_foo_failling.schedule("FooBar")
+
+        consumed = consume_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=10)
+        self.assertEqual(len(consumed), 4)
+
+        for i, task in enumerate(tasks):
+            task = TaskModel.objects.get(pk=task.pk)
+            self.assertEqual(task.status, Status.COMPLETED)
+            self.assertIsNone(task.locked_by)
+            self.assertEqual(task.returned, i * 2 or None)
+
+        failed_task = TaskModel.objects.get(pk=failed_task.pk)
+        self.assertEqual(failed_task.status, Status.FAILED)
+        self.assertIsNone(failed_task.locked_by)
+        self.assertEqual(FooModel.objects.count(), 0)
+
+
+class BackoffTest(SimpleTestCase):
+    def test_backoff_grows_up_to_max(self):
+        backoff = Backoff(0.001, 0.008)
+
+        for limit in (0.001, 0.002, 0.004, 0.008, 0.008, 0.008):
+            nap_time = backoff.next()
+            self.assertGreaterEqual(nap_time, limit / 2)
+            self.assertLessEqual(nap_time, limit)
+
+    def test_backoff_reset(self):
+        backoff = Backoff(0.001, 1)
+
+        for _ in range(5):
+            backoff.next()
+        backoff.reset()
+
+        self.assertLessEqual(backoff.next(), 0.001)
+
+
+class WeightedQueuesTest(SimpleTestCase):
+    def test_picks_by_weight(self):
+        queues = WeightedQueues({"a": 3, "b": 1}, 0.001, 1)
+
+        picks = [queues.next() for _ in range(8)]
+
+        self.assertEqual(picks.count("a"), 6)
+        self.assertEqual(picks.count("b"), 2)
+        # smooth round-robin spreads picks of heavier queue
+        self.assertNotIn("aaaa", "".join(picks))
+
+    def test_empty_queue_naps(self):
+        queues = WeightedQueues({"a": 3, "b": 1}, 0.001, 1)
+
+        queues.set_empty("a", 10)
+        self.assertEqual({queues.next() for _ in range(4)}, {"b"})
+        self.assertEqual(queues.nap_time(), 0)
+
+        queues.set_empty("b", 5)
+        self.assertIsNone(queues.next())
+        self.assertAlmostEqual(queues.nap_time(), 5, delta=0.5)
+
+        queues.wake_up()
+        self.assertEqual(queues.next(), "b")
+        queues.wake_up(everyone=True)
+        self.assertEqual({queues.next() for _ in range(4)}, {"a", "b"})
+
+    def test_busy_queue_resets_its_backoff(self):
+        queues = WeightedQueues({"a": 1, "b": 1}, 0.001, 1)
+        for _ in range(5):
+            queues.backoffs["a"].next()
+            queues.backoffs["b"].next()
+
+        queues.set_busy("a", 3)
+
+        self.assertLessEqual(queues.backoffs["a"].next(), 0.001)
+        self.assertGreater(queues.backoffs["b"].next(), 0.001)
+        self.assertEqual(str(queues), "a: 3, b: 0")
+
+    def test_parse_queue(self):
+        self.assertEqual(parse_queue("emails"), ("emails", 1))
+        self.assertEqual(parse_queue("emails:5"), ("emails", 5))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_queue("emails:0")
+
+
+class CloseConnectionsTest(SimpleTestCase):
+    def test_only_persistent_or_broken_connections_are_checked(self):
+        default = Mock(settings_dict={"CONN_MAX_AGE": 0}, errors_occurred=False)
+        broken = Mock(settings_dict={"CONN_MAX_AGE": 0}, errors_occurred=True)
+        persistent = Mock(settings_dict={"CONN_MAX_AGE": 60}, errors_occurred=False)
+
+        with patch.object(connections, "all", return_value=[default, broken, persistent]):
+            close_obsolete_connections()
+
+        # default connection would be closed after every batch, so it's kept
+        default.close_if_unusable_or_obsolete.assert_not_called()
+        broken.close_if_unusable_or_obsolete.assert_called_once()
+        persistent.close_if_unusable_or_obsolete.assert_called_once()
+
+
+class ConsumerLoopTest(TestCase):
+    def test_consumer_naps_only_when_queue_is_empty(self):
+        results = [["task"], ["task"], [], [], [], ["task"], []]
+        calls = []
+
+        def consume(*args):
+            if not results:
+                raise KeyboardInterrupt
+            calls.append("consume")
+            return results.pop(0)
+
+        stop_event = threading.Event()
+
+        with (
+            patch("django_firefly_tasks._private.consumers.consume_tasks", side_effect=consume),
+            patch.object(stop_event, "wait", side_effect=calls.append) as sleep,
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                task_consumer(settings.DEFAULT_QUEUE, stop_event=stop_event)
+
+        naps = [call.args[0] for call in sleep.call_args_list]
+        steps = ["consume" if call == "consume" else "sleep" for call in calls]
+        self.assertEqual(steps, ["consume"] * 3 + ["sleep", "consume"] * 3 + ["consume", "sleep"])
+        # nap time grows while queue is empty and starts over after a task
+        self.assertLess(naps[0], naps[2])
+        self.assertLessEqual(naps[3], settings.CONSUMER_NAP_TIME)
+
+    def test_consumer_serves_many_queues(self):
+        for i in range(6):
+            add.schedule(i, i)
+        TaskModel.objects.filter(pk__in=TaskModel.objects.values_list("pk", flat=True)[:2]).update(queue="low")
+
+        stop_event = threading.Event()
+        consumed = []
+
+        def consume(queue, *args):
+            tasks = consume_tasks(queue, *args)
+            consumed.append((queue, len(tasks)))
+            if not TaskModel.objects.filter(status=Status.CREATED).exists():
+                stop_event.set()
+            return tasks
+
+        with (patch("django_firefly_tasks._private.consumers.consume_tasks", side_effect=consume),):
+            task_consumer({settings.DEFAULT_QUEUE: 2, "low": 1}, stop_event=stop_event)
+
+        self.assertFalse(TaskModel.objects.filter(status=Status.CREATED).exists())
+        self.assertEqual(consumed[:3], [(settings.DEFAULT_QUEUE, 1), ("low", 1), (settings.DEFAULT_QUEUE, 1)])
+
+    def test_command_queues(self):
+        with patch("django_firefly_tasks.management.commands.consume_tasks.run_task_consumer") as run_task_consumer:
+            call_command("consume_tasks", "--queue", "emails:5", "--queue", "reports")
+
+        self.assertEqual(run_task_consumer.call_args.args[0], {"emails": 5, "reports": 1})
+
+    @patch.object(connection, "vendor", "sqlite")
+    def test_command_concurrency_on_sqlite(self):
+        with self.assertRaisesMessage(CommandError, "--concurrency"):
+            call_command("consume_tasks", "--concurrency", "2")
+
+    @patch.object(connection, "vendor", "sqlite")
+    def test_command_processes_on_sqlite(self):
+        with self.assertRaisesMessage(CommandError, "--processes"):
+            call_command("consume_tasks", "--processes", "2")
+
+    def test_nap_is_cut_short_by_postponed_task(self):
+        self.assertEqual(get_nap_time(settings.DEFAULT_QUEUE, 30), 30)
+
+        add.schedule(1, 3, eta=timezone.now() + timedelta(seconds=5))
+
+        self.assertLessEqual(get_nap_time(settings.DEFAULT_QUEUE, 30), 5)
+        self.assertEqual(get_nap_time(settings.DEFAULT_QUEUE, 1), 1)
+
+    def test_consumer_stops_when_stop_event_is_set(self):
+        stop_event = threading.Event()
+
+        def consume(*args):
+            stop_event.set()
+            return ["task"]
+
+        with patch("django_firefly_tasks._private.consumers.consume_tasks", side_effect=consume) as consume_tasks:
+            task_consumer(settings.DEFAULT_QUEUE, stop_event=stop_event)
+
+        self.assertEqual(consume_tasks.call_count, 1)
+
+
+# threads share in-memory SQLite database through shared cache, which fails on lock instead of waiting
+# and forked processes get their own copy of it
+@skipIf(connection.vendor == "sqlite", "in-memory SQLite does not support concurrent writers")
+class BackgroundConsumerTestCase(TransactionTestCase):
+    tasks_count = 8
+    task_duration = 0.2
+
+    def run_in_background(self, consumer, *args):
+        stop_event = threading.Event()
+        thread = threading.Thread(target=consumer, args=("multi", *args, 1), kwargs={"stop_event": stop_event})
+        thread.start()
+        return thread, stop_event
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+class ThreadedConsumerTest(BackgroundConsumerTestCase):
+
+    def test_threads_run_each_task_once(self):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"thread-{i}", self.task_duration)
+
+        started_at = time.monotonic()
+        thread, stop_event = self.run_in_background(threaded_task_consumer, 4)
+        self.wait_for(lambda: FooModel.objects.count() == self.tasks_count)
+        duration = time.monotonic() - started_at
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertEqual(FooModel.objects.values("name").distinct().count(), self.tasks_count)
+        # sleeping task releases GIL, so threads overlap
+        self.assertLess(duration, self.tasks_count * self.task_duration / 2)
+
+    def test_stop_lets_running_tasks_finish(self):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"stop-{i}", self.task_duration)
+
+        thread, stop_event = self.run_in_background(threaded_task_consumer, 2)
+        self.wait_for(lambda: TaskModel.objects.filter(status=Status.RUNNING).exists())
+        stop_event.set()
+        thread.join()
+
+        finished = TaskModel.objects.filter(status=Status.COMPLETED).count()
+        self.assertGreater(finished, 0)
+        self.assertLess(finished, self.tasks_count)
+        self.assertEqual(FooModel.objects.count(), finished)
+        self.assertFalse(TaskModel.objects.filter(status=Status.RUNNING).exists())
+        self.assertEqual(TaskModel.objects.filter(status=Status.CREATED).count(), self.tasks_count - finished)
+
+
+class ProcessConsumerTest(BackgroundConsumerTestCase):
+    def test_processes_run_each_task_once(self):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"process-{i}", self.task_duration)
+
+        thread, stop_event = self.run_in_background(process_task_consumer, 4)
+        self.wait_for(lambda: FooModel.objects.count() == self.tasks_count)
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertEqual(FooModel.objects.values("name").distinct().count(), self.tasks_count)
+
+    def test_dead_process_is_restarted(self):
+        exit_process.schedule()
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"restart-{i}", 0)
+
+        with self.assertLogs("django_firefly_tasks", "WARNING") as logs:
+            thread, stop_event = self.run_in_background(process_task_consumer, 1)
+            self.wait_for(lambda: FooModel.objects.count() == self.tasks_count)
+            stop_event.set()
+            thread.join()
+
+        self.assertEqual(FooModel.objects.count(), self.tasks_count)
+        self.assertIn("died with exit code 1, restarting", logs.output[0])
+
+    def test_stop_lets_running_tasks_finish(self):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"stop-{i}", self.task_duration)
+
+        thread, stop_event = self.run_in_background(process_task_consumer, 2)
+        self.wait_for(lambda: TaskModel.objects.filter(status=Status.RUNNING).exists())
+        stop_event.set()
+        thread.join()
+
+        self.assertFalse(TaskModel.objects.filter(status=Status.RUNNING).exists())
+        self.assertEqual(FooModel.objects.count(), TaskModel.objects.filter(status=Status.COMPLETED).count())
+
+
+def async_consumer(queue, max_inflight, batch_size, stop_event):
+    asyncio.run(async_task_consumer(queue, max_inflight, stop_event))
+
+
+class ProcessRestartTest(SimpleTestCase):
+    def setUp(self):
+        self.stop_event = threading.Event()
+
+    def run_dying_children(self, on_restart_delay):
+        """
+        Runs supervisor of single child which dies right after start, on_restart_delay gets every restart delay.
+        Returns number of started children.
+        """
+        next_delay = Backoff.next
+
+        def restart_delay(backoff):
+            delay = next_delay(backoff)
+            on_restart_delay(delay)
+            return delay
+
+        with (
+            patch("django_firefly_tasks._private.consumers.consumer_process", lambda *args: os._exit(1)),
+            patch.object(Backoff, "next", restart_delay),
+            patch.object(connections, "close_all") as close_all,
+            self.assertLogs("django_firefly_tasks", "WARNING"),
+        ):
+            process_task_consumer(settings.DEFAULT_QUEUE, 1, stop_event=self.stop_event)
+
+        # connections are closed before each start
+        return close_all.call_count
+
+    @patch("django_firefly_tasks._private.consumers.PROCESS_RESTART_DELAY", 0.05)
+    @patch("django_firefly_tasks._private.consumers.PROCESS_MAX_RESTART_DELAY", 0.4)
+    def test_restarts_back_off(self):
+        delays = []
+
+        def on_restart_delay(delay):
+            delays.append(delay)
+            if len(delays) == 4:
+                self.stop_event.set()
+
+        self.run_dying_children(on_restart_delay)
+
+        # child dying right after start doesn't make supervisor spin
+        self.assertLessEqual(delays[0], 0.05)
+        self.assertGreaterEqual(delays[3], 0.2)
+
+    @patch("django_firefly_tasks._private.consumers.PROCESS_RESTART_DELAY", 30)
+    def test_stop_while_waiting_for_restart(self):
+        started_at = time.monotonic()
+        started = self.run_dying_children(lambda delay: self.stop_event.set())
+
+        self.assertEqual(started, 1)
+        self.assertLess(time.monotonic() - started_at, 10)
+
+
+class AsyncConsumerTest(BackgroundConsumerTestCase):
+    def test_async_tasks_run_concurrently(self):
+        for i in range(self.tasks_count):
+            async_to_sync(async_sleep_and_create_foo.schedule)(f"async-{i}", self.task_duration)
+
+        started_at = time.monotonic()
+        thread, stop_event = self.run_in_background(async_consumer, self.tasks_count)
+        self.wait_for(lambda: FooModel.objects.count() == self.tasks_count)
+        duration = time.monotonic() - started_at
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertLess(duration, self.tasks_count * self.task_duration / 2)
+
+    def test_sync_tasks_run_in_threads(self):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"sync-{i}", self.task_duration)
+
+        started_at = time.monotonic()
+        thread, stop_event = self.run_in_background(async_consumer, self.tasks_count)
+        self.wait_for(lambda: FooModel.objects.count() == self.tasks_count)
+        duration = time.monotonic() - started_at
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertEqual(FooModel.objects.values("name").distinct().count(), self.tasks_count)
+        self.assertLess(duration, self.tasks_count * self.task_duration / 2)
+
+    def test_max_inflight_is_respected(self):
+        for i in range(self.tasks_count):
+            async_to_sync(async_sleep_and_create_foo.schedule)(f"inflight-{i}", self.task_duration / 2)
+
+        running = []
+        thread, stop_event = self.run_in_background(async_consumer, 2)
+        self.wait_for(
+            lambda: running.append(TaskModel.objects.filter(status=Status.RUNNING).count())
+            or FooModel.objects.count() == self.tasks_count
+        )
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertEqual(max(running), 2)
+
+    def test_stop_lets_running_tasks_finish(self):
+        for i in range(self.tasks_count):
+            async_to_sync(async_sleep_and_create_foo.schedule)(f"stop-{i}", self.task_duration)
+
+        thread, stop_event = self.run_in_background(async_consumer, 2)
+        self.wait_for(lambda: TaskModel.objects.filter(status=Status.RUNNING).exists())
+        stop_event.set()
+        thread.join()
+
+        finished = TaskModel.objects.filter(status=Status.COMPLETED).count()
+        self.assertGreater(finished, 0)
+        self.assertLess(finished, self.tasks_count)
+        self.assertEqual(FooModel.objects.count(), finished)
+        self.assertFalse(TaskModel.objects.filter(status=Status.RUNNING).exists())
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class MultiConsumerTest(TransactionTestCase):
+    tasks_count = 80
+    task_duration = 0.025
+
+    def schedule_tasks(self, prefix):
+        for i in range(self.tasks_count):
+            sleep_and_create_foo.schedule(f"{prefix}-{i}", self.task_duration)
+
+    def test_skip_locked_task(self):
+        first = sleep_and_create_foo.schedule("first", 0)
+        second = sleep_and_create_foo.schedule("second", 0)
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                get_latest_task("multi")
+                locked.set()
+                release.wait(5)
+            connections.close_all()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait(5)
+
+        try:
+            with transaction.atomic():
+                task = get_latest_task("multi", skip_locked=True)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertNotEqual(task.pk, first.pk)
+        self.assertEqual(task.pk, second.pk)
+
+    def test_many_consumers_run_each_task_once(self):
+        self.schedule_tasks("once")
+
+        drain_with_consumers("multi", 4)
+
+        self.assertEqual(TaskModel.objects.filter(status=Status.COMPLETED).count(), self.tasks_count)
+        self.assertEqual(FooModel.objects.count(), self.tasks_count)
+        self.assertEqual(FooModel.objects.values("name").distinct().count(), self.tasks_count)
+
+    def test_many_consumers_scale_throughput(self):
+        self.schedule_tasks("single")
+        single_duration = drain_with_consumers("multi", 1)
+
+        self.schedule_tasks("many")
+        many_duration = drain_with_consumers("multi", 4)
+
+        self.assertEqual(FooModel.objects.count(), 2 * self.tasks_count)
+        # close to linear, with a margin for process start up on busy CI machines
+        self.assertGreater(single_duration / many_duration, 2)
@@ -1,9 +1,17 @@
 from datetime import timedelta
+from unittest.mock import patch
 
+from django.db import connection
 from django.test import TestCase
 from django.utils import timezone
 
-from django_firefly_tasks._private.utils import get_latest_task
+from django_firefly_tasks._private.utils import (
+    get_aged_task_ids,
+    get_latest_task,
+    get_latest_tasks,
+    get_seconds_to_next_task,
+    get_tasks_to_consume,
+)
 from django_firefly_tasks.models import Status, TaskModel
 
 
@@ -11,54 +19,167 @@ class DatabaseTest(TestCase):
     def test_get_task_simple_0(self):
         time_offset = 0
         queue = "default"
+        ids = []
 
         for _ in range(4):
             time_offset += 10
 
-            TaskModel.objects.create(
+            task = TaskModel.objects.create(
                 func_name="test",
                 queue=queue,
                 status=Status.CREATED,
                 max_retries=0,
                 not_before=timezone.now() + timedelta(seconds=time_offset),
             )
+            ids.append(task.id)
 
-        TaskModel.objects.create(func_name="test", queue=queue, status=Status.CREATED, max_retries=0, not_before=None)
+        task = TaskModel.objects.create(
+            func_name="test", queue=queue, status=Status.CREATED, max_retries=0, not_before=None
+        )
+        ids.append(task.id)
 
         task = get_latest_task(queue)
-        self.assertEqual(task.id, 5)
+        self.assertEqual(task.id, ids[4])
         self.assertIsNone(task.not_before)
         task.set_as_completed()
         task.save()
 
-        for i in range(1, 5):
-            task = get_latest_task(queue)
-            self.assertEqual(task.id, i)
-            self.assertIsNotNone(task.not_before)
-            task.set_as_completed()
-            task.save()
+        # the rest is postponed
+        self.assertIsNone(get_latest_task(queue))
+
+        with patch(
+            "django_firefly_tasks._private.utils.timezone.now", return_value=timezone.now() + timedelta(hours=1)
+        ):
+            for i in range(0, 4):
+                task = get_latest_task(queue)
+                self.assertEqual(task.id, ids[i])
+                self.assertIsNotNone(task.not_before)
+                task.set_as_completed()
+                task.save()
 
     def test_get_task_simple_1(self):
         queue = "default"
+        ids = []
 
-        TaskModel.objects.create(
+        task = TaskModel.objects.create(
             func_name="test", queue=queue, status=Status.CREATED, max_retries=0, not_before=timezone.now()
         )
+        ids.append(task.id)
 
         for _ in range(4):
-            TaskModel.objects.create(
+            task = TaskModel.objects.create(
                 func_name="test", queue=queue, status=Status.CREATED, max_retries=0, not_before=None
             )
+            ids.append(task.id)
 
-        for i in range(2, 6):
+        for i in range(1, 5):
             task = get_latest_task(queue)
-            self.assertEqual(task.id, i)
+            self.assertEqual(task.id, ids[i])
             self.assertIsNone(task.not_before)
             task.set_as_completed()
             task.save()
 
         task = get_latest_task(queue)
-        self.assertEqual(task.id, 1)
+        self.assertEqual(task.id, ids[0])
         self.assertIsNotNone(task.not_before)
         task.set_as_completed()
         task.save()
+
+    def test_get_seconds_to_next_task(self):
+        queue = "default"
+        self.assertIsNone(get_seconds_to_next_task(queue))
+
+        TaskModel.objects.create(func_name="test", queue=queue, status=Status.CREATED, max_retries=0)
+        self.assertIsNone(get_seconds_to_next_task(queue))
+
+        for seconds in (60, 10, -10):
+            TaskModel.objects.create(
+                func_name="test",
+                queue=queue,
+                status=Status.COMPLETED if seconds < 0 else Status.CREATED,
+                max_retries=0,
+                not_before=timezone.now() + timedelta(seconds=seconds),
+            )
+
+        self.assertAlmostEqual(get_seconds_to_next_task(queue), 10, delta=1)
+        self.assertIsNone(get_seconds_to_next_task("other"))
+
+        TaskModel.objects.create(
+            func_name="test",
+            queue=queue,
+            status=Status.CREATED,
+            max_retries=0,
+            not_before=timezone.now() - timedelta(seconds=10),
+        )
+        self.assertEqual(get_seconds_to_next_task(queue), 0)
+
+    def test_get_tasks_to_consume_uses_priority_index(self):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest("EXPLAIN output is checked only for SQLite and PostgreSQL")
+
+        queue = "default"
+
+        for status in (Status.CREATED, Status.COMPLETED, Status.FAILED):
+            for i in range(10):
+                TaskModel.objects.create(
+                    func_name="test",
+                    queue=queue,
+                    status=status,
+                    max_retries=0,
+                    priority=i % 3,
+                    not_before=timezone.now() + timedelta(seconds=i) if i % 2 else None,
+                )
+
+        if connection.vendor == "postgresql":
+            # table is tiny, force planner to show if index can answer the query
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+        plan = get_tasks_to_consume(queue).select_for_update().explain()
+
+        self.assertIn("firefly_task_priority_idx", plan)
+        # rows are read in index order, no extra sort step
+        self.assertNotIn("TEMP B-TREE", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class PriorityTest(TestCase):
+    def create_task(self, priority: int = 0, **kwargs) -> TaskModel:
+        return TaskModel.objects.create(
+            func_name="test", queue="default", status=Status.CREATED, max_retries=0, priority=priority, **kwargs
+        )
+
+    def test_higher_priority_first(self):
+        low = self.create_task(-1)
+        default = self.create_task()
+        urgent = self.create_task(10)
+        postponed_urgent = self.create_task(10, not_before=timezone.now() + timedelta(hours=1))
+        due_urgent = self.create_task(10, not_before=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(
+            [task.pk for task in get_latest_tasks("default", 10)], [urgent.pk, due_urgent.pk, default.pk, low.pk]
+        )
+        self.assertNotIn(postponed_urgent.pk, [task.pk for task in get_latest_tasks("default", 10)])
+
+    def test_aged_task_ids(self):
+        with patch("django.utils.timezone.now", return_value=timezone.now() - timedelta(minutes=10)):
+            old = self.create_task(-5)
+        self.create_task(-5)
+        retried = self.create_task(-5, not_before=timezone.now() - timedelta(minutes=20))
+        self.create_task(-5, not_before=timezone.now() - timedelta(seconds=10))
+
+        self.assertEqual(get_aged_task_ids("default", 10, 60), [retried.pk, old.pk])
+        self.assertEqual(get_aged_task_ids("default", 1, 60), [retried.pk])
+        self.assertEqual(get_aged_task_ids("default", 10, 3600), [])
+
+    def test_aging(self):
+        with patch("django.utils.timezone.now", return_value=timezone.now() - timedelta(minutes=10)):
+            starving = self.create_task(-5)
+        urgent = [self.create_task(5) for _ in range(3)]
+
+        self.assertEqual([task.pk for task in get_latest_tasks("default", 2)], [task.pk for task in urgent[:2]])
+        with patch("django_firefly_tasks._private.utils.PRIORITY_AGING", 60):
+            self.assertEqual([task.pk for task in get_latest_tasks("default", 2)], [starving.pk, urgent[0].pk])
+            self.assertEqual(
+                [task.pk for task in get_latest_tasks("default", 10)], [starving.pk] + [task.pk for task in urgent]
+            )
@@ -0,0 +1,121 @@
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from django_firefly_tasks._private.consumers import claim_tasks
+from django_firefly_tasks._private.processors import tasks_processor
+from django_firefly_tasks._private.results import get_result_key
+from django_firefly_tasks.decorators import deferred_scheduling, task
+from django_firefly_tasks.models import Status, TaskModel
+from tests.tasks import add, async_unique_add, rebuild_cache, unique_add
+
+
+class DedupTest(TestCase):
+    def test_pending_duplicate_is_returned(self):
+        task = unique_add.schedule(1, 3)
+        duplicate = unique_add.schedule(1, 3)
+        other = unique_add.schedule(2, 3)
+
+        self.assertEqual(duplicate.pk, task.pk)
+        self.assertNotEqual(other.pk, task.pk)
+        self.assertEqual(TaskModel.objects.filter(func_name="tests.tasks.unique_add").count(), 2)
+
+    def test_key_of_params(self):
+        task = unique_add.schedule(i=1, j=3)
+
+        self.assertEqual(unique_add.schedule(j=3, i=1).pk, task.pk)
+        # params are hashed as they are stored
+        self.assertEqual(task.dedup_key, get_result_key(task.func_name, task.serializer, [], {"i": 1, "j": 3}))
+
+    def test_schedule_unique_key(self):
+        task = add.schedule(1, 3, unique_key="sum")
+        duplicate = add.schedule(2, 2, unique_key="sum")
+
+        self.assertEqual(duplicate.pk, task.pk)
+        self.assertEqual(duplicate.params, {"args": (1, 3), "kwargs": {}})
+        # tasks without key aren't deduplicated
+        self.assertNotEqual(add.schedule(1, 3).pk, add.schedule(1, 3).pk)
+
+        with self.assertRaises(TypeError):
+            add.schedule(1, 3, unique_key=1)
+        with self.assertRaises(ValueError):
+            add.schedule(1, 3, unique_key="k" * 256)
+
+    def test_replace(self):
+        task = rebuild_cache.schedule(42)
+        latest = rebuild_cache.schedule(42, full=True)
+
+        self.assertNotEqual(latest.pk, task.pk)
+        self.assertFalse(TaskModel.objects.filter(pk=task.pk).exists())
+        self.assertEqual(TaskModel.objects.get(pk=latest.pk).params, {"args": (42,), "kwargs": {"full": True}})
+        self.assertEqual(latest.dedup_key, "user:42")
+
+    def test_taken_task_is_scheduled_again(self):
+        task = unique_add.schedule(1, 3)
+        claimed = claim_tasks(task.queue, "worker-1")
+        self.assertEqual([claimed_task.pk for claimed_task in claimed], [task.pk])
+
+        # running task could have read the data already, so the work is queued again
+        again = unique_add.schedule(1, 3)
+        self.assertNotEqual(again.pk, task.pk)
+        self.assertEqual(unique_add.schedule(1, 3).pk, again.pk)
+
+        tasks_processor(claimed)
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).status, Status.COMPLETED)
+        self.assertIsNone(TaskModel.objects.get(pk=task.pk).dedup_key)
+
+    def test_constraint(self):
+        unique_add.schedule(1, 3)
+        task = TaskModel.objects.get()
+        task.pk = None
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            task.save()
+
+    def test_schedule_many(self):
+        task = unique_add.schedule(1, 3)
+
+        ids = unique_add.schedule_many([((1, 3), {}), ((2, 3), {}), ((2, 3), {}), ((5, 5), {"unique_key": "ten"})])
+
+        self.assertEqual(ids[0], task.pk)
+        self.assertEqual(ids[1], ids[2])
+        self.assertEqual(TaskModel.objects.filter(func_name="tests.tasks.unique_add").count(), 3)
+        self.assertEqual(TaskModel.objects.get(pk=ids[3]).dedup_key, "ten")
+
+        # mixed with tasks without key, order of IDs is kept
+        ids = add.schedule_many(
+            [((1, 1), {}), ((1, 3), {"unique_key": "a"}), ((1, 1), {}), ((2, 3), {"unique_key": "a"})]
+        )
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(ids[1], ids[3])
+        if ids[0] is not None:
+            self.assertLess(ids[0], ids[2])
+
+    def test_schedule_many_replace(self):
+        task = rebuild_cache.schedule(1)
+
+        ids = rebuild_cache.schedule_many([((1,), {}), ((2,), {}), ((1,), {"full": True})])
+
+        self.assertFalse(TaskModel.objects.filter(pk=task.pk).exists())
+        self.assertEqual(ids[0], ids[2])
+        self.assertEqual(TaskModel.objects.get(pk=ids[0]).params, {"args": (1,), "kwargs": {"full": True}})
+        self.assertEqual(TaskModel.objects.filter(func_name="tests.tasks.rebuild_cache").count(), 2)
+
+    def test_unique_task_is_not_deferred(self):
+        with transaction.atomic(), deferred_scheduling():
+            task = unique_add.schedule(1, 3)
+            self.assertIsNotNone(task.pk)
+            self.assertEqual(unique_add.schedule(1, 3).pk, task.pk)
+
+    def test_async(self):
+        task = async_to_sync(async_unique_add.schedule)(1, 3)
+        duplicate = async_to_sync(async_unique_add.schedule)(1, 3)
+        ids = async_to_sync(async_unique_add.schedule_many)([((1, 3), {}), ((2, 3), {})])
+
+        self.assertEqual(duplicate.pk, task.pk)
+        self.assertEqual(ids[0], task.pk)
+        self.assertEqual(TaskModel.objects.filter(func_name="tests.tasks.async_unique_add").count(), 2)
+
+    def test_unknown_on_duplicate(self):
+        with self.assertRaises(ValueError):
+            task(on_duplicate="merge")
@@ -0,0 +1,110 @@
+import json
+import tempfile
+import urllib.request
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from django_firefly_tasks._private import metrics
+from django_firefly_tasks._private.consumers import claim_tasks
+from django_firefly_tasks._private.processors import tasks_processor
+from django_firefly_tasks.views import metrics as metrics_view
+from tests.tasks import add, failling, restarting_failling
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        patcher = patch.object(metrics, "enabled", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(metrics.reset)
+
+
+class MetricsTest(MetricsTestCase):
+    def process_tasks(self):
+        add.schedule(1, 3)
+        failling.schedule()
+        restarting_failling.schedule()
+        tasks_processor(claim_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=10))
+
+    def test_task_metrics(self):
+        self.process_tasks()
+        text = metrics.render_metrics()
+
+        for line in [
+            'firefly_tasks_claimed_total{queue="default",func="tests.tasks.add"} 1',
+            'firefly_tasks_completed_total{queue="default",func="tests.tasks.add"} 1',
+            'firefly_tasks_failed_total{queue="default",func="tests.tasks.failling"} 1',
+            'firefly_tasks_retried_total{queue="default",func="tests.tasks.restarting_failling"} 1',
+            'firefly_claim_duration_seconds_count{queue="default"} 1',
+            'firefly_task_duration_seconds_count{queue="default",func="tests.tasks.failling"} 1',
+            'firefly_task_duration_seconds_bucket{queue="default",func="tests.tasks.add",le="+Inf"} 1',
+            'firefly_task_latency_seconds_count{queue="default",func="tests.tasks.add"} 1',
+            # retried task is back in the queue
+            'firefly_queue_depth{queue="default",status="created"} 1',
+            "# TYPE firefly_task_latency_seconds histogram",
+        ]:
+            self.assertIn(line, text)
+        self.assertNotIn('firefly_tasks_completed_total{queue="default",func="tests.tasks.failling"}', text)
+
+    def test_disabled_metrics(self):
+        with patch.object(metrics, "enabled", False):
+            self.process_tasks()
+
+        self.assertEqual(metrics.snapshot(), {"counters": [], "histograms": []})
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe("firefly_claim_duration_seconds", ("default",), 0.03)
+        text = metrics.render_metrics()
+
+        self.assertIn('firefly_claim_duration_seconds_bucket{queue="default",le="0.025"} 0', text)
+        self.assertIn('firefly_claim_duration_seconds_bucket{queue="default",le="0.05"} 1', text)
+        self.assertIn('firefly_claim_duration_seconds_bucket{queue="default",le="3600"} 1', text)
+        self.assertIn('firefly_claim_duration_seconds_sum{queue="default"} 0.03', text)
+
+    def test_metrics_of_many_processes(self):
+        metrics_dir = tempfile.mkdtemp()
+        other_process = {
+            "counters": [["firefly_tasks_completed_total", ["default", "tests.tasks.add"], 2]],
+            "histograms": [],
+        }
+        (Path(metrics_dir) / "firefly-1-abc.json").write_text(json.dumps(other_process))
+
+        with patch.object(metrics, "METRICS_DIR", metrics_dir):
+            add.schedule(1, 3)
+            tasks_processor(claim_tasks(settings.DEFAULT_QUEUE, "worker-1"))
+            text = metrics.render_metrics()
+
+            self.assertEqual(len(list(Path(metrics_dir).glob("firefly-*.json"))), 2)
+
+        self.assertIn('firefly_tasks_completed_total{queue="default",func="tests.tasks.add"} 3', text)
+
+    def test_view(self):
+        add.schedule(1, 3)
+
+        response = metrics_view(RequestFactory().get("/metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        self.assertIn(b'firefly_queue_depth{queue="default",status="created"} 1', response.content)
+
+
+class MetricsServerTest(SimpleTestCase):
+    def test_label_escaping(self):
+        self.assertEqual(
+            metrics.format_labels("firefly_claim_duration_seconds", ('a"b\\c\n',)), '{queue="a\\"b\\\\c\\n"}'
+        )
+
+    @patch.object(metrics, "get_queue_depth", return_value={("firefly_queue_depth", ("default", "created")): 5})
+    def test_server(self, get_queue_depth):
+        server = metrics.start_metrics_server(0, "127.0.0.1")
+        self.addCleanup(server.shutdown)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            text = response.read().decode()
+
+        self.assertIn('firefly_queue_depth{queue="default",status="created"} 5', text)
+        self.assertIn("# TYPE firefly_tasks_claimed_total counter", text)
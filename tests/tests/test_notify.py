@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+
+from django_firefly_tasks._private.consumers import run_task_consumer, task_consumer
+from django_firefly_tasks._private.notify import Listener, get_channel
+from tests.models import FooModel
+from tests.tasks import add, async_add, sleep_and_create_foo
+
+
+class ChannelTest(SimpleTestCase):
+    def test_get_channel(self):
+        self.assertEqual(get_channel("default"), "firefly_default")
+
+    def test_get_channel_long_queue(self):
+        channel = get_channel("q" * 100)
+
+        self.assertLessEqual(len(channel), 63)
+        self.assertNotEqual(channel, get_channel("q" * 101))
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY is supported only by PostgreSQL")
+@patch("django_firefly_tasks._private.notify.CONSUMER_NOTIFY", True)
+class NotifyTest(TransactionTestCase):
+    def listen_in_thread(self, *timeouts):
+        """
+        Waits for notifications with given timeouts one after another in separate connection.
+        """
+        results = []
+        listening = threading.Event()
+        waited = [threading.Event() for _ in timeouts]
+
+        def listen():
+            listener = Listener("default")
+            listener.listen()
+            listening.set()
+
+            for timeout, event in zip(timeouts, waited):
+                results.append(listener.wait(timeout))
+                event.set()
+
+            connections.close_all()
+
+        thread = threading.Thread(target=listen)
+        thread.start()
+        listening.wait(5)
+        return thread, waited, results
+
+    def test_wait_timeout(self):
+        thread, _, results = self.listen_in_thread(0.05)
+        thread.join()
+
+        self.assertEqual(results, [False])
+
+    def test_schedule_notifies_consumer(self):
+        thread, _, results = self.listen_in_thread(5)
+        add.schedule(1, 3)
+        thread.join()
+
+        self.assertEqual(results, [True])
+
+    def test_schedule_notifies_consumer_on_commit(self):
+        thread, waited, results = self.listen_in_thread(0.2, 5)
+
+        with transaction.atomic():
+            add.schedule(1, 3)
+            waited[0].wait(5)
+
+        thread.join()
+
+        self.assertEqual(results, [False, True])
+
+    async def test_async_schedule_notifies_consumer(self):
+        thread, _, results = await sync_to_async(self.listen_in_thread)(5)
+        await async_add.schedule(1, 3)
+        await sync_to_async(thread.join)()
+
+        self.assertEqual(results, [True])
+
+    def consume_in_thread(self, consumer):
+        stop_event = threading.Event()
+
+        def consume():
+            consumer("multi", stop_event=stop_event)
+            connections.close_all()
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        # consumer finds the queue empty and starts waiting for notification
+        time.sleep(0.3)
+        return thread, stop_event
+
+    def assert_woken_up(self, consumer):
+        thread, stop_event = self.consume_in_thread(consumer)
+        sleep_and_create_foo.schedule("notified", 0)
+
+        deadline = time.monotonic() + 5
+        while not FooModel.objects.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop_event.set()
+        thread.join()
+
+        self.assertTrue(FooModel.objects.exists())
+
+    def test_consumer_is_woken_up(self):
+        self.assert_woken_up(task_consumer)
+
+    def test_async_consumer_is_woken_up(self):
+        self.assert_woken_up(partial(run_task_consumer, max_inflight=2))
+
+    def assert_postponed_task_run(self, consumer):
+        # without notification consumer would check the queue after CONSUMER_NOTIFY_TIMEOUT
+        sleep_and_create_foo.schedule("postponed", 0, eta=timezone.now() + timedelta(seconds=0.5))
+        thread, stop_event = self.consume_in_thread(consumer)
+
+        deadline = time.monotonic() + 5
+        while not FooModel.objects.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop_event.set()
+        thread.join()
+
+        self.assertTrue(FooModel.objects.exists())
+
+    def test_consumer_wakes_up_when_postponed_task_is_due(self):
+        self.assert_postponed_task_run(task_consumer)
+
+    def test_async_consumer_wakes_up_when_postponed_task_is_due(self):
+        self.assert_postponed_task_run(partial(run_task_consumer, max_inflight=2))
+
+
+@patch("django_firefly_tasks._private.notify.notifies_take_timeout", lambda connection_class: False)
+class LegacyPsycopgNotifyTest(NotifyTest):
+    """
+    psycopg older than 3.2, its notifies() has no timeout.
+    """
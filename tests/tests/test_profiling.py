@@ -0,0 +1,105 @@
+import json
+import pstats
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from django_firefly_tasks._private import profiling
+from django_firefly_tasks.models import Status, TaskModel
+from tests.tasks import add, create_foo, failling
+from tests.utils import process
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        patcher = patch.multiple(
+            profiling, enabled=False, func_pattern="*", sample_rate=1.0, profile_dir=None, aggregate=False
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(profiling.aggregated.clear)
+        self.profile_dir = Path(tempfile.mkdtemp())
+
+    def test_profile_per_task(self):
+        profiling.enable("tests.tasks.create_*", directory=str(self.profile_dir))
+        task = create_foo.schedule("foo")
+        process(task)
+
+        path = self.profile_dir / f"tests.tasks.create_foo.{task.pk}.0.prof"
+        self.assertIn("create_foo", str(pstats.Stats(str(path)).stats))
+        info = json.loads(path.with_suffix(".json").read_text())
+        self.assertEqual(info["task_id"], task.pk)
+        self.assertEqual(info["tasks"], 1)
+        self.assertGreaterEqual(info["queries"], 1)
+        self.assertGreaterEqual(info["run_ms"], info["query_ms"])
+
+    def test_not_matching_task_is_not_profiled(self):
+        profiling.enable("tests.tasks.create_*", directory=str(self.profile_dir))
+        process(add.schedule(1, 3))
+
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_sample_rate(self):
+        profiling.enable("*", 0.5, str(self.profile_dir))
+
+        with patch("random.random", return_value=0.7):
+            process(add.schedule(1, 3))
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+        with patch("random.random", return_value=0.3):
+            process(add.schedule(1, 3))
+        self.assertEqual(len(list(self.profile_dir.glob("*.prof"))), 1)
+
+    def test_aggregate(self):
+        profiling.enable("tests.tasks.add", directory=str(self.profile_dir), aggregate_stats=True)
+        for i in range(3):
+            process(add.schedule(i, 3))
+
+        paths = list(self.profile_dir.glob("*.prof"))
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(json.loads(paths[0].with_suffix(".json").read_text())["tasks"], 3)
+        stats = pstats.Stats(str(paths[0]))
+        self.assertEqual(next(calls for (_, _, name), (calls, *_) in stats.stats.items() if name == "add"), 3)
+
+    def test_failing_task(self):
+        profiling.enable("*", directory=str(self.profile_dir))
+        task = failling.schedule()
+        process(task)
+
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).status, Status.FAILED)
+        self.assertEqual(len(list(self.profile_dir.glob("*.prof"))), 1)
+
+    def test_task_profiled_at_once_runs_unprofiled(self):
+        profiling.enable("*", directory=str(self.profile_dir))
+        task = add.schedule(1, 3)
+        # other consumer thread is profiling its task
+        with profiling.profiler_lock:
+            process(task)
+
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).returned, 4)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_other_profiler_active(self):
+        profiling.enable("*", directory=str(self.profile_dir))
+        task = add.schedule(1, 3)
+        with patch("cProfile.Profile") as profile:
+            profile.return_value.enable.side_effect = ValueError("Another profiling tool is already active")
+            process(task)
+
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertEqual(task.returned, 4)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_disabled(self):
+        with patch.object(profiling, "profile_call") as profile_call:
+            process(add.schedule(1, 3))
+
+        profile_call.assert_not_called()
+
+    def test_command_sample_rate_validation(self):
+        with self.assertRaises(CommandError):
+            call_command("consume_tasks", "--profile-func", "*", "--profile-sample-rate", "0")
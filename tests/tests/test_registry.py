@@ -0,0 +1,85 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+
+from django_firefly_tasks._private.consumers import claim_tasks
+from django_firefly_tasks._private.processors import atask_processor
+from django_firefly_tasks._private.registry import get_task_func, register, registry
+from django_firefly_tasks._private.utils import get_func_path
+from django_firefly_tasks.decorators import task
+from django_firefly_tasks.exceptions import TaskNameConflictException
+from django_firefly_tasks.models import Status, TaskModel
+from tests.tasks import add, named_add, named_async_add
+from tests.utils import failing_func, process
+
+
+def happy():
+    pass
+
+
+class RegistryTest(SimpleTestCase):
+    def test_func_path(self):
+        self.assertEqual(get_func_path(add), "tests.tasks.add")
+
+        # module name ending in p/y letters is kept as it is
+        happy.__module__ = "myapp.happy"
+        self.assertEqual(get_func_path(happy), "myapp.happy.happy")
+
+    def test_registered_tasks(self):
+        self.assertIs(get_task_func("tests.tasks.add"), registry["tests.tasks.add"])
+        self.assertIs(get_task_func("add_v1"), registry["add_v1"])
+        self.assertNotIn("tests.tasks.named_add", registry)
+
+    def test_not_registered_func_imported(self):
+        self.assertIs(get_task_func("tests.utils.failing_func"), failing_func)
+
+    def test_name_conflict(self):
+        with self.assertRaises(TaskNameConflictException):
+            task(name="add_v1")(lambda: None)
+
+    def test_reimported_func_replaces_itself(self):
+        self.assertEqual(register(add, "add_v1_test"), "add_v1_test")
+        self.assertEqual(register(add, "add_v1_test"), "add_v1_test")
+        del registry["add_v1_test"]
+
+
+class NamedTaskTest(TestCase):
+    def test_named_task(self):
+        task = named_add.schedule(1, 3)
+        self.assertEqual(task.func_name, "add_v1")
+
+        process(task)
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertEqual(task.returned, 4)
+
+    def test_named_async_task(self):
+        task = async_to_sync(named_async_add.schedule)(1, 3)
+        self.assertEqual(task.func_name, "async_add_v1")
+
+        process(task)
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).returned, 4)
+
+    def test_named_schedule_many(self):
+        named_add.schedule_many([((1, 3), {}), ((2, 3), {})])
+
+        self.assertEqual(list(TaskModel.objects.values_list("func_name", flat=True)), ["add_v1", "add_v1"])
+
+    def test_unknown_func(self):
+        # e.g. function renamed while its tasks were queued
+        task = add.schedule(1, 3)
+        TaskModel.objects.filter(pk=task.pk).update(func_name="tests.tasks.removed_add", max_retries=0)
+
+        process(task)
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.FAILED)
+        self.assertIsNone(task.locked_by)
+        self.assertIn("ImportError", task.attempt_history[-1]["error"])
+
+    def test_unknown_func_async(self):
+        task = add.schedule(1, 3)
+        TaskModel.objects.filter(pk=task.pk).update(func_name="tests.tasks.removed_add", max_retries=0)
+
+        async_to_sync(atask_processor)(claim_tasks(task.queue, "test-worker")[0])
+        task = TaskModel.objects.get(pk=task.pk)
+        self.assertEqual(task.status, Status.FAILED)
+        self.assertIsNone(task.locked_by)
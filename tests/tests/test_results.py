@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase
+
+from django_firefly_tasks._private.consumers import claim_tasks
+from django_firefly_tasks._private.processors import atask_processor, tasks_processor
+from django_firefly_tasks.decorators import task
+from django_firefly_tasks.models import Status, TaskModel
+from tests.tasks import async_cached_add, cached_add
+from tests.utils import process
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_cached_result(self):
+        task = cached_add.schedule(1, 3)
+        self.assertEqual(task.status, Status.CREATED)
+        process(task)
+
+        cached = cached_add.schedule(1, 3)
+        self.assertNotEqual(cached.pk, task.pk)
+        self.assertEqual(cached.status, Status.COMPLETED)
+        self.assertIsNotNone(cached.completed)
+        self.assertIsNone(cached.dedup_key)
+        self.assertEqual(TaskModel.objects.get(pk=cached.pk).returned, 4)
+        # other params aren't cached
+        self.assertEqual(cached_add.schedule(2, 3).status, Status.CREATED)
+
+    def test_pending_task_is_shared(self):
+        task = cached_add.schedule(i=1, j=3)
+        duplicate = cached_add.schedule(j=3, i=1)
+
+        self.assertEqual(duplicate.pk, task.pk)
+        self.assertEqual(TaskModel.objects.filter(func_name="tests.tasks.cached_add").count(), 1)
+
+    def test_running_duplicate_uses_cached_result(self):
+        task = cached_add.schedule(1, 3)
+        claimed = claim_tasks(task.queue, "worker-1")
+        duplicate = cached_add.schedule(1, 3)
+        self.assertNotEqual(duplicate.pk, task.pk)
+
+        tasks_processor(claimed)
+        with patch("django_firefly_tasks._private.processors.call_task_func") as call_task_func:
+            process(duplicate)
+
+        call_task_func.assert_not_called()
+        duplicate = TaskModel.objects.get(pk=duplicate.pk)
+        self.assertEqual(duplicate.status, Status.COMPLETED)
+        self.assertEqual(duplicate.returned, 4)
+
+    def test_cache_ttl(self):
+        process(cached_add.schedule(1, 3))
+
+        with patch("django.core.cache.backends.locmem.time.time", return_value=10**10):
+            self.assertEqual(cached_add.schedule(1, 3).status, Status.CREATED)
+
+    def test_unavailable_cache(self):
+        with (
+            patch("django.core.cache.backends.locmem.LocMemCache.set", side_effect=ConnectionError),
+            self.assertLogs("django_firefly_tasks", "WARNING") as logs,
+        ):
+            task = cached_add.schedule(1, 3)
+            process(task)
+
+        self.assertIn(f"[Task #{task.pk}] Result not cached", "\n".join(logs.output))
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).status, Status.COMPLETED)
+        self.assertEqual(cached_add.schedule(1, 3).status, Status.CREATED)
+
+    def test_schedule_many(self):
+        process(cached_add.schedule(1, 3))
+
+        ids = cached_add.schedule_many([((1, 3), {}), ((2, 3), {}), ((2, 3), {})])
+
+        self.assertEqual(TaskModel.objects.get(pk=ids[0]).status, Status.COMPLETED)
+        self.assertEqual(TaskModel.objects.get(pk=ids[0]).returned, 4)
+        self.assertEqual(ids[1], ids[2])
+        self.assertEqual(TaskModel.objects.get(pk=ids[1]).status, Status.CREATED)
+
+    def test_async(self):
+        task = async_to_sync(async_cached_add.schedule)(1, 3)
+        async_to_sync(atask_processor)(task)
+
+        cached = async_to_sync(async_cached_add.schedule)(1, 3)
+        self.assertEqual(cached.status, Status.COMPLETED)
+        self.assertEqual(cached.returned, 4)
+
+    def test_unique_key(self):
+        with self.assertRaises(ValueError):
+            task(cache_result=True, unique_key=True)
+        with self.assertRaises(ValueError):
+            cached_add.schedule(1, 3, unique_key="sum")
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+
+from django_firefly_tasks._private.processors import tasks_processor
+from django_firefly_tasks._private.utils import serialize_object
+from django_firefly_tasks.decorators import task
+from django_firefly_tasks.models import Status, TaskModel
+from django_firefly_tasks.serializers import (
+    JSONSerializer,
+    MarshalSerializer,
+    PickleSerializer,
+    get_serializer,
+)
+from tests.tasks import add, json_add, marshal_async_add, prefixed_add
+from tests.utils import PrefixedPickleSerializer, process
+
+
+class SerializersTest(SimpleTestCase):
+    params = {"args": (1, "a"), "kwargs": {"values": [1.5, None, True], "nested": {"key": b"bytes"}}}
+
+    def test_pickle(self):
+        serializer = PickleSerializer()
+        self.assertEqual(serializer.loads(serializer.dumps(self.params)), self.params)
+
+    def test_marshal(self):
+        serializer = MarshalSerializer()
+        self.assertEqual(serializer.loads(serializer.dumps(self.params)), self.params)
+
+    def test_json(self):
+        serializer = JSONSerializer()
+        params = {"args": (1, "a"), "kwargs": {"at": datetime(2025, 1, 1, tzinfo=timezone.utc)}}
+
+        # tuples become lists and datetimes strings
+        self.assertEqual(
+            serializer.loads(serializer.dumps(params)), {"args": [1, "a"], "kwargs": {"at": "2025-01-01T00:00:00Z"}}
+        )
+
+    def test_get_serializer(self):
+        self.assertIsInstance(get_serializer("json"), JSONSerializer)
+        self.assertIsInstance(get_serializer("tests.utils.PrefixedPickleSerializer"), PrefixedPickleSerializer)
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ImportError):
+            task(serializer="unknown")
+
+
+class TaskSerializerTest(TestCase):
+    def process(self, task):
+        process(task)
+        return TaskModel.objects.get(pk=task.pk)
+
+    def test_default_serializer(self):
+        task = self.process(add.schedule(1, 3))
+
+        self.assertEqual(task.serializer, "pickle")
+        self.assertEqual(task.params, {"args": (1, 3), "kwargs": {}})
+        self.assertEqual(task.returned, 4)
+
+    def test_json_serializer(self):
+        task = json_add.schedule(1, j=3)
+        self.assertEqual(bytes(TaskModel.objects.get(pk=task.pk).params_data), b'{"args":[1],"kwargs":{"j":3}}')
+
+        task = self.process(task)
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertEqual(bytes(task.returned_data), b"4")
+        self.assertEqual(task.returned, 4)
+
+    def test_marshal_serializer(self):
+        task = self.process(async_to_sync(marshal_async_add.schedule)(1, 3))
+
+        self.assertEqual(task.serializer, "marshal")
+        self.assertEqual(task.returned, 4)
+
+    def test_custom_serializer(self):
+        task = self.process(prefixed_add.schedule(1, 3))
+
+        self.assertTrue(bytes(task.params_data).startswith(b"prefix"))
+        self.assertEqual(task.returned, 4)
+
+    def test_batch_release_saves_returned(self):
+        tasks = [add.schedule(1, 3), json_add.schedule(2, 3), prefixed_add.schedule(3, 3)]
+
+        tasks_processor(tasks)
+
+        self.assertEqual([TaskModel.objects.get(pk=task.pk).returned for task in tasks], [4, 5, 6])
+
+    def test_legacy_task(self):
+        task = TaskModel.objects.create(
+            func_name="tests.tasks.add",
+            queue="default",
+            raw_params=serialize_object({"args": (1, 3), "kwargs": {}}),
+            max_retries=0,
+        )
+        self.assertEqual(task.params, {"args": (1, 3), "kwargs": {}})
+
+        task = self.process(task)
+        self.assertEqual(task.status, Status.COMPLETED)
+        self.assertEqual(task.serializer, "pickle")
+        self.assertEqual(task.returned, 4)
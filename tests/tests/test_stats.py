@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from django_firefly_tasks._private.consumers import claim_tasks
+from django_firefly_tasks._private.processors import tasks_processor
+from django_firefly_tasks._private.stats import get_task_stats, percentile
+from django_firefly_tasks._private.utils import get_worker_id
+from django_firefly_tasks.models import Status, TaskArchive, TaskModel
+from tests.tasks import add, restarting_failling
+from tests.utils import process
+
+
+class TaskRunInfoTest(TestCase):
+    def test_run_info(self):
+        task = add.schedule(1, 3)
+        process(task)
+        task = TaskModel.objects.get(pk=task.pk)
+
+        self.assertEqual(task.worker_id, get_worker_id())
+        self.assertIsNotNone(task.started_at)
+        self.assertGreaterEqual(task.duration_ms, 0)
+        self.assertGreaterEqual(task.get_wait_time(), timedelta(0))
+        self.assertEqual(
+            task.attempt_history,
+            [{"started_at": task.started_at.isoformat(), "ms": task.duration_ms, "worker": task.worker_id}],
+        )
+
+    @patch("django_firefly_tasks.models.ATTEMPT_HISTORY_SIZE", 2)
+    def test_attempt_history_is_bounded(self):
+        task = restarting_failling.schedule()
+
+        for _ in range(3):
+            process(task, due=True)
+        task = TaskModel.objects.get(pk=task.pk)
+
+        self.assertEqual(task.retry_attempts, 3)
+        self.assertEqual(len(task.attempt_history), 2)
+        self.assertEqual(task.attempt_history[-1]["error"], "TypeError: ")
+        self.assertEqual(task.attempt_history[-1]["started_at"], task.started_at.isoformat())
+
+    def test_batch_release_saves_run_info(self):
+        tasks = [add.schedule(1, 3), restarting_failling.schedule()]
+
+        tasks_processor(claim_tasks(settings.DEFAULT_QUEUE, "worker-1", batch_size=10))
+
+        for task in TaskModel.objects.filter(pk__in=[task.pk for task in tasks]):
+            self.assertEqual(task.worker_id, get_worker_id())
+            self.assertEqual(len(task.attempt_history), 1)
+            self.assertEqual(task.attempt_history[0]["ms"], task.duration_ms)
+        self.assertIn("error", TaskModel.objects.get(pk=tasks[1].pk).attempt_history[0])
+
+
+class TaskStatsTest(TestCase):
+    def create_task(self, model, func_name, wait_ms, run_ms, queue="default", status=Status.COMPLETED, **kwargs):
+        task = model.objects.create(
+            func_name=func_name, queue=queue, status=status, max_retries=0, created=timezone.now(), **kwargs
+        )
+        # created is set on insert
+        model.objects.filter(pk=task.pk).update(
+            started_at=task.created + timedelta(milliseconds=wait_ms), duration_ms=run_ms
+        )
+
+    def test_task_stats(self):
+        for i in range(1, 101):
+            self.create_task(TaskModel, "app.tasks.a", wait_ms=i, run_ms=i * 10)
+        self.create_task(TaskArchive, "app.tasks.b", wait_ms=5, run_ms=7, id=1000)
+        self.create_task(TaskModel, "app.tasks.b", wait_ms=5, run_ms=7, queue="other")
+        self.create_task(TaskModel, "app.tasks.c", wait_ms=5, run_ms=7, status=Status.RUNNING)
+
+        stats = get_task_stats()
+
+        self.assertEqual(
+            [(row["func_name"], row["queue"]) for row in stats],
+            [
+                ("app.tasks.a", "default"),
+                ("app.tasks.b", "default"),
+                ("app.tasks.b", "other"),
+            ],
+        )
+        self.assertEqual(
+            stats[0],
+            {
+                "func_name": "app.tasks.a",
+                "queue": "default",
+                "count": 100,
+                "wait_p50": 50,
+                "run_p50": 500,
+                "wait_p95": 95,
+                "run_p95": 950,
+                "wait_p99": 99,
+                "run_p99": 990,
+            },
+        )
+        self.assertEqual(len(get_task_stats(queue="other", func_name="app.tasks.b")), 1)
+
+    def test_command_task_stats(self):
+        self.create_task(TaskModel, "app.tasks.a", wait_ms=3, run_ms=40)
+        out = StringIO()
+
+        call_command("task_stats", "--since", "1h", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            lines[1].split(),
+            ["func_name", "queue", "count", "wait_p50", "wait_p95", "wait_p99", "run_p50", "run_p95", "run_p99"],
+        )
+        self.assertEqual(lines[2].split(), ["app.tasks.a", "default", "1", "3", "3", "3", "40", "40", "40"])
+
+    def test_command_task_stats_empty(self):
+        out = StringIO()
+        call_command("task_stats", stdout=out)
+        self.assertEqual(out.getvalue(), "No finished tasks\n")
+
+
+class PercentileTest(SimpleTestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([1], 99), 1)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile(list(range(1, 11)), 95), 10)
@@ -2,12 +2,12 @@ from datetime import datetime, timedelta
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
 from django.test import TestCase
 
-from django_firefly_tasks._private.processors import task_processor
+from django_firefly_tasks.decorators import deferred_scheduling
 from django_firefly_tasks.exceptions import (
     AsyncFuncNotSupportedException,
     SyncFuncNotSupportedException,
@@ -22,6 +22,7 @@ from tests.tasks import (
     async_failling,
     async_restarting_failling,
     async_schedule_task,
+    async_urgent_add,
     broken_async_add,
     broken_sync_add,
     create_foo,
@@ -29,12 +30,9 @@ from tests.tasks import (
     failling,
     restarting_failling,
     schedule_task,
+    urgent_add,
 )
-
-
-def process(task):
-    with transaction.atomic():
-        task_processor(task)
+from tests.utils import process
 
 
 class TasksTest(TestCase):
@@ -47,8 +45,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        with transaction.atomic():
-            task_processor(task)
+        process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -60,6 +57,26 @@ class TasksTest(TestCase):
 
         self.assertEqual(task.returned, 4)
 
+    def test_task_priority(self):
+        self.assertEqual(add.schedule(1, 3).priority, 0)
+        self.assertEqual(urgent_add.schedule(1, 3).priority, 10)
+
+        task = urgent_add.schedule(1, 3, priority=-1)
+        self.assertEqual(TaskModel.objects.get(pk=task.pk).priority, -1)
+        self.assertEqual(task.params, {"args": (1, 3), "kwargs": {}})
+
+        ids = urgent_add.schedule_many([((1, 3), {}), ((1, 3), {"priority": 5})])
+        self.assertEqual(
+            list(TaskModel.objects.filter(pk__in=ids).order_by("pk").values_list("priority", flat=True)), [10, 5]
+        )
+
+        with self.assertRaises(TypeError):
+            add.schedule(1, 3, priority="high")
+
+    def test_async_task_priority(self):
+        self.assertEqual(async_to_sync(async_urgent_add.schedule)(1, 3).priority, 10)
+        self.assertEqual(async_to_sync(async_urgent_add.schedule)(1, 3, priority=1).priority, 1)
+
     def test_task_simple_eta_passed(self):
         eta = datetime(2025, 3, 30, 18, 30, tzinfo=ZoneInfo("UTC"))
         task = add.schedule(1, 3, eta=eta)
@@ -71,8 +88,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
         with patch("django_firefly_tasks.models.timezone.now", return_value=eta + timedelta(hours=3)):
-            with transaction.atomic():
-                task_processor(task)
+            process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -95,8 +111,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
         with patch("django_firefly_tasks.models.timezone.now", return_value=eta - timedelta(hours=3)):
-            with transaction.atomic():
-                task_processor(task)
+            process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -116,8 +131,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.not_before, eta)
 
         with patch("django_firefly_tasks.models.timezone.now", return_value=eta + timedelta(hours=3)):
-            with transaction.atomic():
-                task_processor(task)
+            process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -131,8 +145,7 @@ class TasksTest(TestCase):
             return_value=eta + timedelta(hours=3) + timedelta(seconds=settings.RETRY_DELAY),
         ):
             with patch("tests.tasks.failing_func"):
-                with transaction.atomic():
-                    task_processor(task)
+                process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -145,6 +158,31 @@ class TasksTest(TestCase):
         with self.assertRaises(AsyncFuncNotSupportedException):
             broken_sync_add.schedule(1, 3)
 
+        with self.assertRaises(AsyncFuncNotSupportedException):
+            broken_sync_add.schedule_many([((1, 3), {})])
+
+    def test_schedule_many(self):
+        eta = datetime(2020, 1, 1, tzinfo=ZoneInfo("UTC"))
+        params = (((i, 3), {"eta": eta} if i == 4 else {}) for i in range(5))
+
+        # generator is consumed lazily, one insert per chunk
+        with self.assertNumQueries(3):
+            ids = add.schedule_many(params, batch_size=2)
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            tasks = list(TaskModel.objects.filter(pk__in=ids).order_by("pk"))
+        else:
+            tasks = list(TaskModel.objects.order_by("pk"))
+        self.assertEqual(len(tasks), 5)
+        self.assertEqual([task.params["args"] for task in tasks], [(i, 3) for i in range(5)])
+        self.assertEqual([task.not_before for task in tasks], [None] * 4 + [eta])
+        self.assertTrue(all(task.func_name == "tests.tasks.add" for task in tasks))
+        self.assertTrue(all(task.max_retries == settings.MAX_RETRIES for task in tasks))
+
+        for task in tasks:
+            process(task)
+        self.assertEqual([TaskModel.objects.get(pk=task.pk).returned for task in tasks], [3, 4, 5, 6, 7])
+
     def test_model_task_simple(self):
         name = "FooBar"
 
@@ -156,8 +194,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        with transaction.atomic():
-            task_processor(task)
+        process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -180,8 +217,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, 0)
 
-        with transaction.atomic():
-            task_processor(task)
+        process(task)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -202,10 +238,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, 0)
 
-        task.is_postponed = lambda: False
-
-        with transaction.atomic():
-            task_processor(task)
+        process(task, due=True)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -224,11 +257,8 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         for _ in range(settings.MAX_RETRIES):
-            with transaction.atomic():
-                task_processor(task)
+            process(task, due=True)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -247,11 +277,8 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         for _ in range(settings.MAX_RETRIES - 1):
-            with transaction.atomic():
-                task_processor(task)
+            process(task, due=True)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -261,11 +288,8 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         with patch("tests.tasks.failing_func"):
-            with transaction.atomic():
-                task_processor(task)
+            process(task, due=True)
 
         task = TaskModel.objects.get(pk=task.pk)
 
@@ -284,8 +308,7 @@ class TasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        with transaction.atomic():
-            task_processor(task)
+        process(task)
 
         task = TaskModel.objects.get(func_name="tests.tasks.add")
 
@@ -399,6 +422,23 @@ class AsyncTasksTest(TestCase):
         with self.assertRaises(SyncFuncNotSupportedException):
             await broken_async_add.schedule(1, 3)
 
+        with self.assertRaises(SyncFuncNotSupportedException):
+            await broken_async_add.schedule_many([((1, 3), {})])
+
+    async def test_schedule_many(self):
+        async def params():
+            for i in range(5):
+                yield (i,), {"j": 3}
+
+        ids = await async_add.schedule_many(params(), batch_size=2)
+
+        tasks = [task async for task in TaskModel.objects.order_by("pk")]
+        self.assertEqual(len(tasks), 5)
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(ids, [task.pk for task in tasks])
+        self.assertEqual([task.params for task in tasks], [{"args": (i,), "kwargs": {"j": 3}} for i in range(5)])
+        self.assertTrue(all(task.func_name == "tests.tasks.async_add" for task in tasks))
+
     async def test_model_task_simple(self):
         name = "FooBar"
 
@@ -433,8 +473,6 @@ class AsyncTasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, 0)
 
-        task.is_postponed = lambda: False
-
         await sync_to_async(process)(task)
 
         task = await TaskModel.objects.aget(pk=task.pk)
@@ -454,10 +492,8 @@ class AsyncTasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         for _ in range(settings.MAX_RETRIES):
-            await sync_to_async(process)(task)
+            await sync_to_async(process)(task, due=True)
 
         task = await TaskModel.objects.aget(pk=task.pk)
 
@@ -476,10 +512,8 @@ class AsyncTasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         for _ in range(settings.MAX_RETRIES - 1):
-            await sync_to_async(process)(task)
+            await sync_to_async(process)(task, due=True)
 
         task = await TaskModel.objects.aget(pk=task.pk)
 
@@ -489,10 +523,8 @@ class AsyncTasksTest(TestCase):
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
 
-        task.is_postponed = lambda: False
-
         with patch("tests.tasks.failing_func"):
-            await sync_to_async(process)(task)
+            await sync_to_async(process)(task, due=True)
 
         task = await TaskModel.objects.aget(pk=task.pk)
 
@@ -541,3 +573,63 @@ class AsyncTasksTest(TestCase):
         self.assertEqual(task.retry_attempts, 0)
         self.assertEqual(task.retry_delay, settings.RETRY_DELAY)
         self.assertEqual(task.max_retries, settings.MAX_RETRIES)
+
+
+class DeferredSchedulingTest(TestCase):
+    def test_tasks_inserted_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_scheduling():
+                with self.assertNumQueries(0):
+                    tasks = [add.schedule(1, i) for i in range(3)]
+                    tasks.append(create_foo.schedule("foo"))
+
+                self.assertFalse(TaskModel.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(TaskModel.objects.count(), 4)
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(
+                [task.pk for task in tasks], list(TaskModel.objects.order_by("pk").values_list("pk", flat=True))
+            )
+
+    def test_rolled_back_tasks_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_scheduling():
+                add.schedule(1, 2)
+                try:
+                    with transaction.atomic():
+                        add.schedule(1, 3)
+                        raise Exception
+                except Exception:
+                    pass
+
+                with transaction.atomic():
+                    add.schedule(1, 4)
+
+        self.assertEqual([task.params["args"] for task in TaskModel.objects.order_by("pk")], [(1, 2), (1, 4)])
+
+    def test_not_deferred_by_default(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            add.schedule(1, 2)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(TaskModel.objects.count(), 1)
+
+    @patch("django_firefly_tasks._private.deferred.DEFERRED_SCHEDULING", True)
+    def test_deferred_by_setting(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            add.schedule(1, 2)
+            with deferred_scheduling(False):
+                add.schedule(1, 3)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([task.params["args"] for task in TaskModel.objects.all()], [(1, 3)])
+
+    def test_async_tasks_inserted_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_scheduling():
+                async_to_sync(async_add.schedule)(1, 2)
+                self.assertFalse(TaskModel.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(TaskModel.objects.get().func_name, "tests.tasks.async_add")
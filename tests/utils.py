@@ -1,2 +1,25 @@
+from django_firefly_tasks._private.consumers import consume_tasks
+from django_firefly_tasks.models import TaskModel
+from django_firefly_tasks.serializers import PickleSerializer
+
+
 def failing_func():
     raise TypeError
+
+
+def process(task: TaskModel, due: bool = False) -> list[TaskModel]:
+    """
+    Consumes task the way consumer does, claimed from its queue. With due postponed task (e.g. restarted one)
+    is made due first. Returns claimed tasks, empty list when task isn't due.
+    """
+    if due:
+        TaskModel.objects.filter(pk=task.pk).update(not_before=None)
+    return consume_tasks(task.queue, "test-worker")
+
+
+class PrefixedPickleSerializer(PickleSerializer):
+    def dumps(self, obj) -> bytes:
+        return b"prefix" + super().dumps(obj)
+
+    def loads(self, data: bytes):
+        return super().loads(data.removeprefix(b"prefix"))